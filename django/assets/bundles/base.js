@@ -0,0 +1,143 @@
+const __m0=(()=>{
+const STRS={
+ACCESS_FAILED:'E2 - %s',
+};
+function getCsrfToken(){
+let csrfToken=null;
+const keyValues=document.cookie.split(';');
+for(let i=0;i<keyValues.length;i++){
+const keyValue=keyValues[i].trim();
+if(!keyValue.startsWith('csrftoken')){
+continue;
+}
+const eqSep=keyValue.indexOf('=');
+if(eqSep===-1){
+continue;
+}
+csrfToken=keyValue.slice(eqSep+1).trim();
+break;
+}
+return csrfToken;
+}
+function showElemAccessErr(id){
+let msg=STRS.ACCESS_FAILED.replace('%s',id);
+showError(msg);
+}
+function showError(message){
+console.error(message);
+showAlert(message,'danger');
+}
+function showAlert(msg,type='danger'){
+let alertContainer=document.getElementById('alert-container');
+if(alertContainer===null){
+showElemAccessErr('alert-container');
+return;
+}
+const alertHTML=`
+      <div class="alert alert-${type} alert-dismissible fade show custom-alert" role="alert">
+         ${msg}
+         <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+      </div>`;
+alertContainer.innerHTML=alertHTML;
+setTimeout(()=>{
+let alertBox=document.querySelector('.custom-alert');
+if(alertBox){
+alertBox.remove();
+}
+},5000
+);
+}
+return{getCsrfToken,showElemAccessErr,showError,showAlert}})();
+const __m1=(()=>{
+const{showElemAccessErr}=__m0;
+(function(){
+class BadThemeError extends Error{
+constructor(message){
+super(message);
+this.name='BadThemeError';
+}
+}
+const STRS={
+BAD_THEME:'Invalid theme %s',
+};
+document.addEventListener('DOMContentLoaded',onDomLoaded);
+function onDomLoaded(){
+let themeToggler=document.getElementById('theme-toggler');
+if(!themeToggler){
+showElemAccessErr('theme-toggler');
+return;
+}
+themeToggler.addEventListener('click',onThemeTogglerClicked);
+let hamburgerIcon=document.getElementById('hamburger-icon');
+if(!hamburgerIcon){
+showElemAccessErr('hamburger-icon');
+return;
+}
+hamburgerIcon.addEventListener('click',onHamburgerIconClicked);
+}
+function getPreferredTheme(){
+const SAVED_THEME=localStorage.getItem('theme');
+if(SAVED_THEME){
+return SAVED_THEME;
+}
+return window.matchMedia('(prefers-color-scheme: dark)').matches?
+'dark':'light';
+}
+;
+function switchTheme(theme){
+const ROOT=document.documentElement;
+let darkModeSvg=document.getElementById('dark-mode-icon');
+if(!darkModeSvg){
+showElemAccessErr('dark-mode-icon');
+return;
+}
+let lightModeSvg=document.getElementById('light-mode-icon');
+if(!lightModeSvg){
+showElemAccessErr('light-mode-icon');
+return;
+}
+switch(theme){
+case'light':
+ROOT.setAttribute('data-theme',theme);
+darkModeSvg.style.display='block';
+lightModeSvg.style.display='none';
+localStorage.setItem('theme',theme);
+break;
+case'dark':
+ROOT.setAttribute('data-theme',theme);
+darkModeSvg.style.display='none';
+lightModeSvg.style.display='block';
+localStorage.setItem('theme',theme);
+break;
+default:
+new BadThemeError(STRS.BAD_THEME.replace('%s',theme));
+}
+}
+;
+function onThemeTogglerClicked(){
+const ROOT=document.documentElement;
+const newTheme=ROOT.getAttribute("data-theme")==="light"?"dark":"light";
+try{
+switchTheme(newTheme);
+}
+catch(err){
+console.error(err);
+}
+}
+function onHamburgerIconClicked(){
+let hamburgerMenu=document.getElementById('hamburger-menu');
+if(!hamburgerMenu){
+showElemAccessErr('hamburger-icon');
+return;
+}
+if(hamburgerMenu.style.display==='none'||hamburgerMenu.style.display===''){
+hamburgerMenu.style.display='flex';
+}else{
+hamburgerMenu.style.display='none';
+}
+}
+const CURR_THEME=getPreferredTheme();
+switchTheme(CURR_THEME);
+})();
+return{}})();
+//# sourceMappingURL=base.js.map
@@ -0,0 +1,425 @@
+const __m0=(()=>{
+const STRS={
+ACCESS_FAILED:'E2 - %s',
+};
+function getCsrfToken(){
+let csrfToken=null;
+const keyValues=document.cookie.split(';');
+for(let i=0;i<keyValues.length;i++){
+const keyValue=keyValues[i].trim();
+if(!keyValue.startsWith('csrftoken')){
+continue;
+}
+const eqSep=keyValue.indexOf('=');
+if(eqSep===-1){
+continue;
+}
+csrfToken=keyValue.slice(eqSep+1).trim();
+break;
+}
+return csrfToken;
+}
+function showElemAccessErr(id){
+let msg=STRS.ACCESS_FAILED.replace('%s',id);
+showError(msg);
+}
+function showError(message){
+console.error(message);
+showAlert(message,'danger');
+}
+function showAlert(msg,type='danger'){
+let alertContainer=document.getElementById('alert-container');
+if(alertContainer===null){
+showElemAccessErr('alert-container');
+return;
+}
+const alertHTML=`
+      <div class="alert alert-${type} alert-dismissible fade show custom-alert" role="alert">
+         ${msg}
+         <button type="button" class="btn-close" data-bs-dismiss="alert" aria-label="Close"></button>
+      </div>`;
+alertContainer.innerHTML=alertHTML;
+setTimeout(()=>{
+let alertBox=document.querySelector('.custom-alert');
+if(alertBox){
+alertBox.remove();
+}
+},5000
+);
+}
+return{getCsrfToken,showElemAccessErr,showError,showAlert}})();
+const __m1=(()=>{
+const{showElemAccessErr}=__m0;
+(function(){
+class BadThemeError extends Error{
+constructor(message){
+super(message);
+this.name='BadThemeError';
+}
+}
+const STRS={
+BAD_THEME:'Invalid theme %s',
+};
+document.addEventListener('DOMContentLoaded',onDomLoaded);
+function onDomLoaded(){
+let themeToggler=document.getElementById('theme-toggler');
+if(!themeToggler){
+showElemAccessErr('theme-toggler');
+return;
+}
+themeToggler.addEventListener('click',onThemeTogglerClicked);
+let hamburgerIcon=document.getElementById('hamburger-icon');
+if(!hamburgerIcon){
+showElemAccessErr('hamburger-icon');
+return;
+}
+hamburgerIcon.addEventListener('click',onHamburgerIconClicked);
+}
+function getPreferredTheme(){
+const SAVED_THEME=localStorage.getItem('theme');
+if(SAVED_THEME){
+return SAVED_THEME;
+}
+return window.matchMedia('(prefers-color-scheme: dark)').matches?
+'dark':'light';
+}
+;
+function switchTheme(theme){
+const ROOT=document.documentElement;
+let darkModeSvg=document.getElementById('dark-mode-icon');
+if(!darkModeSvg){
+showElemAccessErr('dark-mode-icon');
+return;
+}
+let lightModeSvg=document.getElementById('light-mode-icon');
+if(!lightModeSvg){
+showElemAccessErr('light-mode-icon');
+return;
+}
+switch(theme){
+case'light':
+ROOT.setAttribute('data-theme',theme);
+darkModeSvg.style.display='block';
+lightModeSvg.style.display='none';
+localStorage.setItem('theme',theme);
+break;
+case'dark':
+ROOT.setAttribute('data-theme',theme);
+darkModeSvg.style.display='none';
+lightModeSvg.style.display='block';
+localStorage.setItem('theme',theme);
+break;
+default:
+new BadThemeError(STRS.BAD_THEME.replace('%s',theme));
+}
+}
+;
+function onThemeTogglerClicked(){
+const ROOT=document.documentElement;
+const newTheme=ROOT.getAttribute("data-theme")==="light"?"dark":"light";
+try{
+switchTheme(newTheme);
+}
+catch(err){
+console.error(err);
+}
+}
+function onHamburgerIconClicked(){
+let hamburgerMenu=document.getElementById('hamburger-menu');
+if(!hamburgerMenu){
+showElemAccessErr('hamburger-icon');
+return;
+}
+if(hamburgerMenu.style.display==='none'||hamburgerMenu.style.display===''){
+hamburgerMenu.style.display='flex';
+}else{
+hamburgerMenu.style.display='none';
+}
+}
+const CURR_THEME=getPreferredTheme();
+switchTheme(CURR_THEME);
+})();
+return{}})();
+const __m2={"errors":{"outdatedBrowser":"Your browser is outdated and does not support some features of megacodist.com. Please update your browser.","errTryLater":"An unknown error occurred. Please try again later. If error persists, please contact support.","privateClassFieldsErr":"Private class fields are not supported in this browser. Please update your browser or enables them."}};
+const __m3=(()=>{
+const MSGS=__m2;
+function supportsPrivateFields(){
+try{
+class Test{
+#privateField=42;
+}
+}
+catch(error){
+if(error instanceof SyntaxError){
+alert(MSGS.errors.outdatedBrowser);
+console.error(MSGS.errors.privateClassFieldsErr);
+}
+else{
+alert(MSGS.errors.errTryLater);
+}
+throw error;
+}
+}
+return{supportsPrivateFields}})();
+const __m4=(()=>{
+const{supportsPrivateFields}=__m3;
+supportsPrivateFields();
+const{getCsrfToken,showAlert,showElemAccessErr,showError}=__m0;
+(function(){
+var _a;
+const STRS={
+START:'Start',
+STOP:'Stop',
+STOPPING:'Stopping...',
+LOWER_INT_MISSING:'Please enter the start integer.',
+UPPER_INT_MISSING:'Please enter the end integer.',
+BAD_INTERVAL:'Start integer must be less than the end integer.',
+CSRF_FAILURE:'Failed to read CSRF token',
+UNKNOWN_ERR:'An unknown error occurred: %s',
+CONNECTING:'Connecting to the endpoint %s/%s...',
+CONN_ESTABLISHED:'Connected to the end point',
+CONN_FAILED:'Failed to connect to the server.',
+MAX_RECONN_TRY_REACHED:'Failed to connect after multiple tries.',
+ACCESS_FAILED:'E2 - %s',
+};
+let randIntStream=null;
+class RandIntStream{
+static MAX_TRIES=10;
+#eventSource;
+#clientClosing;
+#nTry;
+#streamId;
+#onIntReceived;
+#onConnecting;
+#onConnSuccess;
+#onConnClosed;
+#onErrOccurred;
+constructor(endpoint,onIntReceived=(num)=>{},onConnecting=(n,max)=>{},onConnSuccess=()=>{},onConnClosed=()=>{},onErrOccurred=(msg)=>{}){
+this.#onIntReceived=onIntReceived;
+this.#onConnecting=onConnecting;
+this.#onConnSuccess=onConnSuccess;
+this.#onConnClosed=onConnClosed;
+this.#onErrOccurred=onErrOccurred;
+this.#clientClosing=false;
+this.#streamId=null;
+this.#nTry=1;
+this.#onConnecting(this.#nTry,_a.MAX_TRIES);
+try{
+this.#eventSource=new EventSource(endpoint);
+this.#eventSource.onmessage=this.#evsrcOnMsg.bind(this);
+this.#eventSource.onerror=this.#evsrcOnErr.bind(this);
+this.#eventSource.onopen=this.#evsrcOnOpen.bind(this);
+this.#eventSource.addEventListener('stream',this.#evsrcOnStream.bind(this));
+}
+catch(err){
+this.#onErrOccurred(err.toString());
+}
+}
+get streamId(){
+return this.#streamId;
+}
+close(req){
+this.#clientClosing=true;
+fetch(req)
+.then(response=>{
+if(!response.ok){
+return response.json().then(data=>new Error(this.#httpToStr(response.status,data.reason)));
+}
+this.#eventSource.close();
+this.#onConnClosed();
+})
+.catch(err=>{
+this.#onErrOccurred(err.toString());
+this.#clientClosing=false;
+});
+}
+#evsrcOnOpen(event){
+this.#onConnSuccess();
+}
+#evsrcOnMsg(event){
+this.#onIntReceived(event.data);
+}
+#evsrcOnStream(event){
+this.#streamId=event.data;
+}
+#evsrcOnErr(event){
+if(this.#eventSource.readyState===EventSource.CLOSED){
+if(this.#clientClosing){
+this.#onConnClosed();
+}
+else{
+this.#onErrOccurred('Something closed the connection');
+}
+this.#nTry=0;
+this.#eventSource.close();
+}
+else if(this.#eventSource.readyState===EventSource.CONNECTING){
+if(this.#nTry>=_a.MAX_TRIES){
+this.#onErrOccurred('failed to connect to the server');
+}
+else{
+this.#nTry++;
+this.#onConnecting(this.#nTry,_a.MAX_TRIES);
+}
+}
+else if(this.#eventSource.readyState==EventSource.OPEN){
+}
+}
+#httpToStr(code,msg){
+const HTTP_MSG='HTTP %s %s';
+return HTTP_MSG.replace('%s',code.toString()).replace('%s',msg);
+}
+toString(){
+return`<RandIntStream object endpoint=${this.#eventSource.url}>`;
+}
+}
+_a=RandIntStream;
+document.addEventListener('DOMContentLoaded',base_onDomLoaded);
+function base_onDomLoaded(){
+let startStopBtn=document.getElementById('start-stop');
+if(!startStopBtn){
+showElemAccessErr('start-stop');
+return;
+}
+startStopBtn.addEventListener('click',onStartStopClicked);
+}
+function onStartStopClicked(){
+const currState=document.getElementById('start-stop')?.textContent
+?.trim();
+if(currState===undefined){
+showElemAccessErr('start-stop');
+return;
+}
+if(currState===STRS.START){
+requestStreamStart();
+}
+else if(currState===STRS.STOP){
+requestStreamStop();
+}
+else{
+console.log(`expected '${STRS.START}' or '${STRS.STOP}' but got ${currState}`);
+}
+}
+function requestStreamStart(){
+let msg;
+let lowerInt=document.getElementById('start-int')?.value;
+if(lowerInt===undefined){
+showElemAccessErr('start-int');
+return;
+}
+if(lowerInt===''){
+showAlert(STRS.LOWER_INT_MISSING);
+return;
+}
+let upperInt=document.getElementById('end-int')?.value;
+if(upperInt===undefined){
+showElemAccessErr('end-int');
+return;
+}
+if(upperInt===''){
+showAlert(STRS.UPPER_INT_MISSING);
+return;
+}
+if(parseInt(lowerInt)>=parseInt(upperInt)){
+showAlert(STRS.BAD_INTERVAL);
+return;
+}
+clearRandData();
+const ENDPOINT=`/challenges/random-ints?lower-int=${lowerInt}&upper-int=${upperInt}`;
+randIntStream=new RandIntStream(ENDPOINT,updatePageIntReceived,updatePageConnecting,updatePageConnSuccess,updatePageConnClosed,updatePageErrOccurred);
+}
+async function requestStreamStop(){
+const data={
+'action':'stop',
+'stream':randIntStream?.streamId,
+};
+const csrfToken=getCsrfToken();
+if(csrfToken===null){
+showError(STRS.CSRF_FAILURE);
+return;
+}
+let stopStreamReq=new Request(window.location.href,
+{
+method:'POST',
+headers:{
+'Content-Type':'application/json',
+'X-CSRFToken':csrfToken,
+},
+body:JSON.stringify(data),
+});
+updatePageStoppingBtn();
+randIntStream.close(stopStreamReq);
+}
+function updatePageIntReceived(data){
+addRandInt(data);
+}
+function updatePageConnSuccess(){
+const startStopBtn=document.getElementById('start-stop');
+if(startStopBtn===null){
+showElemAccessErr('start-stop');
+return;
+}
+startStopBtn.textContent=STRS.STOP;
+startStopBtn.disabled=false;
+}
+function updatePageConnecting(n,max){
+const startStopBtn=document.getElementById('start-stop');
+if(startStopBtn===null){
+showElemAccessErr('start-stop');
+return;
+}
+startStopBtn.textContent=STRS.CONNECTING.replace('%s',n.toString())
+.replace('%s',max.toString());
+startStopBtn.disabled=true;
+}
+function updatePageConnFailed(err){
+showError(STRS.UNKNOWN_ERR.replace('%s',err));
+updatePageStartBtn();
+}
+function updatePageConnClosed(){
+updatePageStartBtn();
+}
+function updatePageErrOccurred(msg){
+showError(msg);
+updatePageStartBtn();
+}
+function updatePageStartBtn(){
+const startStopBtn=document.getElementById('start-stop');
+if(startStopBtn===null){
+showElemAccessErr('start-stop');
+return;
+}
+startStopBtn.textContent=STRS.START;
+startStopBtn.disabled=false;
+}
+function updatePageStoppingBtn(){
+const startStopBtn=document.getElementById('start-stop');
+if(startStopBtn===null){
+showElemAccessErr('start-stop');
+return;
+}
+startStopBtn.textContent=STRS.STOPPING;
+startStopBtn.disabled=true;
+}
+function addRandInt(num){
+const newData=document.createElement('div');
+newData.textContent=num;
+newData.className='rand-int';
+const randDataGrid=document.getElementById('rand-ints-grid');
+if(randDataGrid===null){
+showElemAccessErr('rand-ints-grid');
+return;
+}
+randDataGrid.prepend(newData);
+}
+function clearRandData(){
+const randDataGrid=document.getElementById('rand-ints-grid');
+if(randDataGrid===null){
+showElemAccessErr('rand-ints-grid');
+return;
+}
+randDataGrid.innerHTML='';
+}
+})();
+return{}})();
+//# sourceMappingURL=random-ints.js.map
@@ -3,25 +3,52 @@
 #
 
 import asyncio
+import itertools
 import json
 import logging
-from typing import AsyncGenerator
+import random
+from typing import Any, AsyncGenerator, Callable
+import weakref
+
+from django.conf import settings
 
-from django.core.cache import cache
 from django.http import (
-    HttpRequest, HttpResponse, StreamingHttpResponse, JsonResponse,)
+    HttpRequest, HttpResponse, QueryDict, StreamingHttpResponse,
+    JsonResponse,)
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 
 from celery import shared_task
-import redis
+import numpy as np
+
+from utils.funcs import toBool
+from .frames import (
+    HEARTBEAT, drawSeededBlock, getDtype, getFrameMaker, getSeededEncoder,
+    parseEventId,)
+from .hub import subscribe, unsubscribe
+from .pool import RUN_FRAMES, fillPool, isPoolEnabled, iterPooledFrames
+from .stats import RunningStats
+from .streams import (
+    admitStream, closeStream, countSent, getStreamStats, openStream,
+    stopStream,)
 
 
 _logger = logging.getLogger('megacodist')
 
-RAND_INT_STOPPED = 'RAND_INT_STREAM'
-"""The name of the cached varibales which controls the production of the
-stream of random integers.
+_DEFAULT_WAIT = 0.75
+"""The default number of seconds between frames of a stream."""
+
+_MAX_FRAME_RATE = 1_000
+"""The maximum number of frames per second of a stream. Higher rates of
+integers need bigger batches.
+"""
+
+_MAX_STATS_BINS = 1_000
+"""The maximum number of bins of histograms of statistics of streams."""
+
+_RETRY_AFTER = 5
+"""The number of seconds clients should wait before streaming again if
+their stream was not admitted.
 """
 
 
@@ -29,14 +56,43 @@ stream of random integers.
 async def play(request: HttpRequest) -> HttpResponse:
     """This view function does the following:
     1. Loads the page itself: Using a GET method with no query string.
+    2. Streams random integers: Using a GET method with `lower-int` and
+    `upper-int` in the query string. The first event of the stream is a
+    `stream` event whose data is the ID of the stream. Other events have
+    `id` fields, so a client that reconnects with `Last-Event-ID` resumes
+    the same sequence of integers after its last event. With
+    `broadcast=true` in the query string, the stream is served by the
+    broadcast hub, so all such streams of the same bounds receive the same
+    integers. These optional parameters of the query string shape the
+    stream:
+        * `batch`: the number of integers per event, 1 by default.
+        * `rate`: the number of integers per second. Without it, an event
+        is sent every 0.75 seconds.
+        * `format`: `text`, the default, sends integers separated by
+        commas. `binary` sends base64 of little-endian `int32` or `int64`
+        arrays, named by the event.
+        * `stats`: if true, `stats` events carry running statistics of the
+        stream since it connected, in JSON, every `stats-interval` seconds
+        (1 by default), with a histogram of `stats-bins` bins (10 by
+        default). Broadcast streams do not support it.
+    Streams are not admitted, with HTTP 503, if this worker or the client
+    has too many streams.
+    3. Stops a stream: Using a POST method with
+    `{'action': 'stop', 'stream': the ID of the stream}`.
     """
     if request.method == 'GET':
         match ('lower-int' in request.GET, 'upper-int' in request.GET):
             case (True, True,):
-                return await _startStreamingRandInts(
-                    request,
-                    int(request.GET['lower-int']),
-                    int(request.GET['upper-int']))
+                try:
+                    options = _getStreamOptions(request.GET)
+                except ValueError as err:
+                    return JsonResponse(
+                        {
+                            'status': 'error',
+                            'reason': str(err),
+                        },
+                        status=400,)
+                return await _startStreamingRandInts(request, **options)
             case (True, False,):
                 return JsonResponse(
                     {
@@ -72,7 +128,20 @@ async def play(request: HttpRequest) -> HttpResponse:
                 },
                 status=400,)
         if 'action' in data and data['action'] == 'stop':
-            _stopStreamingRandInts()
+            if not isinstance(data.get('stream'), str):
+                return JsonResponse(
+                    {
+                        'status': 'error',
+                        'reason': 'stream ID missing',
+                    },
+                    status=400,)
+            if not await _stopStreamingRandInts(data['stream']):
+                return JsonResponse(
+                    {
+                        'status': 'error',
+                        'reason': 'unknown stream',
+                    },
+                    status=404,)
             return JsonResponse(
                 {'status': 'ok',},
                 status=200,)
@@ -98,50 +167,267 @@ async def play(request: HttpRequest) -> HttpResponse:
                 status=400,)
 
 
+def _getStreamOptions(query: QueryDict) -> dict[str, Any]:
+    """Gets keyword arguments of `_startStreamingRandInts` from the query
+    string of a request to stream. Raises `ValueError` if they are not
+    valid.
+    """
+    try:
+        lower = int(query['lower-int'])
+        upper = int(query['upper-int'])
+        batch = int(query.get('batch', '1'))
+        rate = float(query['rate']) if 'rate' in query else None
+        statsInterval = float(query.get('stats-interval', '1'))
+        nBins = int(query.get('stats-bins', '10'))
+    except ValueError as err:
+        raise ValueError(f'invalid number: {err}') from None
+    format_ = query.get('format', 'text')
+    if format_ not in ('text', 'binary',):
+        raise ValueError(f'unknown format: {format_}')
+    # Checking bounds and batch...
+    getFrameMaker(lower, upper, batch, format_ == 'binary')
+    if rate is None:
+        wait = _DEFAULT_WAIT
+    elif not (0.0 < rate < float('inf')):
+        raise ValueError('rate must be a positive number')
+    elif rate > _MAX_FRAME_RATE * batch:
+        raise ValueError(
+            f'rate over {_MAX_FRAME_RATE} events per second, increase '
+            'batch')
+    else:
+        wait = batch / rate
+    broadcast = toBool(query.get('broadcast', 'false'))
+    if not toBool(query.get('stats', 'false')):
+        statsInterval = None
+    elif broadcast:
+        raise ValueError('statistics are not available for broadcast streams')
+    elif not (0.0 < statsInterval < float('inf')):
+        raise ValueError('stats interval must be a positive number')
+    elif not (1 <= nBins <= _MAX_STATS_BINS):
+        raise ValueError(f'stats bins must be from 1 to {_MAX_STATS_BINS}')
+    else:
+        # Checking bounds, which statistics need in 64 bits...
+        getDtype(lower, upper)
+    return {
+        'lower': lower,
+        'upper': upper,
+        'wait': wait,
+        'broadcast': broadcast,
+        'batch': batch,
+        'binary': format_ == 'binary',
+        'stats_interval': statsInterval,
+        'n_bins': nBins,}
+
+
 async def _startStreamingRandInts(
         request: HttpRequest,
         lower: int,
         upper: int,
-        wait: float = 0.75,
-        ) -> StreamingHttpResponse:
+        wait: float = _DEFAULT_WAIT,
+        broadcast: bool = False,
+        batch: int = 1,
+        binary: bool = False,
+        stats_interval: float | None = None,
+        n_bins: int = 10,
+        ) -> HttpResponse:
     """Returns a `StreamingHttpResponse` (response to a request to
-    establish an SSE connection) to produce random integers between `lower`
-    and `upper` at an interval of `wait` seconds.
+    establish an SSE connection) to produce frames of `batch` random
+    integers between `lower` and `upper` at an interval of `wait` seconds,
+    in binary if `binary` is true. If `broadcast` is true, the stream
+    subscribes to the broadcast hub instead of producing its own integers.
+    If `stats_interval` is given, running statistics of the stream, with
+    a histogram of `n_bins` bins, are sent every `stats_interval` seconds.
+    It returns HTTP 503 if the stream is not admitted.
     """
     # Declaring variables -----------------------------
-    import json
-    import random
-    import time
-    global RAND_INT_STOPPED
+    heartbeat = getattr(settings, 'RAND_INTS_HEARTBEAT', 15.0)
     # Function ----------------------------------------
+    release = admitStream(await _getClient(request))
+    if release is None:
+        resp = JsonResponse(
+            {
+                'status': 'error',
+                'reason': 'too many streams',
+            },
+            status=503,)
+        resp['Retry-After'] = str(_RETRY_AFTER)
+        return resp
+    #
     async def generator() -> AsyncGenerator[bytes, None]:
-        while not cache.get(RAND_INT_STOPPED):
-            randInt = random.randrange(lower, upper)
-            yield f'data: {randInt}\n\n'.encode()
-            await asyncio.sleep(wait)
-        cache.delete(RAND_INT_STOPPED)
-        _logger.debug('exiting the rand int generator.')
+        stats = None if stats_interval is None else \
+            RunningStats(lower, upper, n_bins)
+        frames = _iterFrames(
+            request,
+            lower,
+            upper,
+            batch,
+            binary,
+            stats and stats.update)
+        loop = asyncio.get_running_loop()
+        streamId, stopped = openStream()
+        _logger.info(f'rand int generator {streamId} started')
+        try:
+            yield f'event: stream\ndata: {streamId}\n\n'.encode()
+            nextTick = loop.time()
+            nextStats = nextTick
+            while not stopped.is_set():
+                yield await anext(frames)
+                if stats and loop.time() >= nextStats:
+                    yield stats.toEvent()
+                    nextStats = loop.time() + stats_interval # type: ignore
+                # Waiting for the next tick unless the stream is stopped,
+                # on schedule so the rate does not drift, with heartbeats
+                # if the wait is long...
+                nextTick = max(nextTick + wait, loop.time())
+                while nextTick - loop.time() > heartbeat:
+                    await _waitStop(stopped, loop.time() + heartbeat)
+                    if stopped.is_set():
+                        break
+                    yield HEARTBEAT
+                await _waitStop(stopped, nextTick)
+        finally:
+            closeStream(streamId)
+            await frames.aclose()
+            _logger.debug('exiting the rand int generator.')
+    #
+    async def broadcastGenerator() -> AsyncGenerator[bytes, None]:
+        subscription = subscribe(lower, upper, wait, batch, binary)
+        streamId, _ = openStream(subscription.close)
+        try:
+            yield f'event: stream\ndata: {streamId}\n\n'.encode()
+            async for frame in subscription:
+                yield frame
+        finally:
+            unsubscribe(subscription)
+            closeStream(streamId)
+    #
+    async def served(
+            frames: AsyncGenerator[bytes, None],
+            ) -> AsyncGenerator[bytes, None]:
+        # The ASGI handler cancels the stream as soon as the client
+        # disconnects, which ends `frames` too...
+        try:
+            async for frame in frames:
+                countSent(len(frame))
+                yield frame
+        finally:
+            release()
+            await frames.aclose()
     #
-    _logger.info('rand int generator started')
-    cache.set(RAND_INT_STOPPED, False,)
+    content = served(broadcastGenerator() if broadcast else generator())
+    # Releasing the place of streams that never start too...
+    weakref.finalize(content, release)
     sseResp = StreamingHttpResponse(
-        generator(),
+        content,
         content_type='text/event-stream',)
     sseResp['Cache-Control'] = 'no-cache' 
     return sseResp
 
 
-def _stopStreamingRandInts() -> None:
-    import inspect
-    currFrame = inspect.currentframe()
-    if currFrame:
-        funcName = currFrame.f_code.co_name
-        _logger.info(f'{funcName}() is called.')
-    else:
-        _logger.warning('failed to get the function name.')
-    cache.set(RAND_INT_STOPPED, True,)
+async def _getClient(request: HttpRequest) -> str:
+    """Gets the client of `request` whose streams are counted together: its
+    session if it exists in the session store, otherwise its address. The
+    session cookie alone is not trusted, as clients can make up a new one
+    for every request.
+    """
+    session = getattr(request, 'session', None)
+    if session is not None and session.session_key and \
+            await session.aexists(session.session_key):
+        return f'session:{session.session_key}'
+    return f'address:{request.META.get("REMOTE_ADDR", "")}'
+
+
+async def _waitStop(stopped: asyncio.Event, deadline: float) -> None:
+    """Waits until `stopped` is set or the loop time reaches `deadline`."""
+    try:
+        async with asyncio.timeout_at(deadline):
+            await stopped.wait()
+    except TimeoutError:
+        pass
+
+
+def _iterFrames(
+        request: HttpRequest,
+        lower: int,
+        upper: int,
+        batch: int,
+        binary: bool,
+        observe: Callable[[np.ndarray], None] | None = None,
+        ) -> AsyncGenerator[bytes, None]:
+    """Iterates frames of a stream. The stream resumes the stream of
+    `Last-Event-ID` header of `request`, if any, and drains the pool of its
+    range if pools are enabled. If `observe` is given, it is called with
+    the integers of every frame.
+    """
+    resumed = None
+    lastEventId = request.headers.get('Last-Event-ID')
+    if lastEventId:
+        try:
+            resumed = parseEventId(lastEventId)
+        except ValueError as err:
+            _logger.warning(f'failed to resume a rand int stream: {err}')
+    # Frames past runs are not of pools, so such streams are resumed
+    # without pools...
+    if isPoolEnabled(lower, upper, batch) and \
+            (resumed is None or resumed[1] < RUN_FRAMES):
+        return iterPooledFrames(
+            lower,
+            upper,
+            batch,
+            binary,
+            resumed,
+            observe)
+    return _iterUnpooledFrames(
+        lower,
+        upper,
+        batch,
+        binary,
+        resumed,
+        observe)
+
+
+async def _iterUnpooledFrames(
+        lower: int,
+        upper: int,
+        batch: int,
+        binary: bool,
+        resumed: tuple[int, int] | None,
+        observe: Callable[[np.ndarray], None] | None,
+        ) -> AsyncGenerator[bytes, None]:
+    seed, seq = resumed or (random.getrandbits(63), -1,)
+    try:
+        encode = getSeededEncoder(lower, upper, binary)
+    except ValueError:
+        # Integers beyond 64 bits cannot be seeded, so the stream cannot
+        # be resumed...
+        makeFrame = getFrameMaker(lower, upper, batch, binary)
+        while True:
+            yield makeFrame()
+    for seq in itertools.count(seq + 1):
+        block = drawSeededBlock(lower, upper, seed, seq, batch)
+        if observe:
+            observe(block)
+        yield encode(seed, seq, block)
+
+
+@require_http_methods(['GET',])
+async def getStats(request: HttpRequest) -> JsonResponse:
+    """Returns gauges of streams of random integers of this worker."""
+    return JsonResponse(getStreamStats())
+
+
+async def _stopStreamingRandInts(stream_id: str) -> bool:
+    """Stops the stream of random integers with `stream_id`. It returns
+    `False` if there is no such stream.
+    """
+    _logger.info(f'stopping rand int generator {stream_id}')
+    return await stopStream(stream_id)
 
 
 @shared_task
-def generateRandomData() -> None:
-    pass
+def generateRandomData(lower: int, upper: int, batch: int = 1) -> int:
+    """Fills the pool of frames of `batch` random integers between `lower`
+    and `upper` up to its target size and returns the number of runs
+    added. Streams schedule it when pools run low.
+    """
+    return fillPool(lower, upper, batch)
@@ -0,0 +1,159 @@
+#
+# 
+#
+"""This module offers the SSE frames of streams of random integers. A
+frame carries a batch of integers in one of these formats:
+
+* text: `data: 7,3,9\\n\\n`, the integers separated by commas. A batch
+of one integer is the original frame of the stream, `data: 7\\n\\n`.
+* binary: `event: int32\\ndata: ...\\n\\n`, or the same with `int64`,
+the base64 of the little-endian array of integers whose type is the name
+of the event. `int32` is used if the bounds allow.
+
+Batches are drawn at once by a NumPy `Generator`. Frames of seeded
+streams are drawn by a counter-based Philox generator whose counter is
+the sequence number of the frame, so any frame of a stream can be made
+again without replaying the frames before it. Their `id` field, of the
+form `seed:sequence`, lets a reconnecting client resume the stream.
+"""
+
+from __future__ import annotations
+import base64
+import random
+from typing import Callable
+
+import numpy as np
+
+
+MAX_BATCH = 1 << 16
+"""The maximum number of integers in a frame."""
+
+HEARTBEAT = b': heartbeat\n\n'
+"""The SSE comment idle streams send to keep connections alive."""
+
+_INT32 = np.iinfo(np.int32)
+_INT64 = np.iinfo(np.int64)
+
+
+def getFrameMaker(
+        lower: int,
+        upper: int,
+        batch: int = 1,
+        binary: bool = False,
+        ) -> Callable[[], bytes]:
+    """Gets a function that makes a frame of `batch` random integers
+    between `lower` (inclusive) and `upper` (exclusive). Raises
+    `ValueError` if arguments are not valid.
+    """
+    if lower >= upper:
+        raise ValueError('lower bound must be less than upper bound')
+    if not (1 <= batch <= MAX_BATCH):
+        raise ValueError(f'batch must be from 1 to {MAX_BATCH}')
+    if batch == 1 and not binary:
+        # Python integers support any bounds...
+        return lambda: f'data: {random.randrange(lower, upper)}\n\n'.encode()
+    dtype = getDtype(lower, upper)
+    rng = np.random.default_rng()
+    encode = _getEncoder(dtype, binary)
+    def makeFrame() -> bytes:
+        return encode(rng.integers(lower, upper, size=batch, dtype=dtype))
+    return makeFrame
+
+
+def getSeededFrameMaker(
+        lower: int,
+        upper: int,
+        seed: int,
+        batch: int = 1,
+        binary: bool = False,
+        ) -> Callable[[int], bytes]:
+    """Gets a function that makes the frame of a sequence number in the
+    stream with `seed`, the frame of `batch` random integers between
+    `lower` (inclusive) and `upper` (exclusive). Making a frame costs the
+    same whatever its sequence number. Raises `ValueError` if arguments
+    are not valid.
+    """
+    if lower >= upper:
+        raise ValueError('lower bound must be less than upper bound')
+    if not (1 <= batch <= MAX_BATCH):
+        raise ValueError(f'batch must be from 1 to {MAX_BATCH}')
+    if not (0 <= seed <= _INT64.max):
+        raise ValueError('seed must be a non-negative 64-bit integer')
+    encode = getSeededEncoder(lower, upper, binary)
+    def makeFrame(seq: int) -> bytes:
+        return encode(
+            seed,
+            seq,
+            drawSeededBlock(lower, upper, seed, seq, batch))
+    return makeFrame
+
+
+def drawSeededBlock(
+        lower: int,
+        upper: int,
+        seed: int,
+        seq: int,
+        batch: int,
+        ) -> np.ndarray:
+    """Draws the block of integers of the frame `seq` of the stream with
+    `seed`.
+    """
+    # The high words of the counter select the frame, the low word counts
+    # the blocks drawn for it...
+    rng = np.random.Generator(
+        np.random.Philox(counter=[0, seq, 0, 0], key=seed))
+    return rng.integers(
+        lower,
+        upper,
+        size=batch,
+        dtype=getDtype(lower, upper))
+
+
+def getSeededEncoder(
+        lower: int,
+        upper: int,
+        binary: bool = False,
+        ) -> Callable[[int, int, np.ndarray], bytes]:
+    """Gets a function that encodes the block of integers of the frame
+    `seq` of the stream with `seed` as the frame, called with `seed`,
+    `seq` and the block.
+    """
+    encode = _getEncoder(getDtype(lower, upper), binary)
+    def encodeFrame(seed: int, seq: int, block: np.ndarray) -> bytes:
+        return f'id: {seed}:{seq}\n'.encode() + encode(block)
+    return encodeFrame
+
+
+def parseEventId(event_id: str) -> tuple[int, int]:
+    """Parses the `id` field of a frame of a seeded stream into its seed
+    and sequence number. Raises `ValueError` if it is not valid.
+    """
+    seed, sep, seq = event_id.partition(':')
+    if not (sep and seed.isdigit() and seq.isdigit()):
+        raise ValueError(f'invalid event ID: {event_id!r}')
+    if max(int(seed), int(seq)) > _INT64.max:
+        raise ValueError(f'event ID out of range: {event_id!r}')
+    return int(seed), int(seq)
+
+
+def getDtype(lower: int, upper: int) -> np.dtype:
+    """Gets the smallest little-endian type of integers between `lower`
+    and `upper`. Raises `ValueError` if they do not fit in 64 bits.
+    """
+    if _INT32.min <= lower and upper - 1 <= _INT32.max:
+        return np.dtype('<i4')
+    elif _INT64.min <= lower and upper - 1 <= _INT64.max:
+        return np.dtype('<i8')
+    raise ValueError('bounds of batches must fit in 64-bit integers')
+
+
+def _getEncoder(
+        dtype: np.dtype,
+        binary: bool,
+        ) -> Callable[[np.ndarray], bytes]:
+    if binary:
+        header = f'event: int{8 * dtype.itemsize}\ndata: '.encode()
+        return lambda block: (
+            header + base64.b64encode(block.tobytes()) + b'\n\n')
+    return lambda block: (
+        f"data: {','.join(map(str, block.tolist()))}\n\n".encode())
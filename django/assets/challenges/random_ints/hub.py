@@ -0,0 +1,182 @@
+#
+# 
+#
+"""This module offers the broadcast hub of random integers. All streams
+of the same `(lower, upper, interval, batch, binary)` channel are served by
+one producer which draws every batch once and encodes its frame once.
+
+Subscribers do not have queues of their own. The channel keeps the last
+`_BACKLOG` frames, every subscriber keeps a cursor into them, and all
+subscribers wait on one future per tick. So a tick costs the producer the
+same however many subscribers there are, and a subscriber that does not
+keep up holds no memory: it skips the frames that left the backlog, and
+it is dropped once it has skipped more than `_MAX_SKIPPED` frames.
+
+Channels with ticks longer than the `RAND_INTS_HEARTBEAT` setting send
+heartbeats between frames.
+"""
+
+from __future__ import annotations
+import asyncio
+from collections import deque
+import logging
+
+from django.conf import settings
+
+from .frames import HEARTBEAT, getFrameMaker
+
+
+_logger = logging.getLogger('megacodist')
+
+_BACKLOG = 8
+"""The number of last frames a channel keeps for slow subscribers."""
+
+_MAX_SKIPPED = 4 * _BACKLOG
+"""The number of frames a subscriber may skip before it is dropped."""
+
+_channels = dict[tuple[int, int, float, int, bool], '_Channel']()
+"""The mapping of `(lower, upper, interval, batch, binary)` to channels
+with subscribers.
+"""
+
+
+class Subscription:
+    """The cursor of a subscriber into the frames of a channel. It is an
+    asynchronous iterator of frames which ends when the subscription is
+    closed.
+    """
+    __slots__ = ('_channel', '_next', '_nSkipped', 'closed',)
+
+    def __init__(self, channel: _Channel) -> None:
+        self._channel = channel
+        self._next = channel._seq
+        """The sequence number of the next frame of the subscriber."""
+        self._nSkipped = 0
+        """The number of frames the subscriber has skipped."""
+        self.closed = False
+        """Whether the subscription has ended, by the subscriber or by
+        being dropped.
+        """
+
+    def __aiter__(self) -> Subscription:
+        return self
+
+    async def __anext__(self) -> bytes:
+        channel = self._channel
+        while self._next >= channel._seq and not self.closed:
+            await channel._waitTick()
+        if self.closed:
+            raise StopAsyncIteration
+        # Skipping frames that have left the backlog...
+        oldest = channel._seq - len(channel._frames)
+        if self._next < oldest:
+            self._nSkipped += oldest - self._next
+            self._next = oldest
+            if self._nSkipped > _MAX_SKIPPED:
+                _logger.info('dropping a lagging random ints subscriber')
+                self.closed = True
+                raise StopAsyncIteration
+        frame = channel._frames[self._next - oldest]
+        self._next += 1
+        return frame
+
+    def close(self) -> None:
+        """Ends the subscription."""
+        self.closed = True
+        # Waking subscribers up, so this one notices it is closed...
+        self._channel._tick()
+
+
+class _Channel:
+    def __init__(
+            self,
+            lower: int,
+            upper: int,
+            interval: float,
+            batch: int,
+            binary: bool,
+            ) -> None:
+        self._key = (lower, upper, interval, batch, binary,)
+        self._makeFrame = getFrameMaker(lower, upper, batch, binary)
+        self._frames = deque[bytes](maxlen=_BACKLOG)
+        self._seq = 0
+        """The sequence number of the next frame."""
+        self._nSubscribers = 0
+        self._loop = asyncio.get_running_loop()
+        self._ticker = self._loop.create_future()
+        """The future that is done on the next tick."""
+        self._producer = self._loop.create_task(self._produce())
+
+    async def _produce(self) -> None:
+        interval = self._key[2]
+        heartbeat = getattr(settings, 'RAND_INTS_HEARTBEAT', 15.0)
+        nextTick = self._loop.time()
+        while self._nSubscribers:
+            self._publish(self._makeFrame())
+            # Keeping ticks on schedule however long waking up takes...
+            nextTick = max(nextTick + interval, self._loop.time())
+            while nextTick - self._loop.time() > heartbeat:
+                await asyncio.sleep(heartbeat)
+                self._publish(HEARTBEAT)
+            await asyncio.sleep(nextTick - self._loop.time())
+        self._remove()
+
+    def _publish(self, frame: bytes) -> None:
+        self._frames.append(frame)
+        self._seq += 1
+        self._tick()
+
+    def _tick(self) -> None:
+        """Wakes all subscribers up."""
+        ticker, self._ticker = self._ticker, self._loop.create_future()
+        if not ticker.done():
+            ticker.set_result(None)
+
+    async def _waitTick(self) -> None:
+        try:
+            await self._ticker
+        except asyncio.CancelledError:
+            # A cancelled subscriber cancels the shared future too, which
+            # must not end other subscribers...
+            if asyncio.current_task().cancelling(): # type: ignore
+                raise
+            if self._ticker.cancelled():
+                self._ticker = self._loop.create_future()
+
+    def _remove(self) -> None:
+        if _channels.get(self._key) is self:
+            del _channels[self._key]
+
+
+def subscribe(
+        lower: int,
+        upper: int,
+        interval: float,
+        batch: int = 1,
+        binary: bool = False,
+        ) -> Subscription:
+    """Subscribes to the channel of frames of `batch` random integers
+    between `lower` and `upper` produced every `interval` seconds. The
+    subscriber must call `unsubscribe` when it ends. Raises `ValueError` if
+    arguments are not valid for frames.
+    """
+    key = (lower, upper, interval, batch, binary,)
+    channel = _channels.get(key)
+    if channel is None or channel._producer.done() or \
+            channel._loop is not asyncio.get_running_loop():
+        channel = _Channel(lower, upper, interval, batch, binary)
+        _channels[key] = channel
+    channel._nSubscribers += 1
+    return Subscription(channel)
+
+
+def unsubscribe(subscription: Subscription) -> None:
+    """Ends `subscription`. The producer of its channel stops with its last
+    subscriber.
+    """
+    channel = subscription._channel
+    subscription.closed = True
+    channel._nSubscribers -= 1
+    if channel._nSubscribers == 0:
+        channel._producer.cancel()
+        channel._remove()
@@ -0,0 +1,232 @@
+#
+# 
+#
+"""This module offers pools of pre-generated random integers, so streams
+do not draw them on the event loop of the web worker.
+
+A pool is a Redis list of runs for a `(lower, upper, batch)` range. A run
+is the blocks of integers of frames `0` to `RUN_FRAMES - 1` of a seeded
+stream, exactly as `frames.drawSeededBlock` draws them, so frames of runs
+can be resumed by `Last-Event-ID` like any seeded frame. A stream chains
+runs of different seeds and draws a run itself if the pool is empty.
+
+The `generateRandomData` Celery task keeps pools filled up to the
+`RAND_INTS_POOL_SIZE` setting. Pools are enabled if it is positive and
+the `RAND_INTS_REDIS_URL` setting is set, only for the ranges of the
+`RAND_INTS_POOL_RANGES` setting, so clients cannot make pools of any
+range they stream; Redis keeps at most `_MAX_POOL_BYTES` per range.
+"""
+
+from __future__ import annotations
+import asyncio
+import logging
+import random
+from typing import AsyncGenerator, Callable, Iterable, Iterator
+import weakref
+
+from django.conf import settings
+
+from kombu.exceptions import OperationalError
+import numpy as np
+import redis
+import redis.asyncio
+
+from .frames import drawSeededBlock, getDtype, getSeededEncoder
+
+
+_logger = logging.getLogger('megacodist')
+
+RUN_FRAMES = 16
+"""The number of frames of a run."""
+
+_MAX_POOL_BYTES = 16 << 20
+"""The maximum number of bytes of integers of a pool, which limits pools
+of big batches to fewer runs.
+"""
+
+_POOL_TIMEOUT = 3600
+"""The number of seconds a pool is kept after it was last filled."""
+
+_REFILL_TIMEOUT = 60
+"""The number of seconds a scheduled refill of a pool blocks scheduling
+other refills of it.
+"""
+
+_asyncClients = weakref.WeakKeyDictionary[
+    asyncio.AbstractEventLoop,
+    redis.asyncio.Redis]()
+"""The mapping of event loops to their Redis clients."""
+
+
+def isPoolEnabled(lower: int, upper: int, batch: int) -> bool:
+    """Determines whether streams of frames of `batch` integers between
+    `lower` and `upper` drain pools.
+    """
+    if getattr(settings, 'RAND_INTS_POOL_SIZE', 0) <= 0 or \
+            not getattr(settings, 'RAND_INTS_REDIS_URL', None):
+        return False
+    poolRanges = getattr(settings, 'RAND_INTS_POOL_RANGES', ())
+    if (lower, upper, batch,) not in {tuple(rng) for rng in poolRanges}:
+        return False
+    try:
+        getDtype(lower, upper)
+    except ValueError:
+        return False
+    return True
+
+
+def getPoolKey(lower: int, upper: int, batch: int) -> str:
+    """Gets the Redis key of the pool of a range."""
+    return f'random-ints:pool:{lower}:{upper}:{batch}'
+
+
+def getPoolSize(lower: int, upper: int, batch: int) -> int:
+    """Gets the target number of runs of the pool of a range."""
+    runBytes = RUN_FRAMES * batch * getDtype(lower, upper).itemsize
+    return max(
+        1,
+        min(settings.RAND_INTS_POOL_SIZE, _MAX_POOL_BYTES // runBytes))
+
+
+def makeRun(lower: int, upper: int, batch: int, seed: int) -> bytes:
+    """Makes the run of the stream with `seed`: the seed as a 64-bit
+    little-endian integer followed by the blocks of its frames.
+    """
+    return seed.to_bytes(8, 'little') + b''.join(
+        drawSeededBlock(lower, upper, seed, seq, batch).tobytes()
+        for seq in range(RUN_FRAMES))
+
+
+def loadRun(
+        data: bytes,
+        lower: int,
+        upper: int,
+        batch: int,
+        ) -> tuple[int, np.ndarray]:
+    """Loads the seed and the blocks of frames of a run made by
+    `makeRun`. Raises `ValueError` if `data` is not such a run.
+    """
+    dtype = getDtype(lower, upper)
+    if len(data) != 8 + RUN_FRAMES * batch * dtype.itemsize:
+        raise ValueError('invalid size of run')
+    blocks = np.frombuffer(data, dtype, offset=8)
+    return (
+        int.from_bytes(data[:8], 'little'),
+        blocks.reshape(RUN_FRAMES, batch),)
+
+
+def fillPool(lower: int, upper: int, batch: int) -> int:
+    """Fills the pool of a range up to its target size and returns the
+    number of runs added. Ranges whose pools are not enabled are not
+    filled.
+    """
+    if not isPoolEnabled(lower, upper, batch):
+        return 0
+    key = getPoolKey(lower, upper, batch)
+    with redis.Redis.from_url(settings.RAND_INTS_REDIS_URL) as client:
+        try:
+            nMissing = getPoolSize(lower, upper, batch) - client.llen(key)
+            if nMissing > 0:
+                client.rpush(key, *(
+                    makeRun(lower, upper, batch, random.getrandbits(63))
+                    for _ in range(nMissing)))
+            client.expire(key, _POOL_TIMEOUT)
+        finally:
+            client.delete(f'{key}:refilling')
+    return max(nMissing, 0)
+
+
+async def takeRun(
+        lower: int,
+        upper: int,
+        batch: int,
+        ) -> tuple[int, np.ndarray] | None:
+    """Takes a run from the pool of a range and schedules refilling the
+    pool if it is running low. It returns `None` if the pool is empty or
+    not available.
+    """
+    key = getPoolKey(lower, upper, batch)
+    client = _getAsyncClient()
+    try:
+        async with client.pipeline(transaction=False) as pipe:
+            data, nLeft = await pipe.lpop(key).llen(key).execute()
+        if nLeft < getPoolSize(lower, upper, batch) // 2 + 1 and \
+                await client.set(
+                    f'{key}:refilling',
+                    1,
+                    nx=True,
+                    ex=_REFILL_TIMEOUT):
+            await _scheduleRefill(lower, upper, batch)
+    except redis.RedisError as err:
+        _logger.warning(f'failed to take a run of random ints: {err}')
+        return None
+    if data is None:
+        return None
+    try:
+        return loadRun(data, lower, upper, batch)
+    except ValueError as err:
+        _logger.warning(f'failed to load a run of random ints: {err}')
+        return None
+
+
+async def iterPooledFrames(
+        lower: int,
+        upper: int,
+        batch: int,
+        binary: bool,
+        resumed: tuple[int, int] | None = None,
+        observe: Callable[[np.ndarray], None] | None = None,
+        ) -> AsyncGenerator[bytes, None]:
+    """Iterates frames of runs of the pool of a range. If `resumed` is
+    the seed and the sequence number of the last frame a client received,
+    the rest of its run is drawn first, so it must be a frame of a run.
+    If `observe` is given, it is called with the integers of every frame.
+    """
+    encode = getSeededEncoder(lower, upper, binary)
+    def drawRun(seed: int, start: int = 0) -> Iterator[np.ndarray]:
+        for seq in range(start, RUN_FRAMES):
+            yield drawSeededBlock(lower, upper, seed, seq, batch)
+    def encodeRun(
+            seed: int,
+            blocks: Iterable[np.ndarray],
+            start: int = 0,
+            ) -> Iterator[bytes]:
+        for seq, block in enumerate(blocks, start):
+            if observe:
+                observe(block)
+            yield encode(seed, seq, block)
+    if resumed:
+        seed, seq = resumed
+        for frame in encodeRun(seed, drawRun(seed, seq + 1), seq + 1):
+            yield frame
+    while True:
+        run = await takeRun(lower, upper, batch)
+        if run is None:
+            seed = random.getrandbits(63)
+            blocks = drawRun(seed)
+        else:
+            seed, blocks = run
+        for frame in encodeRun(seed, blocks):
+            yield frame
+
+
+async def _scheduleRefill(lower: int, upper: int, batch: int) -> None:
+    # Declaring variables ---------------------------------
+    from .backend import generateRandomData
+    # Functioning -----------------------------------------
+    try:
+        # Sending a task may block on the broker...
+        await asyncio.to_thread(generateRandomData.delay, lower, upper, batch)
+    except OperationalError as err:
+        _logger.warning(f'failed to schedule refilling random ints: {err}')
+
+
+def _getAsyncClient() -> redis.asyncio.Redis:
+    """Gets the Redis client of the running event loop."""
+    loop = asyncio.get_running_loop()
+    try:
+        return _asyncClients[loop]
+    except KeyError:
+        client = redis.asyncio.Redis.from_url(settings.RAND_INTS_REDIS_URL)
+        _asyncClients[loop] = client
+        return client
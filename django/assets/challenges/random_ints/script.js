@@ -45,6 +45,11 @@ import { getCsrfToken, showAlert, showElemAccessErr, showError } from '/assets/s
          * the server.
          */
         #nTry;
+        /**
+         * @type {string | null} The ID of the stream which the server sends in
+         * the `stream` event. It is needed to stop the stream.
+         */
+        #streamId;
         #onIntReceived;
         #onConnecting;
         #onConnSuccess;
@@ -62,6 +67,7 @@ import { getCsrfToken, showAlert, showElemAccessErr, showError } from '/assets/s
             this.#onErrOccurred = onErrOccurred;
             // Connecting...
             this.#clientClosing = false;
+            this.#streamId = null;
             this.#nTry = 1;
             this.#onConnecting(this.#nTry, _a.MAX_TRIES);
             try {
@@ -69,12 +75,19 @@ import { getCsrfToken, showAlert, showElemAccessErr, showError } from '/assets/s
                 this.#eventSource.onmessage = this.#evsrcOnMsg.bind(this);
                 this.#eventSource.onerror = this.#evsrcOnErr.bind(this);
                 this.#eventSource.onopen = this.#evsrcOnOpen.bind(this);
+                this.#eventSource.addEventListener('stream', this.#evsrcOnStream.bind(this));
             }
             catch (err) {
                 // @ts-ignore
                 this.#onErrOccurred(err.toString());
             }
         }
+        /**
+         * @type {string | null} The ID of the stream, if it has been received.
+         */
+        get streamId() {
+            return this.#streamId;
+        }
         /**
          * Closes connection to the endpoint by sending the `req` AJAX request.
          * @param {Request} req
@@ -115,6 +128,15 @@ import { getCsrfToken, showAlert, showElemAccessErr, showError } from '/assets/s
         #evsrcOnMsg(event) {
             this.#onIntReceived(event.data);
         }
+        /**
+         * Keeps the ID of the stream, which changes if the `EventSource`
+         * reconnects.
+         * @param {MessageEvent} event
+         * @returns {void}
+         */
+        #evsrcOnStream(event) {
+            this.#streamId = event.data;
+        }
         /**
          *
          * @param {Event} event
@@ -238,6 +260,7 @@ import { getCsrfToken, showAlert, showElemAccessErr, showError } from '/assets/s
         // Creating the POST request...
         const data = {
             'action': 'stop',
+            'stream': randIntStream?.streamId,
         };
         const csrfToken = getCsrfToken();
         if (csrfToken === null) {
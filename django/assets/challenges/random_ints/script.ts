@@ -54,6 +54,11 @@ import {
        * the server.
        */
       #nTry: number;
+      /**
+       * @type {string | null} The ID of the stream which the server sends in
+       * the `stream` event. It is needed to stop the stream.
+       */
+      #streamId: string | null;
       #onIntReceived: (num: string) => void;
       #onConnecting: (n: number, max: number) => void;
       #onConnSuccess: () => void;
@@ -79,6 +84,7 @@ import {
          this.#onErrOccurred = onErrOccurred;
          // Connecting...
          this.#clientClosing = false;
+         this.#streamId = null;
          this.#nTry = 1;
          this.#onConnecting(this.#nTry, RandIntStream.MAX_TRIES);
          try {
@@ -86,12 +92,22 @@ import {
             this.#eventSource.onmessage = this.#evsrcOnMsg.bind(this);
             this.#eventSource.onerror = this.#evsrcOnErr.bind(this);
             this.#eventSource.onopen = this.#evsrcOnOpen.bind(this);
+            this.#eventSource.addEventListener(
+               'stream',
+               this.#evsrcOnStream.bind(this));
          } catch(err: unknown) {
             // @ts-ignore
             this.#onErrOccurred(err.toString());
          }
       }
    
+      /**
+       * @type {string | null} The ID of the stream, if it has been received.
+       */
+      get streamId(): string | null {
+         return this.#streamId;
+      }
+   
       /**
        * Closes connection to the endpoint by sending the `req` AJAX request.
        * @param {Request} req 
@@ -139,6 +155,17 @@ import {
       }
    
    
+      /**
+       * Keeps the ID of the stream, which changes if the `EventSource`
+       * reconnects.
+       * @param {MessageEvent} event 
+       * @returns {void}
+       */
+      #evsrcOnStream(event: MessageEvent): void {
+         this.#streamId = event.data;
+      }
+   
+   
       /**
        * 
        * @param {Event} event 
@@ -280,6 +307,7 @@ import {
       // Creating the POST request...
       const data = {
          'action': 'stop',
+         'stream': randIntStream?.streamId,
       }
       const csrfToken = getCsrfToken();
       if (csrfToken === null) {
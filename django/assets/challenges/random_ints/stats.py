@@ -0,0 +1,84 @@
+#
+# 
+#
+"""This module offers running statistics of streams of random integers,
+which streams send as `stats` events so clients do not aggregate
+integers themselves.
+"""
+
+from __future__ import annotations
+import json
+from typing import Any
+
+import numpy as np
+
+
+class RunningStats:
+    """The running statistics of integers between `lower` (inclusive) and
+    `upper` (exclusive): count, mean, variance, min, max and a histogram
+    of `n_bins` equal bins. Updating them costs O(1) per integer: the
+    mean and variance of a block are computed at once and merged by the
+    pairwise form of Welford's method.
+    """
+    __slots__ = (
+        '_lower', '_upper', '_scale', 'count', 'mean', '_m2', 'min', 'max',
+        'histogram',)
+
+    def __init__(self, lower: int, upper: int, n_bins: int = 10) -> None:
+        if lower >= upper:
+            raise ValueError('lower bound must be less than upper bound')
+        if n_bins < 1:
+            raise ValueError('number of bins must be positive')
+        self._lower = lower
+        self._upper = upper
+        self._scale = n_bins / (upper - lower)
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        """The sum of squared differences from the mean."""
+        self.min: int | None = None
+        self.max: int | None = None
+        self.histogram = np.zeros(n_bins, np.int64)
+        """The counts of integers in the bins."""
+
+    @property
+    def variance(self) -> float:
+        """The sample variance of integers."""
+        return self._m2 / (self.count - 1) if self.count > 1 else 0.0
+
+    def update(self, block: np.ndarray) -> None:
+        """Adds integers of `block` to the statistics."""
+        if not len(block):
+            return
+        values = block.astype(np.float64)
+        nBlock = len(values)
+        blockMean = float(values.mean())
+        blockM2 = float(np.square(values - blockMean).sum())
+        # Merging the mean and the variance of the block...
+        nTotal = self.count + nBlock
+        delta = blockMean - self.mean
+        self.mean += delta * nBlock / nTotal
+        self._m2 += blockM2 + delta * delta * self.count * nBlock / nTotal
+        self.count = nTotal
+        blockMin = int(block.min())
+        blockMax = int(block.max())
+        self.min = blockMin if self.min is None else min(self.min, blockMin)
+        self.max = blockMax if self.max is None else max(self.max, blockMax)
+        nBins = len(self.histogram)
+        bins = ((values - self._lower) * self._scale).astype(np.int64)
+        np.clip(bins, 0, nBins - 1, out=bins)
+        self.histogram += np.bincount(bins, minlength=nBins)
+
+    def toDict(self) -> dict[str, Any]:
+        """Gets the statistics as a JSON-serializable dictionary."""
+        return {
+            'count': self.count,
+            'mean': self.mean,
+            'variance': self.variance,
+            'min': self.min,
+            'max': self.max,
+            'histogram': self.histogram.tolist(),}
+
+    def toEvent(self) -> bytes:
+        """Gets the `stats` SSE event of the statistics."""
+        return f'event: stats\ndata: {json.dumps(self.toDict())}\n\n'.encode()
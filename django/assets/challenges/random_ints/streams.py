@@ -0,0 +1,180 @@
+#
+# 
+#
+"""This module offers admission and cancellation of streams of random
+integers. Every stream has its own ID and an `asyncio.Event` which is set
+to stop it, so stopping a stream neither affects other streams nor makes
+streams poll anything.
+
+A worker admits at most `RAND_INTS_MAX_STREAMS` streams, and at most
+`RAND_INTS_MAX_CLIENT_STREAMS` streams of one client. Gauges of streams
+of the worker are available by `getStreamStats`.
+
+A stop request can reach a worker other than the one serving the stream.
+If the `RAND_INTS_REDIS_URL` setting is set, such requests are published
+on a Redis channel which every worker listens to.
+"""
+
+from __future__ import annotations
+import asyncio
+from collections import Counter
+import logging
+from typing import Callable
+import uuid
+
+from django.conf import settings
+
+import redis.asyncio
+
+
+_logger = logging.getLogger('megacodist')
+
+STOP_CHANNEL = 'random-ints:stop'
+"""The Redis channel that IDs of streams to stop are published on."""
+
+_RETRY_DELAY = 1.0
+"""The number of seconds to wait before listening to stop requests again
+after the connection to Redis failed.
+"""
+
+_events = dict[str, asyncio.Event]()
+"""The mapping of IDs of streams served by this worker to their stop
+events.
+"""
+
+_onStops = dict[str, Callable[[], None]]()
+"""The mapping of IDs of streams to the callbacks that are called when
+they are stopped.
+"""
+
+_listener: asyncio.Task | None = None
+"""The task that listens to stop requests of other workers."""
+
+_clients = Counter[str]()
+"""The mapping of clients to the numbers of their admitted streams."""
+
+_stats = {
+    'admitted_streams': 0,
+    'rejected_streams': 0,
+    'bytes_sent': 0,}
+"""The counters of streams of this worker since it started."""
+
+
+def admitStream(client: str) -> Callable[[], None] | None:
+    """Admits a new stream of `client` and returns the function that
+    releases its place when it ends, which may be called more than once.
+    It returns `None` if this worker or `client` has too many streams.
+    """
+    maxStreams = getattr(settings, 'RAND_INTS_MAX_STREAMS', 1_000)
+    maxClientStreams = getattr(settings, 'RAND_INTS_MAX_CLIENT_STREAMS', 8)
+    if _clients.total() >= maxStreams or \
+            _clients[client] >= maxClientStreams:
+        _stats['rejected_streams'] += 1
+        return None
+    _clients[client] += 1
+    _stats['admitted_streams'] += 1
+    released = False
+    def release() -> None:
+        nonlocal released
+        if released:
+            return
+        released = True
+        _clients[client] -= 1
+        if _clients[client] <= 0:
+            del _clients[client]
+    return release
+
+
+def countSent(n_bytes: int) -> None:
+    """Adds `n_bytes` sent by a stream to gauges."""
+    _stats['bytes_sent'] += n_bytes
+
+
+def getStreamStats() -> dict[str, int]:
+    """Gets gauges of streams of this worker: the number of
+    `active_streams` and of `clients`, and counters of admitted and
+    rejected streams and of bytes sent.
+    """
+    return {
+        'active_streams': _clients.total(),
+        'clients': len(_clients),
+        **_stats,}
+
+
+def openStream(
+        on_stop: Callable[[], None] | None = None,
+        ) -> tuple[str, asyncio.Event]:
+    """Registers a new stream and returns its ID and the event that is set
+    when it must stop. If `on_stop` is given, it is called too.
+    """
+    streamId = uuid.uuid4().hex
+    event = asyncio.Event()
+    _events[streamId] = event
+    if on_stop:
+        _onStops[streamId] = on_stop
+    _ensureListener()
+    return streamId, event
+
+
+def closeStream(stream_id: str) -> None:
+    """Unregisters the stream with `stream_id` when it ends."""
+    _events.pop(stream_id, None)
+    _onStops.pop(stream_id, None)
+
+
+async def stopStream(stream_id: str) -> bool:
+    """Stops the stream with `stream_id`. It returns `False` if the stream
+    is not served by this worker and cannot be signaled to other workers.
+    """
+    if _signalStop(stream_id):
+        return True
+    url = getattr(settings, 'RAND_INTS_REDIS_URL', None)
+    if not url:
+        return False
+    async with redis.asyncio.Redis.from_url(url) as client:
+        await client.publish(STOP_CHANNEL, stream_id)
+    return True
+
+
+def _ensureListener() -> None:
+    """Starts listening to stop requests of other workers in the running
+    event loop, if it is configured and not started yet.
+    """
+    # Declaring variables ---------------------------------
+    global _listener
+    # Functioning -----------------------------------------
+    url = getattr(settings, 'RAND_INTS_REDIS_URL', None)
+    if not url:
+        return
+    loop = asyncio.get_running_loop()
+    if _listener is None or _listener.done() or \
+            _listener.get_loop() is not loop:
+        _listener = loop.create_task(_listenForStops(url))
+
+
+async def _listenForStops(url: str) -> None:
+    while True:
+        try:
+            async with redis.asyncio.Redis.from_url(url) as client:
+                async with client.pubsub() as pubsub:
+                    await pubsub.subscribe(STOP_CHANNEL)
+                    async for message in pubsub.listen():
+                        if message['type'] != 'message':
+                            continue
+                        _signalStop(message['data'].decode())
+        except redis.RedisError as err:
+            _logger.warning(f'failed to listen to stop requests: {err}')
+            await asyncio.sleep(_RETRY_DELAY)
+
+
+def _signalStop(stream_id: str) -> bool:
+    """Signals the stream with `stream_id` to stop if it is served by this
+    worker and returns whether it is.
+    """
+    try:
+        _events[stream_id].set()
+    except KeyError:
+        return False
+    if stream_id in _onStops:
+        _onStops[stream_id]()
+    return True
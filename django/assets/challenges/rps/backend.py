@@ -3,26 +3,34 @@
 #
 
 from __future__ import annotations
-from importlib import import_module
-from inspect import isabstract, isclass
 import json
 from pathlib import Path
-import pickle
 import random
-from typing import Literal
+from typing import Any, Literal, MutableSequence
 
 from django.contrib.sessions.backends.base import SessionBase
-from django.core.cache import cache
 from django.http import (
     HttpRequest, HttpResponse, HttpResponseBadRequest, JsonResponse)
 from django.shortcuts import render
 from django.views.decorators.http import require_http_methods
 
-from .rps import Rps, IRpsPlayer
+from .registry import getPlayers
+from .rps import Rps, IRpsPlayer, getWindow, makeHistory
+from .state import (
+    RpsGameInfo, RpsPlayerInfo, dumpGameInfo, loadGameInfo)
+from .store import getStateStore
 
 
 _USER = 'User'
 
+_MAX_MOVE_ATTEMPTS = 5
+"""The number of times a move is retried when the game is changed by a
+concurrent request.
+"""
+
+_MAX_BATCH_MOVES = 1000
+"""The maximum number of user moves accepted by a `moves` action."""
+
 RPS_DIR = Path(__file__).resolve().parent
 """The directory of Rock, Paper, Scissors challenge."""
 
@@ -95,48 +103,6 @@ _LOSS_MSGS = {
     ],
 }
 
-players: dict[str, type[IRpsPlayer]] = {}
-"""The mappng between names and implementations of RPS players."""
-
-
-class RpsPlayerInfo:
-    def __init__(
-            self,
-            name: str,
-            history: list[Rps],
-            score: int = 0,
-            player: IRpsPlayer | None = None,
-            ) -> None:
-        self.name = name
-        self.history = history
-        self.score = score
-        self.player = player
-
-
-class RpsGameInfo:
-    def __init__(
-            self,
-            left: RpsPlayerInfo,
-            right: RpsPlayerInfo,
-            ) -> None:
-        self.left = left
-        self.right = right
-        self.lastWinner: Literal['user', 'com', 'none',] = 'none'
-        """The winner of the last move."""
-        self.nLastWins = 0
-        """The number of consecutive wins that happened last."""
-        self.nBeforeWins = 0
-        """The number of consecutive wins that happened before last loss
-        or losses.
-        """
-        self.nLastLosses = 0
-        """The number of consecutive losses that happened last."""
-        self.nBeofreLosses = 0
-        """The number of consecutive losses that happened before last win
-        or wins.
-        """
-
-
 @require_http_methods(['GET', 'POST'])
 def play(request: HttpRequest) -> HttpResponse: # type: ignore
     """
@@ -149,15 +115,17 @@ def play(request: HttpRequest) -> HttpResponse: # type: ignore
         * `data = {'action': 'stop',}`: to stop the game.
         * `data = {'action': 'move', 'move': '1', '2' or '3'}`: to specify
         user move.
+        * `data = {'action': 'moves', 'moves': ['rock', 'paper', ...]}`: to
+        specify a batch of user moves in order. The response is
+        `{'results': [...]}` with the result of every move, as the result of
+        a `move` action.
     """
     # Declaring variables ---------------------------------
-    global players
     from random import choice
     # -----------------------------------------------------
     if request.method == 'GET':
-        _loadPlayers()
         context = {
-            'players': [_USER, *players.keys()],}
+            'players': [_USER, *getPlayers().keys()],}
         from django.template import engines
         jinja2Engine = engines['jinja2']
         template = jinja2Engine.get_template('challenges/rps/page.j2')
@@ -183,41 +151,54 @@ def play(request: HttpRequest) -> HttpResponse: # type: ignore
             case 'move':
                 if 'move' not in data:
                     return HttpResponseBadRequest('move is not specified')
-                elif data['move'] not in {'rock', 'paper', 'scissors'}:
+                elif not isinstance(data['move'], str) or \
+                        data['move'] not in {'rock', 'paper', 'scissors'}:
                     return HttpResponseBadRequest(
                         f'bad move value: {data['move']}')
                 return _move(data['move'], request.session)
+            case 'moves':
+                if 'moves' not in data:
+                    return HttpResponseBadRequest('moves are not specified')
+                elif not isinstance(data['moves'], list) or \
+                        not (0 < len(data['moves']) <= _MAX_BATCH_MOVES):
+                    return HttpResponseBadRequest(
+                        f'moves must be a list of 1 to {_MAX_BATCH_MOVES} '
+                        'moves')
+                for move in data['moves']:
+                    if not isinstance(move, str) or \
+                            move not in {'rock', 'paper', 'scissors'}:
+                        return HttpResponseBadRequest(
+                            f'bad move value: {move}')
+                return _moves(data['moves'], request.session)
             case _:
                 return HttpResponseBadRequest(
                     f'invalid action: {data['action']}')
 
 
-def _loadPlayers() -> None:
-    # Declaring variables ---------------------------------
-    global RPS_DIR
-    global players
-    # Loading players -------------------------------------
-    # Listing players files directory...
-    filesDir = RPS_DIR / 'rps'
-    filesNames = list(filesDir.glob('*.py'))
-    filesNames = [fileName.relative_to(filesDir) for fileName in filesNames]
+def _makePlayer(
+        name: str,
+        history: MutableSequence[Rps],
+        rival_history: MutableSequence[Rps],
+        ) -> IRpsPlayer | None:
+    """Rebuilds the player named `name` on its histories. It returns
+    `None` for the user. Raises `ValueError` if there is no such player,
+    as for games of players that were removed or renamed.
+    """
+    if name == _USER:
+        return None
     try:
-        filesNames.remove(Path('__init__.py'))
-    except ValueError:
-        pass
-    #
-    players.clear()
-    for fileName in filesNames:
-        try:
-            modObj = import_module(
-                f'assets.challenges.rps.rps.{fileName.stem}')
-        except Exception:
-            continue
-        for item in dir(modObj):
-            item = getattr(modObj, item)
-            if isclass(item) and not isabstract(item) and \
-                    issubclass(item, IRpsPlayer):
-                players[item.name] = item
+        playerType = getPlayers()[name]
+    except KeyError:
+        raise ValueError(f'unknown RPS player: {name}') from None
+    return playerType(history, rival_history)
+
+
+def _getWindow(lname: str, rname: str) -> int | None:
+    """Gets the number of last rounds the game between players named
+    `lname` and `rname` must keep in histories.
+    """
+    players = getPlayers()
+    return getWindow(players.get(lname), players.get(rname))
 
 
 def _initRps(
@@ -226,16 +207,21 @@ def _initRps(
         session: SessionBase,
         ) -> HttpResponse:
     # Declaring variables -------------------------------------------
-    global players
+    players = getPlayers()
     # ---------------------------------------------------------------
+    if not all(
+            isinstance(name, str) and (name == _USER or name in players)
+            for name in (lname, rname,)):
+        return HttpResponseBadRequest('unknown player')
     bothPlayers = {lname, rname}
     if bothPlayers == {_USER}:
         return HttpResponseBadRequest(
             'This app does not support game between two users.')
     elif _USER in bothPlayers:
-        #
-        lHistory = list[Rps]()
-        rHistory = list[Rps]()
+        # Keeping only as many rounds as the computer player needs...
+        window = _getWindow(lname, rname)
+        lHistory = makeHistory(window)
+        rHistory = makeHistory(window)
         #
         try:
             lPlayer = players[lname](lHistory, rHistory)
@@ -258,7 +244,7 @@ def _initRps(
             player=rPlayer)
         #
         rpsInfo = RpsGameInfo(lInfo, rInfo)
-        cache.set(session.session_key, pickle.dumps(rpsInfo))
+        getStateStore().create(_getGameKey(session), dumpGameInfo(rpsInfo))
         # Responding with HTTP 200 OK...
         return HttpResponse('RPS game initialized', content_type='text/plain',)
     else:
@@ -268,23 +254,88 @@ def _initRps(
 
 
 def _uninitRps(session: SessionBase) -> HttpResponse:
-    cache.delete(session.session_key)
+    getStateStore().delete(_getGameKey(session))
     return HttpResponse(
         'The RPS game uninitialized.',
         content_type='text/plain',)
 
 
+def _getGameKey(session: SessionBase) -> str:
+    """Gets the key of the game of the `session` in the state store. It
+    creates the session if it has not been created yet.
+    """
+    if session.session_key is None:
+        session.create()
+    return session.session_key # type: ignore
+
+
 def _move(
         user_move: Literal['rock', 'paper', 'scissors'],
         session: SessionBase,
         ) -> HttpResponse:
+    try:
+        userMove = Rps[user_move.upper()]
+    except KeyError:
+        return HttpResponseBadRequest(f'invalid user move: {user_move}')
+    results = _playMoves([userMove], session)
+    if isinstance(results, HttpResponse):
+        return results
+    return JsonResponse(results[0])
+
+
+def _moves(
+        user_moves: list[Literal['rock', 'paper', 'scissors']],
+        session: SessionBase,
+        ) -> HttpResponse:
+    try:
+        userMoves = [Rps[userMove.upper()] for userMove in user_moves]
+    except KeyError as err:
+        return HttpResponseBadRequest(f'invalid user move: {err}')
+    results = _playMoves(userMoves, session)
+    if isinstance(results, HttpResponse):
+        return results
+    return JsonResponse({'results': results})
+
+
+def _playMoves(
+        user_moves: list[Rps],
+        session: SessionBase,
+        ) -> list[dict[str, Any]] | HttpResponse:
+    """Plays `user_moves` in order in the game of `session` and returns
+    their results. The game state is loaded and saved once for all moves.
+    It returns an HTTP response if moves cannot be played.
+    """
     # Declaring variables -------------------------------------------
-    global cache
+    key = _getGameKey(session)
+    store = getStateStore()
     # ---------------------------------------------------------------
-    rpsInfo: RpsGameInfo = pickle.loads(cache.get(session.session_key))
-    if not (bool(rpsInfo.left.player) ^ bool(rpsInfo.right.player)):
-        return HttpResponseBadRequest(
-            "'move' is only acceptable in user-computer game")
+    # Retrying if another request changed the game in the meantime...
+    for _ in range(_MAX_MOVE_ATTEMPTS):
+        state = store.get(key)
+        if state is None:
+            return HttpResponseBadRequest('no RPS game is in progress')
+        data, version = state
+        try:
+            rpsInfo = loadGameInfo(data, _makePlayer, _getWindow)
+        except ValueError:
+            return HttpResponseBadRequest('the RPS game is invalid or expired')
+        if not (bool(rpsInfo.left.player) ^ bool(rpsInfo.right.player)):
+            return HttpResponseBadRequest(
+                "'move' is only acceptable in user-computer game")
+        results = [_playMove(rpsInfo, userMove) for userMove in user_moves]
+        if store.update(key, dumpGameInfo(rpsInfo), version) is not None:
+            return results
+    return HttpResponse(
+        'The RPS game was changed by another request, try again.',
+        content_type='text/plain',
+        status=409,)
+
+
+def _playMove(rps_info: RpsGameInfo, user_move: Rps) -> dict[str, Any]:
+    """Plays `user_move` against the computer player of `rps_info`, updates
+    `rps_info` accordingly and returns the result of the move.
+    """
+    rpsInfo = rps_info
     if rpsInfo.left.player is None:
         userInfo = rpsInfo.left
         comInfo = rpsInfo.right
@@ -292,13 +343,11 @@ def _move(
         userInfo = rpsInfo.right
         comInfo = rpsInfo.left
     #
-    try:
-        userMove = Rps[user_move.upper()]
-    except KeyError:
-        return HttpResponseBadRequest(f'invalid user move: {user_move}')
+    userMove = user_move
     comMove = comInfo.player.move() # type: ignore
     userInfo.history.append(userMove)
     comInfo.history.append(comMove)
+    comInfo.player.observe(comMove, userMove) # type: ignore
     #
     if userMove > comMove:
         winner = 'user'
@@ -340,16 +389,14 @@ def _move(
     else:
         winner = 'draw'
         message = 'draw'
-    cache.set(session.session_key, pickle.dumps(rpsInfo),)
     #
-    data = {
-        'user_move': user_move,
+    return {
+        'user_move': userMove.name.lower(),
         'com_move': comMove.name.lower(),
         'user_score': userInfo.score,
         'com_score': comInfo.score,
         'winner': winner,
         'message': message}
-    return JsonResponse(data)
 
 
 def _getWinLossMsg(rps_info: RpsGameInfo) -> str:
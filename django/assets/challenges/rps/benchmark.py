@@ -0,0 +1,214 @@
+#
+# 
+#
+"""This module offers micro-benchmarks of RPS players. For every player
+of the registry and every history length, it measures:
+
+* `move`: the latency of `move()` and the memory it allocates.
+* `view`: the latency of a move through the view path, which loads the
+game state from the state store, decodes it, plays and saves it back.
+
+Results are JSON-serializable dictionaries of the form
+`{'players': {name: {kind: {length: stats}}}}` which can be compared with
+a baseline by `compareResults`.
+"""
+
+from __future__ import annotations
+import platform
+import random
+import statistics
+import time
+import tracemalloc
+from typing import Any, Iterable, MutableSequence
+
+from django.contrib.sessions.backends.base import SessionBase
+
+from .backend import _USER, _move
+from .registry import getPlayers
+from .rps import IRpsPlayer, Rps, getWindow, makeHistory
+from .state import RpsGameInfo, RpsPlayerInfo, dumpGameInfo
+from .store import getStateStore
+
+
+HISTORY_LENGTHS = (10, 100, 1_000, 10_000, 100_000,)
+"""The default lengths of histories players are measured at."""
+
+MOVE_BUDGET_US = 1_000.0
+"""The default maximum p99 latency of `move()` in microseconds, which
+applies to players without a baseline too.
+"""
+
+_CHOICES = tuple(Rps)
+
+_GAME_KEY = 'rps-benchmark-game'
+"""The key of the benchmark game in the state store."""
+
+
+def benchmarkPlayers(
+        names: Iterable[str] | None = None,
+        lengths: Iterable[int] = HISTORY_LENGTHS,
+        n_moves: int = 200,
+        n_view_moves: int = 50,
+        ) -> dict[str, Any]:
+    """Benchmarks players with `names`, or all registered players if it
+    is `None`, at history `lengths`.
+    """
+    players = getPlayers()
+    names = list(players if names is None else names)
+    lengths = list(lengths)
+    results: dict[str, Any] = {
+        'python': platform.python_version(),
+        'machine': platform.machine(),
+        'players': {},}
+    for name in names:
+        playerCls = players[name]
+        results['players'][name] = {
+            'move': {
+                str(length): benchmarkMove(playerCls, length, n_moves)
+                for length in lengths},
+            'view': {
+                str(length): benchmarkView(playerCls, length, n_view_moves)
+                for length in lengths},}
+    return results
+
+
+def benchmarkMove(
+        player_cls: type[IRpsPlayer],
+        n_history: int,
+        n_moves: int = 200,
+        ) -> dict[str, float]:
+    """Measures `n_moves` moves of `player_cls` that has already played
+    `n_history` rounds against a random rival.
+    """
+    # Declaring variables ---------------------------------
+    rand = random.Random(n_history)
+    # Functioning -----------------------------------------
+    history, rivalHistory = _makeHistories(player_cls, n_history, rand)
+    player = player_cls(history, rivalHistory)
+    rivalMoves = rand.choices(_CHOICES, k=2 * n_moves)
+    # Warming up, which also catches up with the history...
+    _playRound(player, history, rivalHistory, rivalMoves[-1])
+    # Measuring latencies...
+    latencies = list[float]()
+    for rivalMove in rivalMoves[:n_moves]:
+        start = time.perf_counter_ns()
+        own = player.move()
+        latencies.append((time.perf_counter_ns() - start) / 1_000)
+        history.append(own)
+        rivalHistory.append(rivalMove)
+        player.observe(own, rivalMove)
+    # Measuring allocations...
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+    for rivalMove in rivalMoves[n_moves:]:
+        _playRound(player, history, rivalHistory, rivalMove)
+    current, peak = tracemalloc.get_traced_memory()
+    if not tracing:
+        tracemalloc.stop()
+    return {
+        **_getPercentiles(latencies),
+        'peak_bytes': peak - before,
+        'bytes_per_move': (current - before) / n_moves,}
+
+
+def benchmarkView(
+        player_cls: type[IRpsPlayer],
+        n_history: int,
+        n_moves: int = 50,
+        ) -> dict[str, float]:
+    """Measures `n_moves` moves through the view path in a game between
+    the user and `player_cls` that has already lasted `n_history` rounds.
+    """
+    # Declaring variables ---------------------------------
+    rand = random.Random(n_history)
+    store = getStateStore()
+    session = SessionBase(_GAME_KEY)
+    # Functioning -----------------------------------------
+    userHistory, comHistory = _makeHistories(player_cls, n_history, rand)
+    game = RpsGameInfo(
+        RpsPlayerInfo(_USER, userHistory),
+        RpsPlayerInfo(player_cls.name, comHistory))
+    data = dumpGameInfo(game)
+    store.create(_GAME_KEY, data)
+    userMoves = rand.choices(['rock', 'paper', 'scissors'], k=n_moves)
+    latencies = list[float]()
+    try:
+        for userMove in userMoves:
+            start = time.perf_counter_ns()
+            _move(userMove, session) # type: ignore
+            latencies.append((time.perf_counter_ns() - start) / 1_000)
+    finally:
+        store.delete(_GAME_KEY)
+    return {
+        **_getPercentiles(latencies),
+        'state_bytes': len(data),}
+
+
+def compareResults(
+        results: dict[str, Any],
+        baseline: dict[str, Any] | None,
+        tolerance: float = 1.5,
+        budget_us: float = MOVE_BUDGET_US,
+        ) -> list[str]:
+    """Compares benchmark `results` with a `baseline` and returns the
+    regressions found: p50 or p99 latencies more than `tolerance` times
+    their baseline, and p99 latencies of `move()` over `budget_us`.
+    """
+    regressions = list[str]()
+    basePlayers = (baseline or {}).get('players', {})
+    for name, kinds in results['players'].items():
+        for length, stats in kinds['move'].items():
+            if stats['p99_us'] > budget_us:
+                regressions.append(
+                    f"{name}: move() p99 at {length} rounds is "
+                    f"{stats['p99_us']:.1f} us, over the budget of "
+                    f'{budget_us:.1f} us')
+        for kind, lengths in kinds.items():
+            for length, stats in lengths.items():
+                try:
+                    baseStats = basePlayers[name][kind][length]
+                except KeyError:
+                    continue
+                for key in ('p50_us', 'p99_us',):
+                    if stats[key] > tolerance * baseStats[key]:
+                        regressions.append(
+                            f'{name}: {kind} {key} at {length} rounds is '
+                            f'{stats[key]:.1f} us, {tolerance} times over '
+                            f'the baseline of {baseStats[key]:.1f} us')
+    return regressions
+
+
+def _makeHistories(
+        player_cls: type[IRpsPlayer],
+        n_history: int,
+        rand: random.Random,
+        ) -> tuple[MutableSequence[Rps], MutableSequence[Rps]]:
+    """Makes random histories of `n_history` rounds, as `player_cls` keeps
+    them.
+    """
+    window = getWindow(player_cls)
+    return (
+        makeHistory(window, rand.choices(_CHOICES, k=n_history)),
+        makeHistory(window, rand.choices(_CHOICES, k=n_history)),)
+
+
+def _playRound(
+        player: IRpsPlayer,
+        history: MutableSequence[Rps],
+        rival_history: MutableSequence[Rps],
+        rival_move: Rps,
+        ) -> None:
+    own = player.move()
+    history.append(own)
+    rival_history.append(rival_move)
+    player.observe(own, rival_move)
+
+
+def _getPercentiles(latencies: list[float]) -> dict[str, float]:
+    cuts = statistics.quantiles(latencies, n=100, method='inclusive')
+    return {
+        'p50_us': round(cuts[49], 3),
+        'p99_us': round(cuts[98], 3),}
@@ -0,0 +1,258 @@
+#
+# 
+#
+"""This module offers a WebSocket channel to play a running RPS game. The
+game state is decoded once when the channel opens and is kept in memory
+while it is open. It is written through to the state store every
+`_FLUSH_MOVES` moves, every `_FLUSH_INTERVAL` seconds if there are unsaved
+moves, and when the channel closes.
+
+Messages are JSON objects. The client sends the same objects as the bodies
+of `move` and `moves` actions of the RPS endpoint, and every message is
+answered with the same object as the response to that action, or with
+`{'status': 'error', 'reason': ...}`.
+"""
+
+from __future__ import annotations
+import asyncio
+import json
+import logging
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.http import parse_cookie
+
+from .backend import (
+    _MAX_BATCH_MOVES, _getWindow, _makePlayer, _playMove)
+from .rps import Rps
+from .state import RpsGameInfo, dumpGameInfo, loadGameInfo
+from .store import getStateStore
+
+
+_logger = logging.getLogger('megacodist')
+
+RPS_CHANNEL_PATH = '/challenges/rps/channel'
+"""The path of the WebSocket channel of the RPS challenge."""
+
+_FLUSH_MOVES = 50
+"""The number of unsaved moves that causes the game state to be written
+to the store.
+"""
+
+_FLUSH_INTERVAL = 5.0
+"""The number of seconds after which unsaved moves are written to the
+store.
+"""
+
+_CLOSE_NO_GAME = 4404
+"""The WebSocket close code for connections without a running game."""
+
+_CLOSE_CONFLICT = 4409
+"""The WebSocket close code used when the game is changed by a request
+outside the channel.
+"""
+
+
+class _RpsChannel:
+    def __init__(
+            self,
+            key: str,
+            rps_info: RpsGameInfo,
+            version: int,
+            send: Callable[[dict[str, Any]], Awaitable[None]],
+            ) -> None:
+        self._key = key
+        """The key of the game in the state store."""
+        self._rpsInfo = rps_info
+        self._version = version
+        """The version of the game state in the store."""
+        self._send = send
+        self._nUnsaved = 0
+        """The number of moves that are not written to the store yet."""
+        self._closed = False
+        """Whether the channel has been closed by the server."""
+        self._lock = asyncio.Lock()
+        self._stopping = asyncio.Event()
+        """Whether the connection has ended, which stops periodic
+        flushes.
+        """
+
+    async def serve(
+            self,
+            receive: Callable[[], Awaitable[dict[str, Any]]],
+            ) -> None:
+        flusher = asyncio.create_task(self._flushPeriodically())
+        try:
+            while True:
+                event = await receive()
+                if event['type'] == 'websocket.disconnect':
+                    break
+                elif event['type'] != 'websocket.receive' or self._closed:
+                    continue
+                reply = await self._handle(
+                    event.get('text') or event.get('bytes') or '')
+                await self._sendJson(reply)
+                if self._nUnsaved >= _FLUSH_MOVES and \
+                        not await self._flush():
+                    await self._closeOnConflict()
+        finally:
+            # Letting a flush in progress finish, as its update runs on in
+            # its thread even if it is cancelled...
+            self._stopping.set()
+            await flusher
+            await self._flush()
+
+    async def _handle(self, message: str | bytes) -> dict[str, Any]:
+        try:
+            data = json.loads(message)
+            action = data['action']
+        except (ValueError, TypeError, KeyError,):
+            return _makeError('could not retrieve data')
+        match action:
+            case 'move':
+                userMoves = _parseMoves([data.get('move')])
+            case 'moves':
+                moves = data.get('moves')
+                if not isinstance(moves, list) or \
+                        not (0 < len(moves) <= _MAX_BATCH_MOVES):
+                    return _makeError(
+                        f'moves must be a list of 1 to {_MAX_BATCH_MOVES} '
+                        'moves')
+                userMoves = _parseMoves(moves)
+            case _:
+                return _makeError(f'invalid action: {action}')
+        if isinstance(userMoves, str):
+            return _makeError(userMoves)
+        async with self._lock:
+            results = [
+                _playMove(self._rpsInfo, userMove)
+                for userMove in userMoves]
+            self._nUnsaved += len(userMoves)
+        return results[0] if action == 'move' else {'results': results}
+
+    async def _flush(self) -> bool:
+        """Writes unsaved moves to the store. It returns `False` if the game
+        was changed outside the channel.
+        """
+        async with self._lock:
+            if self._nUnsaved == 0:
+                return True
+            version = await asyncio.to_thread(
+                getStateStore().update,
+                self._key,
+                dumpGameInfo(self._rpsInfo),
+                self._version,)
+            if version is None:
+                _logger.warning(
+                    f'{self._nUnsaved} RPS moves of a channel were '
+                    'dropped because the game changed outside it')
+                self._nUnsaved = 0
+                return False
+            self._version = version
+            self._nUnsaved = 0
+            return True
+
+    async def _flushPeriodically(self) -> None:
+        while True:
+            try:
+                async with asyncio.timeout(_FLUSH_INTERVAL):
+                    await self._stopping.wait()
+                return
+            except TimeoutError:
+                pass
+            if not await self._flush():
+                await self._closeOnConflict()
+                return
+
+    async def _closeOnConflict(self) -> None:
+        self._closed = True
+        await self._sendJson(_makeError(
+            'the game was changed by another request'))
+        await self._send({
+            'type': 'websocket.close',
+            'code': _CLOSE_CONFLICT,})
+
+    async def _sendJson(self, data: dict[str, Any]) -> None:
+        await self._send({
+            'type': 'websocket.send',
+            'text': json.dumps(data),})
+
+
+async def serveRpsChannel(
+        scope: dict[str, Any],
+        receive: Callable[[], Awaitable[dict[str, Any]]],
+        send: Callable[[dict[str, Any]], Awaitable[None]],
+        ) -> None:
+    """The ASGI application of the WebSocket channel of the RPS
+    challenge.
+    """
+    event = await receive()
+    if event['type'] != 'websocket.connect':
+        return
+    headers = {
+        name.decode('latin-1'): value.decode('latin-1')
+        for name, value in scope['headers']}
+    if not _isSameOrigin(headers):
+        # Rejecting cross-site connections with HTTP 403 Forbidden...
+        await send({'type': 'websocket.close',})
+        return
+    key = parse_cookie(headers.get('cookie', '')).get(
+        settings.SESSION_COOKIE_NAME)
+    state = None
+    if key:
+        state = await asyncio.to_thread(getStateStore().get, key)
+    await send({'type': 'websocket.accept',})
+    if state is None:
+        await send({
+            'type': 'websocket.close',
+            'code': _CLOSE_NO_GAME,})
+        return
+    data, version = state
+    # Loading players may read their stores and import their modules...
+    try:
+        rpsInfo = await asyncio.to_thread(
+            loadGameInfo,
+            data,
+            _makePlayer,
+            _getWindow)
+    except ValueError:
+        # Closing games of invalid states or of removed players...
+        rpsInfo = None
+    if rpsInfo is None or \
+            not (bool(rpsInfo.left.player) ^ bool(rpsInfo.right.player)):
+        await send({
+            'type': 'websocket.close',
+            'code': _CLOSE_NO_GAME,})
+        return
+    channel = _RpsChannel(key, rpsInfo, version, send) # type: ignore
+    await channel.serve(receive)
+
+
+def _isSameOrigin(headers: dict[str, str]) -> bool:
+    """Determines whether the `Origin` header of a WebSocket handshake
+    matches its `Host` header. Browsers send cookies along with WebSocket
+    handshakes of any site, so this is the channel's CSRF protection.
+    """
+    origin = headers.get('origin')
+    if origin is None:
+        # Non-browser clients...
+        return True
+    return urlsplit(origin).netloc == headers.get('host')
+
+
+def _parseMoves(moves: list[Any]) -> list[Rps] | str:
+    """Converts user moves of a message to `Rps` or returns the reason they
+    are invalid.
+    """
+    userMoves = list[Rps]()
+    for move in moves:
+        if not isinstance(move, str) or \
+                move not in {'rock', 'paper', 'scissors'}:
+            return f'bad move value: {move}'
+        userMoves.append(Rps[move.upper()])
+    return userMoves
+
+
+def _makeError(reason: str) -> dict[str, Any]:
+    return {'status': 'error', 'reason': reason,}
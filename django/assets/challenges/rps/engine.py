@@ -0,0 +1,157 @@
+#
+# 
+#
+"""This module offers a headless engine to play matches between two RPS
+players, for example to evaluate strategies. It does not depend on Django.
+
+Players choose their moves one round at a time, as they do in games
+against users, and observe the moves of every round. Histories only keep
+as many rounds as players declare they need. Moves of a batch of rounds
+are recorded in NumPy arrays and scored through a precomputed table of
+outcomes.
+"""
+
+from __future__ import annotations
+from typing import Any
+
+import numpy as np
+import numpy.typing as npt
+
+from .rps import IRpsPlayer, Rps, getWindow, makeHistory
+
+
+OUTCOMES = np.array(
+    [
+        [
+            (0, 1, -1,)[(left - right) % 3]
+            for right in Rps]
+        for left in Rps],
+    dtype=np.int8)
+"""The outcomes of rounds indexed by `[left - 1, right - 1]` for values of
+left and right moves: `1` if the left player wins, `-1` if the right player
+wins and `0` for draws.
+"""
+
+DEFAULT_BATCH_SIZE = 1 << 16
+"""The default number of rounds that are scored in a batch."""
+
+
+class RpsMatchResult:
+    def __init__(
+            self,
+            left_name: str,
+            right_name: str,
+            ) -> None:
+        self.leftName = left_name
+        self.rightName = right_name
+        self.nRounds = 0
+        self.leftWins = 0
+        self.rightWins = 0
+        self.draws = 0
+        self.leftChoices = np.zeros(len(Rps), dtype=np.int64)
+        """The number of times the left player chose each move, indexed by
+        values of moves minus one.
+        """
+        self.rightChoices = np.zeros(len(Rps), dtype=np.int64)
+        """The number of times the right player chose each move, indexed by
+        values of moves minus one.
+        """
+        self.outcomes: npt.NDArray[np.int8] | None = None
+        """The outcome of every round as in `OUTCOMES`, if it was asked
+        for.
+        """
+
+    def getScoreDiffs(self) -> npt.NDArray[np.int64]:
+        """Gets the difference of scores of left and right players after
+        every round. Raises `ValueError` if outcomes of rounds have not been
+        kept.
+        """
+        if self.outcomes is None:
+            raise ValueError('outcomes of rounds have not been kept')
+        return np.cumsum(self.outcomes, dtype=np.int64)
+
+    def toDict(self) -> dict[str, Any]:
+        """Gets the aggregate statistics of the match as a JSON-serializable
+        dictionary.
+        """
+        return {
+            'left': self.leftName,
+            'right': self.rightName,
+            'rounds': self.nRounds,
+            'left_wins': self.leftWins,
+            'right_wins': self.rightWins,
+            'draws': self.draws,
+            'left_choices': dict(zip(
+                (spsc.name.lower() for spsc in Rps),
+                self.leftChoices.tolist())),
+            'right_choices': dict(zip(
+                (spsc.name.lower() for spsc in Rps),
+                self.rightChoices.tolist())),}
+
+
+def scoreRounds(
+        left_moves: npt.NDArray[np.uint8],
+        right_moves: npt.NDArray[np.uint8],
+        ) -> npt.NDArray[np.int8]:
+    """Gets the outcomes of rounds, as in `OUTCOMES`, for arrays of values
+    of left and right moves.
+    """
+    return OUTCOMES[left_moves - 1, right_moves - 1]
+
+
+def playMatch(
+        left: type[IRpsPlayer],
+        right: type[IRpsPlayer],
+        n_rounds: int,
+        *,
+        keep_rounds: bool = False,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        ) -> RpsMatchResult:
+    """Plays `n_rounds` rounds between the `left` and `right` players and
+    returns the result. If `keep_rounds` is true, the outcome of every round
+    is kept in the result. Raises `ValueError` if `n_rounds` is negative or
+    `batch_size` is not positive.
+    """
+    if n_rounds < 0:
+        raise ValueError(f'negative number of rounds: {n_rounds}')
+    if batch_size < 1:
+        raise ValueError(f'batch size must be positive: {batch_size}')
+    window = getWindow(left, right)
+    lHistory = makeHistory(window)
+    rHistory = makeHistory(window)
+    lPlayer = left(lHistory, rHistory)
+    rPlayer = right(rHistory, lHistory)
+    result = RpsMatchResult(left.name, right.name)
+    batches = list[npt.NDArray[np.int8]]()
+    lBatch = bytearray()
+    rBatch = bytearray()
+    for start in range(0, n_rounds, batch_size):
+        stop = min(start + batch_size, n_rounds)
+        # Playing rounds of the batch...
+        lBatch.clear()
+        rBatch.clear()
+        for _ in range(start, stop):
+            lMove = lPlayer.move()
+            rMove = rPlayer.move()
+            lHistory.append(lMove)
+            rHistory.append(rMove)
+            lPlayer.observe(lMove, rMove)
+            rPlayer.observe(rMove, lMove)
+            lBatch.append(lMove)
+            rBatch.append(rMove)
+        # Scoring rounds of the batch...
+        lMoves = np.frombuffer(bytes(lBatch), dtype=np.uint8)
+        rMoves = np.frombuffer(bytes(rBatch), dtype=np.uint8)
+        outcomes = scoreRounds(lMoves, rMoves)
+        result.leftWins += int(np.count_nonzero(outcomes == 1))
+        result.rightWins += int(np.count_nonzero(outcomes == -1))
+        result.leftChoices += np.bincount(lMoves, minlength=4)[1:]
+        result.rightChoices += np.bincount(rMoves, minlength=4)[1:]
+        if keep_rounds:
+            batches.append(outcomes)
+    result.nRounds = n_rounds
+    result.draws = n_rounds - result.leftWins - result.rightWins
+    if keep_rounds:
+        result.outcomes = np.concatenate(batches) if batches else \
+            np.zeros(0, dtype=np.int8)
+    return result
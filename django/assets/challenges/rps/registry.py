@@ -0,0 +1,125 @@
+#
+# 
+#
+"""This module offers the registry of RPS players, the mapping between
+names and implementations of players found in the `rps` package.
+
+The registry is an immutable snapshot which is replaced as a whole, so
+readers never see it half-built. It is rebuilt only if files of the `rps`
+package have changed since the last build, which is checked at most every
+`_CHECK_INTERVAL` seconds, or if `reloadPlayers` is called.
+"""
+
+from __future__ import annotations
+import importlib
+from inspect import isabstract, isclass
+import logging
+import os
+from pathlib import Path
+import sys
+import threading
+import time
+from types import MappingProxyType
+from typing import Mapping
+
+from .rps import IRpsPlayer
+
+
+_logger = logging.getLogger('megacodist')
+
+PLAYERS_DIR = Path(__file__).resolve().parent / 'rps'
+"""The directory of implementations of RPS players."""
+
+_PLAYERS_PKG = 'assets.challenges.rps.rps'
+
+_CHECK_INTERVAL = 2.0
+"""The minimum number of seconds between two checks of players files for
+changes.
+"""
+
+_players: Mapping[str, type[IRpsPlayer]] = MappingProxyType({})
+"""The current snapshot of the registry."""
+
+_stamp: tuple[tuple[str, int], ...] | None = None
+"""The names and modification times of players files, and of their
+directory, when the current snapshot was built.
+"""
+
+_nextCheck = 0.0
+"""The monotonic time of the next check of players files for changes."""
+
+_lock = threading.Lock()
+"""The lock that serializes rebuilds of the registry."""
+
+
+def getPlayers() -> Mapping[str, type[IRpsPlayer]]:
+    """Gets the current snapshot of the mapping between names and
+    implementations of RPS players.
+    """
+    # Declaring variables ---------------------------------
+    global _nextCheck
+    # Functioning -----------------------------------------
+    if time.monotonic() >= _nextCheck:
+        with _lock:
+            if time.monotonic() >= _nextCheck:
+                if _getStamp() != _stamp:
+                    _rebuild()
+                _nextCheck = time.monotonic() + _CHECK_INTERVAL
+    return _players
+
+
+def reloadPlayers() -> Mapping[str, type[IRpsPlayer]]:
+    """Rebuilds the registry regardless of changes and returns the new
+    snapshot.
+    """
+    with _lock:
+        _rebuild()
+    return _players
+
+
+def touchPlayersDir() -> None:
+    """Updates the modification time of the players directory, so every
+    process rebuilds its registry on its next check.
+    """
+    os.utime(PLAYERS_DIR)
+
+
+def _getStamp() -> tuple[tuple[str, int], ...]:
+    stamp = [('', PLAYERS_DIR.stat().st_mtime_ns,)]
+    with os.scandir(PLAYERS_DIR) as entries:
+        for entry in entries:
+            if entry.name.endswith('.py') and entry.name != '__init__.py':
+                stamp.append((entry.name, entry.stat().st_mtime_ns,))
+    stamp.sort()
+    return tuple(stamp)
+
+
+def _rebuild() -> None:
+    """Imports or reloads players modules and replaces the snapshot. The
+    caller must hold `_lock`.
+    """
+    # Declaring variables ---------------------------------
+    global _players
+    global _stamp
+    # Functioning -----------------------------------------
+    stamp = _getStamp()
+    oldMtimes = dict(_stamp or ())
+    players = dict[str, type[IRpsPlayer]]()
+    for fileName, mtime in stamp[1:]:
+        modName = f'{_PLAYERS_PKG}.{Path(fileName).stem}'
+        try:
+            if modName in sys.modules and fileName in oldMtimes and \
+                    oldMtimes[fileName] != mtime:
+                modObj = importlib.reload(sys.modules[modName])
+            else:
+                modObj = importlib.import_module(modName)
+        except Exception as err:
+            _logger.warning(f'failed to load RPS players of {fileName}: {err}')
+            continue
+        for item in dir(modObj):
+            item = getattr(modObj, item)
+            if isclass(item) and not isabstract(item) and \
+                    issubclass(item, IRpsPlayer):
+                players[item.name] = item
+    _players = MappingProxyType(players)
+    _stamp = stamp
@@ -4,8 +4,9 @@
 
 from __future__ import annotations
 from abc import ABC, abstractmethod
+from collections import deque
 import enum
-from typing import Any
+from typing import Any, Iterable, MutableSequence
 
 
 class Rps(enum.IntEnum):
@@ -28,65 +29,67 @@ class Rps(enum.IntEnum):
 
     def getDefier(self) -> Rps:
         """Gets the enumerator that defies this one."""
-        match self:
-            case Rps.ROCK:
-                return Rps.PAPER
-            case Rps.PAPER:
-                return Rps.SCISSORS
-            case Rps.SCISSORS:
-                return Rps.ROCK
+        return _DEFIERS[self._value_]
     
     def getLoser(self) -> Rps:
         """Gets the enumerator that loses this one."""
-        match self:
-            case Rps.ROCK:
-                return Rps.SCISSORS
-            case Rps.PAPER:
-                return Rps.ROCK
-            case Rps.SCISSORS:
-                return Rps.PAPER
+        return _LOSERS[self._value_]
 
     def __lt__(self, other: Any) -> bool:
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.getDefier() == other
+        return self.getDefier() is other
     
     def __le__(self, other: Any) -> bool:
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.getLoser() != other
+        return self.getLoser() is not other
     
     def __gt__(self, other: Any) -> bool:
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.getLoser() == other
+        return self.getLoser() is other
     
     def __ge__(self, other: Any) -> bool:
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.getDefier() != other
+        return self.getDefier() is not other
     
     def __eq__(self, other: Any) -> bool:
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.value == other.value
+        return self._value_ == other._value_
     
     def __ne__(self, other: Any) -> bool:
         if not isinstance(other, self.__class__):
             return NotImplemented
-        return self.value != other.value
+        return self._value_ != other._value_
     
     def __hash__(self) -> int:
-        return self.value
+        return self._value_
+
+
+_DEFIERS = (None, Rps.PAPER, Rps.SCISSORS, Rps.ROCK,)
+"""The enumerators that defy others, indexed by values of the others."""
+
+_LOSERS = (None, Rps.SCISSORS, Rps.ROCK, Rps.PAPER,)
+"""The enumerators that lose others, indexed by values of the others."""
 
 
 class IRpsPlayer(ABC):
     name: str
 
+    window: int | None = None
+    """The maximum number of latest rounds the player reads from its
+    histories, or `None` if it needs whole histories. If it is an integer,
+    histories may be ring buffers that only keep that many rounds, so the
+    player must not rely on their lengths or slice them.
+    """
+
     def __init__(
             self,
-            history: list[Rps],
-            rival_history: list[Rps],
+            history: MutableSequence[Rps],
+            rival_history: MutableSequence[Rps],
             ) -> None:
         self._history = history
         self._rivalHistory = rival_history
@@ -97,3 +100,37 @@ class IRpsPlayer(ABC):
     @abstractmethod
     def move(self) -> Rps:
         pass
+
+    def observe(self, own: Rps, rival: Rps) -> None:
+        """Is called after every round, once its moves are appended to
+        histories, with the move of the player and the move of its rival.
+        Players can override it to update their statistics incrementally,
+        but only as a cache of their histories: games against users rebuild
+        players on the histories of every request, so `__init__` must
+        rebuild all the state of a player from its histories, which only
+        keep the last `window` rounds.
+        """
+        pass
+
+
+def getWindow(*players: type[IRpsPlayer] | IRpsPlayer | None) -> int | None:
+    """Gets the number of latest rounds that histories shared by `players`
+    must keep, or `None` if any of them needs whole histories. `None`
+    players are users which do not read histories.
+    """
+    windows = [player.window for player in players if player is not None]
+    if None in windows:
+        return None
+    return max(windows, default=0) # type: ignore
+
+
+def makeHistory(
+        window: int | None,
+        moves: Iterable[Rps] = (),
+        ) -> MutableSequence[Rps]:
+    """Makes a history of `moves` that keeps the last `window` rounds. It
+    is a list if `window` is `None`, otherwise a ring buffer.
+    """
+    if window is None:
+        return list(moves)
+    return deque(moves, maxlen=window)
@@ -3,19 +3,24 @@
 #
 
 import random
+from typing import MutableSequence
 
 from . import IRpsPlayer, Rps
 
 
+_CHOICES = tuple(Rps)
+
+
 class RandomRpsPlayer(IRpsPlayer):
     name = 'Random'
+    window = 0
 
     def __init__(
             self,
-            history: list[Rps],
-            rival_history: list[Rps],
+            history: MutableSequence[Rps],
+            rival_history: MutableSequence[Rps],
             ) -> None:
         super().__init__(history, rival_history)
     
     def move(self) -> Rps:
-        return random.choice(list(Rps))
+        return random.choice(_CHOICES)
@@ -2,37 +2,55 @@
 # 
 #
 
-from collections import defaultdict
+from collections import defaultdict, deque
+import math
 
 from . import IRpsPlayer, Rps
 
 
+_CHOICES = tuple(Rps)
+
+
 class Rps10Player(IRpsPlayer):
     name = 'RPS 10'
 
+    _SHORT = 5
+    """The length of the most recent window of rival moves."""
+    _LONG = 10
+    """The length of the second most recent window of rival moves."""
+    _BLOCK = 10
+    """The length of every older block of rival moves that is folded into
+    the cumulative statistics.
+    """
+    _QUORUM = math.ceil(0.65 * _BLOCK)
+    """The number of occurrences of a choice in the cumulative statistics
+    that makes `_decide` pick it when it is called with `_BLOCK`.
+    """
+
     def __init__(
             self,
             history: list[Rps],
             rival_history: list[Rps],
             ) -> None:
         super().__init__(history, rival_history,)
-    
+        self._reset()
+
     def move(self) -> Rps:
         # Declaring of variables --------------------------
         import random
         # Functioning -------------------------------------
+        self._sync()
+        nRival = len(self._rivalHistory)
         predicts: dict[Rps, int] = defaultdict(lambda: 0)
-        if len(self._rivalHistory) >= 5:
-            map_ = self._listToDict(self._rivalHistory[-5:])
-            res = self._decide(map_, 5)
+        if nRival >= self._SHORT:
+            res = self._decide(self._shortCounts, self._SHORT)
             if isinstance(res, Rps):
                 return res.getDefier()
             elif isinstance(res, tuple):
                 for spsc in res:
                     predicts[spsc] += 1
-        if len(self._rivalHistory) >= 10:
-            map_ = self._listToDict(self._rivalHistory[-10:-5], map_) # type: ignore
-            res = self._decide(map_, 10)
+        if nRival >= self._LONG:
+            res = self._decide(self._longCounts, self._LONG)
             if isinstance(res, Rps):
                 return res.getDefier()
             elif isinstance(res, tuple):
@@ -40,41 +58,144 @@ class Rps10Player(IRpsPlayer):
                     predicts[spsc] += 1
                 for spsc in res:
                     predicts[spsc] += 1
-        if len(self._rivalHistory) >= 20:
-            for n in range(20, len(self._rivalHistory), 10):
-                map_ = self._listToDict(self._rivalHistory[-n:(10-n)], map_) # type: ignore
-                res = self._decide(map_, 10)
-                if isinstance(res, Rps):
-                    for spsc in predicts:
-                        predicts[spsc] += 1
-                    predicts[res] += 1
-                elif isinstance(res, tuple):
-                    for spsc in predicts:
-                        predicts[spsc] += 1
-                    for spsc in res:
-                        predicts[spsc] += 1
-        for spsc in Rps:
+        if nRival >= 2 * self._BLOCK:
+            self._foldBlocks(predicts)
+        for spsc in _CHOICES:
             predicts[spsc] += 1
-        weights = [predicts[spsc] for spsc in Rps]
-        guess = random.choices(list(Rps), weights, k=1)[0]
+        weights = [predicts[spsc] for spsc in _CHOICES]
+        guess = random.choices(_CHOICES, weights, k=1)[0]
         return guess.getDefier()
-    
-    def _listToDict(
-            self,
-            sub_history: list[Rps],
-            map_: dict[Rps, int] | None = None,
-            ) -> dict[Rps, int]:
-        """Converts queue of user choices into a mapping of
-        `Rps -> number of choices`. if `map_` is provided, it will be
-        updated with the new slice of the queue. Otherwise `map_` will
-        be created, intialized and returned.
+
+    def _reset(self) -> None:
+        """Clears all running statistics of rival moves."""
+        self._nSeen = 0
+        """The number of rival moves folded into the running statistics."""
+        self._shortCounts = dict.fromkeys(_CHOICES, 0)
+        """The frequencies of choices in the last `_SHORT` rival moves."""
+        self._longCounts = dict.fromkeys(_CHOICES, 0)
+        """The frequencies of choices in the last `_LONG` rival moves."""
+        self._lastSeen = dict[Rps, int]()
+        """The mapping of choices to the index of their latest occurrence
+        in the rival history.
+        """
+        self._recentSeen = {
+            spsc: deque[int](maxlen=self._QUORUM)
+            for spsc in _CHOICES}
+        """The mapping of choices to the indices of their last `_QUORUM`
+        occurrences in the rival history.
+        """
+
+    def _sync(self) -> None:
+        """Folds rival moves that have arrived since the last call into the
+        running statistics. Each rival move is visited once, so it costs
+        O(1) per move.
+        """
+        history = self._rivalHistory
+        if len(history) < self._nSeen:
+            # The history has been replaced, starting over...
+            self._reset()
+        if len(history) - self._nSeen > len(_CHOICES) * self._QUORUM:
+            self._rebuild()
+            return
+        for idx in range(self._nSeen, len(history)):
+            spsc = history[idx]
+            self._shortCounts[spsc] += 1
+            if idx >= self._SHORT:
+                self._shortCounts[history[idx - self._SHORT]] -= 1
+            self._longCounts[spsc] += 1
+            if idx >= self._LONG:
+                self._longCounts[history[idx - self._LONG]] -= 1
+            self._lastSeen[spsc] = idx
+            self._recentSeen[spsc].append(idx)
+        self._nSeen = len(history)
+
+    def _rebuild(self) -> None:
+        """Rebuilds the running statistics from the tail of the rival
+        history. This is used when the player catches up with a long
+        history, for example when it is recreated for a game in progress.
+        """
+        self._reset()
+        history = self._rivalHistory
+        for spsc in history[-self._SHORT:]:
+            self._shortCounts[spsc] += 1
+        for spsc in history[-self._LONG:]:
+            self._longCounts[spsc] += 1
+        # Finding the latest occurrences of every choice backward...
+        raw = bytes(history)
+        for spsc, recent in self._recentSeen.items():
+            idx = len(raw)
+            while len(recent) < self._QUORUM:
+                idx = raw.rfind(spsc, 0, idx)
+                if idx < 0:
+                    break
+                recent.appendleft(idx)
+            if recent:
+                self._lastSeen[spsc] = recent[-1]
+        self._nSeen = len(history)
+
+    def _foldBlocks(self, predicts: dict[Rps, int]) -> None:
+        """Updates `predicts` with the decisions made on the cumulative
+        statistics of the last 20, 30, 40, ... rival moves. The cumulative
+        statistics of the last `n` moves always contain a choice with at
+        least `_QUORUM` occurrences, and `_decide` picks the first of them
+        in the order choices are encountered while scanning blocks from the
+        most recent one. So the decisions are runs of the same choice that
+        can be worked out from the positions of the `_QUORUM`th latest
+        occurrence of every choice, without scanning the history.
+        """
+        nRival = len(self._rivalHistory)
+        nBlocks = len(range(2 * self._BLOCK, nRival, self._BLOCK))
+        if nBlocks == 0:
+            return
+        # Finding the runs of decisions, from the oldest block backward...
+        runs = list[tuple[Rps, int, int]]()
+        stop = nBlocks
+        for spsc in sorted(self._lastSeen, key=self._getScanRank):
+            recent = self._recentSeen[spsc]
+            if len(recent) < self._QUORUM:
+                continue
+            # `spsc` is picked from the block whose start reaches back to
+            # its `_QUORUM`th latest occurrence...
+            depth = nRival - recent[0]
+            start = max(
+                0,
+                -((2 * self._BLOCK - depth) // self._BLOCK))
+            if start < stop:
+                runs.append((spsc, start, stop,))
+                stop = start
+        # Applying the runs in the order of blocks...
+        for spsc, start, stop in reversed(runs):
+            span = stop - start
+            for key in predicts:
+                predicts[key] += span
+            if spsc in predicts:
+                predicts[spsc] += span
+            else:
+                # `spsc` misses the increment of its first block...
+                predicts[spsc] = 2 * span - 1
+
+    def _getScanRank(self, spsc: Rps) -> tuple[int, int]:
+        """Gets the rank of `spsc` in the order choices are first
+        encountered while scanning the rival history in blocks of
+        `_SHORT`, `_SHORT`, `_BLOCK`, `_BLOCK`, ... moves from the end, each
+        block being read from its oldest move.
         """
-        if map_ is None:
-            map_ = defaultdict(lambda: 0)
-        for elem in sub_history:
-            map_[elem] += 1
-        return map_
-    
+        history = self._rivalHistory
+        nRival = len(history)
+        depth = nRival - self._lastSeen[spsc]
+        if depth <= self._SHORT:
+            block, last = 0, self._SHORT
+        elif depth <= self._LONG:
+            block, last = 1, self._LONG
+        else:
+            block = 2 + (depth - self._LONG - 1) // self._BLOCK
+            last = self._LONG + (block - 1) * self._BLOCK
+        # Finding the oldest occurrence of `spsc` in its block...
+        for oldest in range(min(last, nRival), depth, -1):
+            if history[-oldest] == spsc:
+                return block, -oldest
+        return block, -depth
+
     def _decide(
             self,
             map_: dict[Rps, int],
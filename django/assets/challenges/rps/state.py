@@ -0,0 +1,217 @@
+#
+# 
+#
+"""This module offers the state of an RPS game and its compact binary
+encoding. The layout of version 1 of the encoding, all integers being
+little-endian, is:
+
+* header: version (`u8`), last winner (`u8`), `nLastWins`, `nBeforeWins`,
+`nLastLosses` and `nBeofreLosses` (`u32` each), number of moves (`u32`)
+* left player: name length (`u8`), UTF-8 name, score (`u32`)
+* right player: name length (`u8`), UTF-8 name, score (`u32`)
+* left history followed by right history, each packed 2 bits per move,
+four moves per byte, the oldest move in the lowest bits and unused slots
+of the last byte being zero.
+
+Players are not encoded. They are rebuilt from their names and histories
+when the state is decoded. Histories of players that declare a `window`
+are ring buffers, so only their last rounds are encoded.
+"""
+
+from __future__ import annotations
+import struct
+from typing import Callable, Iterable, Literal, MutableSequence
+
+from .rps import Rps, IRpsPlayer, makeHistory
+
+
+STATE_VERSION = 1
+"""The version of the binary encoding of RPS game states."""
+
+_HEADER = struct.Struct('<BBIIIII')
+_SCORE = struct.Struct('<I')
+
+_WINNERS: tuple[Literal['user', 'com', 'none'], ...] = ('none', 'user', 'com',)
+"""The last winners indexed by their codes in the encoding."""
+
+_SLOT_SHIFTS = tuple(range(0, 8, 2))
+"""The bit offsets of the four move slots of a packed byte."""
+
+_TO_SLOTS = tuple(
+    bytes(((value & 0b11) << shift for value in range(256)))
+    for shift in _SLOT_SHIFTS)
+"""The translation tables that move a move value to one of the four slots
+of a packed byte.
+"""
+
+_FROM_SLOTS = tuple(
+    bytes(((byte >> shift) & 0b11 for byte in range(256)))
+    for shift in _SLOT_SHIFTS)
+"""The translation tables that extract the move value of one of the four
+slots of a packed byte.
+"""
+
+_RPS = (None, Rps.ROCK, Rps.PAPER, Rps.SCISSORS,)
+"""The choices indexed by their values."""
+
+
+class RpsPlayerInfo:
+    __slots__ = ('name', 'history', 'score', 'player',)
+
+    def __init__(
+            self,
+            name: str,
+            history: MutableSequence[Rps],
+            score: int = 0,
+            player: IRpsPlayer | None = None,
+            ) -> None:
+        self.name = name
+        self.history = history
+        self.score = score
+        self.player = player
+
+
+class RpsGameInfo:
+    __slots__ = (
+        'left',
+        'right',
+        'lastWinner',
+        'nLastWins',
+        'nBeforeWins',
+        'nLastLosses',
+        'nBeofreLosses',)
+
+    def __init__(
+            self,
+            left: RpsPlayerInfo,
+            right: RpsPlayerInfo,
+            ) -> None:
+        self.left = left
+        self.right = right
+        self.lastWinner: Literal['user', 'com', 'none',] = 'none'
+        """The winner of the last move."""
+        self.nLastWins = 0
+        """The number of consecutive wins that happened last."""
+        self.nBeforeWins = 0
+        """The number of consecutive wins that happened before last loss
+        or losses.
+        """
+        self.nLastLosses = 0
+        """The number of consecutive losses that happened last."""
+        self.nBeofreLosses = 0
+        """The number of consecutive losses that happened before last win
+        or wins.
+        """
+
+
+def dumpGameInfo(game: RpsGameInfo) -> bytes:
+    """Encodes `game` into the compact binary format. Raises `ValueError`
+    if histories of players have different lengths or if a name of players
+    is longer than 255 bytes in UTF-8.
+    """
+    nMoves = len(game.left.history)
+    if len(game.right.history) != nMoves:
+        raise ValueError('histories of players have different lengths')
+    parts = [_HEADER.pack(
+        STATE_VERSION,
+        _WINNERS.index(game.lastWinner),
+        game.nLastWins,
+        game.nBeforeWins,
+        game.nLastLosses,
+        game.nBeofreLosses,
+        nMoves,)]
+    for info in (game.left, game.right,):
+        name = info.name.encode()
+        if len(name) > 255:
+            raise ValueError(f'too long name of RPS player: {info.name}')
+        parts.append(bytes((len(name),)))
+        parts.append(name)
+        parts.append(_SCORE.pack(info.score))
+    parts.append(packHistory(game.left.history))
+    parts.append(packHistory(game.right.history))
+    return b''.join(parts)
+
+
+def loadGameInfo(
+        data: bytes,
+        make_player: Callable[
+            [str, MutableSequence[Rps], MutableSequence[Rps]],
+            IRpsPlayer | None],
+        get_window: Callable[[str, str], int | None] | None = None,
+        ) -> RpsGameInfo:
+    """Decodes a game state encoded by `dumpGameInfo`. Players are rebuilt
+    by `make_player(name, history, rival_history)`, which returns `None`
+    for the user. Histories keep the number of last rounds returned by
+    `get_window(left_name, right_name)`, or whole histories if it is not
+    given. Raises `ValueError` if `data` is not a valid encoding, and
+    propagates `ValueError` of `make_player`.
+    """
+    try:
+        (version, winner, nLastWins, nBeforeWins, nLastLosses,
+            nBeofreLosses, nMoves) = _HEADER.unpack_from(data)
+        if version != STATE_VERSION:
+            raise ValueError(f'unsupported RPS state version: {version}')
+        offset = _HEADER.size
+        names = list[str]()
+        scores = list[int]()
+        for _ in range(2):
+            nameLen = data[offset]
+            offset += 1
+            names.append(data[offset:offset + nameLen].decode())
+            offset += nameLen
+            scores.append(_SCORE.unpack_from(data, offset)[0])
+            offset += _SCORE.size
+        packedLen = (nMoves + 3) // 4
+        if len(data) != offset + 2 * packedLen:
+            raise ValueError('RPS state has a wrong length')
+        lHistory = unpackHistory(data[offset:offset + packedLen], nMoves)
+        offset += packedLen
+        rHistory = unpackHistory(data[offset:], nMoves)
+        lastWinner = _WINNERS[winner]
+    except (struct.error, IndexError, UnicodeDecodeError) as err:
+        raise ValueError(f'invalid RPS state: {err}') from err
+    window = get_window(names[0], names[1]) if get_window else None
+    if window is not None:
+        lHistory = makeHistory(window, lHistory)
+        rHistory = makeHistory(window, rHistory)
+    left = RpsPlayerInfo(
+        name=names[0],
+        history=lHistory,
+        score=scores[0],
+        player=make_player(names[0], lHistory, rHistory))
+    right = RpsPlayerInfo(
+        name=names[1],
+        history=rHistory,
+        score=scores[1],
+        player=make_player(names[1], rHistory, lHistory))
+    game = RpsGameInfo(left, right)
+    game.lastWinner = lastWinner
+    game.nLastWins = nLastWins
+    game.nBeforeWins = nBeforeWins
+    game.nLastLosses = nLastLosses
+    game.nBeofreLosses = nBeofreLosses
+    return game
+
+
+def packHistory(history: Iterable[Rps]) -> bytes:
+    """Packs `history` into 2 bits per move."""
+    raw = bytes(history)
+    raw += bytes(-len(raw) % 4)
+    # Every slot of packed bytes is filled from every fourth move...
+    packed = 0
+    for slot, toSlot in enumerate(_TO_SLOTS):
+        packed |= int.from_bytes(raw[slot::4].translate(toSlot), 'little')
+    return packed.to_bytes(len(raw) // 4, 'little')
+
+
+def unpackHistory(packed: bytes, n_moves: int) -> list[Rps]:
+    """Unpacks the first `n_moves` moves of a history packed by
+    `packHistory`. Raises `ValueError` if it contains an invalid move.
+    """
+    raw = bytearray(4 * len(packed))
+    for slot, fromSlot in enumerate(_FROM_SLOTS):
+        raw[slot::4] = packed.translate(fromSlot)
+    del raw[n_moves:]
+    if 0 in raw:
+        raise ValueError('packed history contains an invalid move')
+    return [_RPS[value] for value in raw] # type: ignore
@@ -0,0 +1,240 @@
+#
+# 
+#
+"""This module offers stores of encoded RPS game states. Every state is
+kept with a version number which is replaced by every update, so
+concurrent requests for the same game, for example from two tabs, cannot
+overwrite each other's moves: an update only succeeds if the state has not
+changed since it was read. Versions are drawn from a counter of the whole
+store, so no writer can hold the version of a game which was created or
+updated after it read, not even one of a previous game with the same key.
+
+The store is configured by the `RPS_STATE_STORE` setting:
+
+```python
+RPS_STATE_STORE = {
+    'BACKEND': 'assets.challenges.rps.store.RedisRpsStateStore',
+    'LOCATION': 'redis://redis:6379/1',
+    'TIMEOUT': 3600,
+}
+```
+"""
+
+from __future__ import annotations
+from abc import ABC, abstractmethod
+import itertools
+import threading
+import time
+from typing import Any
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+
+DEFAULT_TIMEOUT = 3600
+"""The default number of seconds a game state lives since its last
+update.
+"""
+
+
+class IRpsStateStore(ABC):
+    def __init__(self, timeout: float = DEFAULT_TIMEOUT) -> None:
+        self._timeout = timeout
+        """The number of seconds a game state lives since its last
+        update.
+        """
+
+    @abstractmethod
+    def get(self, key: str) -> tuple[bytes, int] | None:
+        """Gets the state of the game with `key` and its version. It
+        returns `None` if there is no such game.
+        """
+        pass
+
+    @abstractmethod
+    def create(self, key: str, data: bytes) -> int:
+        """Stores `data` as the state of a new game with `key`, replacing
+        any previous game with the same key, and returns its version,
+        which no version of a previous game equals.
+        """
+        pass
+
+    @abstractmethod
+    def update(self, key: str, data: bytes, version: int) -> int | None:
+        """Replaces the state of the game with `key` by `data`, only if its
+        version is still `version`, and returns the new version, which is
+        greater. It returns `None` if the game has changed or does not
+        exist anymore.
+        """
+        pass
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Deletes the game with `key` if it exists."""
+        pass
+
+
+_versions = itertools.count(1)
+"""The counter of versions of game states of local memory stores of the
+current process.
+"""
+
+
+class LocMemRpsStateStore(IRpsStateStore):
+    """Keeps game states in the memory of the current process. It is only
+    suitable for a single worker.
+    """
+    def __init__(
+            self,
+            location: str = '',
+            timeout: float = DEFAULT_TIMEOUT,
+            ) -> None:
+        super().__init__(timeout)
+        self._lock = threading.Lock()
+        self._states = dict[str, tuple[bytes, int, float]]()
+        """The mapping of keys to states, versions and expiry times."""
+
+    def get(self, key: str) -> tuple[bytes, int] | None:
+        with self._lock:
+            try:
+                data, version, expiry = self._states[key]
+            except KeyError:
+                return None
+            if expiry <= time.monotonic():
+                del self._states[key]
+                return None
+            return data, version
+
+    def create(self, key: str, data: bytes) -> int:
+        with self._lock:
+            version = next(_versions)
+            self._states[key] = (
+                data,
+                version,
+                time.monotonic() + self._timeout,)
+            return version
+
+    def update(self, key: str, data: bytes, version: int) -> int | None:
+        with self._lock:
+            try:
+                _, currVersion, expiry = self._states[key]
+            except KeyError:
+                return None
+            if currVersion != version or expiry <= time.monotonic():
+                return None
+            newVersion = next(_versions)
+            self._states[key] = (
+                data,
+                newVersion,
+                time.monotonic() + self._timeout,)
+            return newVersion
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._states.pop(key, None)
+
+
+class RedisRpsStateStore(IRpsStateStore):
+    """Keeps game states in Redis hashes of `data` and `version` fields, so
+    they are shared by all workers. Versions are drawn from the counter
+    `<prefix>#versions`.
+    """
+    _CREATE_SCRIPT = """
+        local version = redis.call('INCR', KEYS[2])
+        redis.call('DEL', KEYS[1])
+        redis.call('HSET', KEYS[1], 'data', ARGV[1], 'version', version)
+        redis.call('PEXPIRE', KEYS[1], ARGV[2])
+        return version
+    """
+    """The Lua script that replaces a state by a new game atomically."""
+
+    _UPDATE_SCRIPT = """
+        if redis.call('HGET', KEYS[1], 'version') ~= ARGV[2] then
+            return false
+        end
+        local version = redis.call('INCR', KEYS[2])
+        redis.call('HSET', KEYS[1], 'data', ARGV[1], 'version', version)
+        redis.call('PEXPIRE', KEYS[1], ARGV[3])
+        return version
+    """
+    """The Lua script that compares the version of a state and updates it
+    atomically.
+    """
+
+    def __init__(
+            self,
+            location: str,
+            timeout: float = DEFAULT_TIMEOUT,
+            prefix: str = 'rps:',
+            ) -> None:
+        import redis
+        super().__init__(timeout)
+        self._prefix = prefix
+        self._versionsKey = f'{prefix}#versions'
+        """The key of the counter of versions, which keys of games, being
+        session keys, never equal.
+        """
+        self._client = redis.Redis.from_url(location)
+        self._create = self._client.register_script(self._CREATE_SCRIPT)
+        self._update = self._client.register_script(self._UPDATE_SCRIPT)
+
+    def get(self, key: str) -> tuple[bytes, int] | None:
+        data, version = self._client.hmget(
+            self._prefix + key,
+            ['data', 'version',])
+        if data is None or version is None:
+            return None
+        return data, int(version)
+
+    def create(self, key: str, data: bytes) -> int:
+        return int(self._create(
+            keys=[self._prefix + key, self._versionsKey,],
+            args=[data, self._getTimeoutMs(),]))
+
+    def update(self, key: str, data: bytes, version: int) -> int | None:
+        newVersion = self._update(
+            keys=[self._prefix + key, self._versionsKey,],
+            args=[data, version, self._getTimeoutMs(),])
+        return None if newVersion is None else int(newVersion)
+
+    def delete(self, key: str) -> None:
+        self._client.delete(self._prefix + key)
+
+    def _getTimeoutMs(self) -> int:
+        return int(self._timeout * 1000)
+
+
+_store: IRpsStateStore | None = None
+"""The store of the current process which is created on first use."""
+
+_storeLock = threading.Lock()
+
+
+def getStateStore() -> IRpsStateStore:
+    """Gets the RPS game state store configured by the `RPS_STATE_STORE`
+    setting.
+    """
+    # Declaring variables ---------------------------------
+    global _store
+    # Functioning -----------------------------------------
+    with _storeLock:
+        if _store is None:
+            config: dict[str, Any] = getattr(settings, 'RPS_STATE_STORE', {})
+            storeCls = import_string(config.get(
+                'BACKEND',
+                'assets.challenges.rps.store.LocMemRpsStateStore'))
+            _store = storeCls(
+                config.get('LOCATION', ''),
+                config.get('TIMEOUT', DEFAULT_TIMEOUT))
+        return _store
+
+
+@receiver(setting_changed)
+def _resetStateStore(setting: str, **kwargs) -> None:
+    # Declaring variables ---------------------------------
+    global _store
+    # Functioning -----------------------------------------
+    if setting == 'RPS_STATE_STORE':
+        _store = None
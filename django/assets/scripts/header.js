@@ -113,4 +113,4 @@ import { showElemAccessErr } from '/assets/scripts/funcs.js';
     const CURR_THEME = getPreferredTheme();
     switchTheme(CURR_THEME);
 })();
-//# sourceMappingURL=base.js.map
\ No newline at end of file
+//# sourceMappingURL=header.js.map
\ No newline at end of file
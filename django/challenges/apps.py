@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class ChallengesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'challenges'
+
+    def ready(self) -> None:
+        # Building the registry of RPS players at startup...
+        from assets.challenges.rps.registry import getPlayers
+        getPlayers()
@@ -0,0 +1,110 @@
+#
+# 
+#
+
+import json
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.challenges.rps.backend import RPS_DIR
+from assets.challenges.rps.benchmark import (
+    HISTORY_LENGTHS, MOVE_BUDGET_US, benchmarkPlayers, compareResults)
+from assets.challenges.rps.registry import getPlayers
+
+
+_BASELINE = RPS_DIR / 'benchmark-baseline.json'
+"""The default file of the stored baseline."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Benchmarks RPS players at several history lengths and compares the '
+        'results with a stored baseline.')
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'players',
+            nargs='*',
+            help='the names of players, all registered players by default')
+        parser.add_argument(
+            '-l',
+            '--lengths',
+            type=int,
+            nargs='+',
+            default=list(HISTORY_LENGTHS),
+            help='the lengths of histories players are measured at')
+        parser.add_argument(
+            '-n',
+            '--moves',
+            type=int,
+            default=200,
+            help='the number of measured moves per history length')
+        parser.add_argument(
+            '-o',
+            '--output',
+            type=Path,
+            help='the file to write results to, standard output by default')
+        parser.add_argument(
+            '-b',
+            '--baseline',
+            type=Path,
+            default=_BASELINE,
+            help='the JSON file of the baseline')
+        parser.add_argument(
+            '--tolerance',
+            type=float,
+            default=1.5,
+            help='the allowed ratio of latencies to their baseline')
+        parser.add_argument(
+            '--budget',
+            type=float,
+            default=MOVE_BUDGET_US,
+            help='the maximum p99 latency of move() in microseconds')
+        parser.add_argument(
+            '--update-baseline',
+            action='store_true',
+            help='stores the results as the new baseline')
+
+    def handle(self, *args, **options) -> None:
+        if options['moves'] < 2:
+            raise CommandError(
+                'at least 2 moves are needed to measure percentiles')
+        players = getPlayers()
+        for name in options['players']:
+            if name not in players:
+                raise CommandError(
+                    f"unknown RPS player: '{name}'; available players: "
+                    f"{', '.join(players)}")
+        results = benchmarkPlayers(
+            options['players'] or None,
+            options['lengths'],
+            options['moves'],
+            max(options['moves'] // 4, 10))
+        text = json.dumps(results, indent=2)
+        if options['output']:
+            options['output'].write_text(text)
+        else:
+            self.stdout.write(text)
+        baselineFile: Path = options['baseline']
+        if options['update_baseline']:
+            baselineFile.write_text(text)
+            self.stderr.write(f'baseline stored in {baselineFile}')
+            return
+        try:
+            baseline = json.loads(baselineFile.read_text())
+        except FileNotFoundError:
+            self.stderr.write(
+                f'no baseline found at {baselineFile}, only the budget is '
+                'checked')
+            baseline = None
+        regressions = compareResults(
+            results,
+            baseline,
+            options['tolerance'],
+            options['budget'])
+        if regressions:
+            raise CommandError(
+                f'{len(regressions)} regressions found:\n' +
+                '\n'.join(regressions))
+        self.stderr.write('no regressions found')
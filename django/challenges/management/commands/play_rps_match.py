@@ -0,0 +1,53 @@
+#
+# 
+#
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from assets.challenges.rps.engine import DEFAULT_BATCH_SIZE, playMatch
+from assets.challenges.rps.registry import getPlayers
+
+
+class Command(BaseCommand):
+    help = 'Plays a headless match between two RPS players.'
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument('left', help='the name of the left player')
+        parser.add_argument('right', help='the name of the right player')
+        parser.add_argument(
+            '-n',
+            '--rounds',
+            type=int,
+            default=100_000,
+            help='the number of rounds')
+        parser.add_argument(
+            '-b',
+            '--batch-size',
+            type=int,
+            default=DEFAULT_BATCH_SIZE,
+            help='the number of rounds that are scored in a batch')
+
+    def handle(self, *args, **options) -> None:
+        for option in ('rounds', 'batch_size',):
+            if options[option] < 1:
+                raise CommandError(
+                    f"{option.replace('_', ' ')} must be at least 1")
+        players = getPlayers()
+        for side in ('left', 'right',):
+            if options[side] not in players:
+                raise CommandError(
+                    f"unknown RPS player: '{options[side]}'; available "
+                    f"players: {', '.join(players)}")
+        start = time.perf_counter()
+        result = playMatch(
+            players[options['left']],
+            players[options['right']],
+            options['rounds'],
+            batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - start
+        stats = result.toDict()
+        stats['seconds'] = round(elapsed, 3)
+        self.stdout.write(json.dumps(stats, indent=2))
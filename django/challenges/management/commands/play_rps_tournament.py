@@ -0,0 +1,60 @@
+#
+# 
+#
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from challenges.tasks import getRpsTournamentProgress, startRpsTournament
+
+
+class Command(BaseCommand):
+    help = (
+        'Plays a round-robin tournament between RPS players on Celery '
+        'workers and prints the ranking table.')
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'players',
+            nargs='*',
+            help='the names of players, all registered players by default')
+        parser.add_argument(
+            '-n',
+            '--rounds',
+            type=int,
+            default=10_000,
+            help='the number of rounds of every match')
+        parser.add_argument(
+            '-c',
+            '--chunk-size',
+            type=int,
+            default=4,
+            help='the number of matches played by every task')
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=1.0,
+            help='the number of seconds between progress reports')
+
+    def handle(self, *args, **options) -> None:
+        try:
+            result = startRpsTournament(
+                options['players'] or None,
+                options['rounds'],
+                options['chunk_size'])
+        except ValueError as err:
+            raise CommandError(str(err)) from err
+        start = time.perf_counter()
+        while not result.ready():
+            progress = getRpsTournamentProgress(result)
+            self.stderr.write(
+                f"{progress['done']} matches played, "
+                f"{progress['finished_chunks']}/{progress['chunks']} chunks "
+                'finished')
+            time.sleep(options['interval'])
+        ranking = result.get()
+        self.stderr.write(
+            f'finished in {time.perf_counter() - start:.3f} seconds')
+        self.stdout.write(json.dumps(ranking, indent=2))
@@ -0,0 +1,19 @@
+#
+# 
+#
+
+from django.core.management.base import BaseCommand
+
+from assets.challenges.rps.registry import reloadPlayers, touchPlayersDir
+
+
+class Command(BaseCommand):
+    help = (
+        'Reloads the registry of RPS players. Running workers reload it on '
+        'their next check for changes of players files.')
+
+    def handle(self, *args, **options) -> None:
+        touchPlayersDir()
+        players = reloadPlayers()
+        self.stdout.write(
+            f'{len(players)} RPS players found: {', '.join(players)}')
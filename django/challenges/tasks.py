@@ -1,5 +1,161 @@
 #
 # 
 #
+"""This module offers Celery tasks of challenges.
 
+A round-robin RPS tournament is split into chunks of matches which are
+played by `playRpsMatches` tasks on any number of workers. A chord then
+passes results of all chunks to `rankRpsPlayers`, which builds the
+ranking table:
+
+```python
+result = startRpsTournament(n_rounds=100_000)
+getRpsTournamentProgress(result)  # {'done': 12, 'chunks': 7, ...}
+result.get()                      # The ranking table
+```
+"""
+
+from __future__ import annotations
+from itertools import combinations
+from typing import Any, Iterable
+
+from celery import chord, group
+from celery.result import AsyncResult
+
+from assets.challenges.rps.engine import playMatch
+from assets.challenges.rps.registry import getPlayers
 from core.celery import celeryApp
+
+
+_WIN_POINTS = 3
+"""The points a player earns for winning a match."""
+
+_DRAW_POINTS = 1
+"""The points a player earns for a drawn match."""
+
+
+@celeryApp.task(bind=True)
+def playRpsMatches(
+        self,
+        pairs: list[list[str]],
+        n_rounds: int,
+        ) -> list[dict[str, Any]]:
+    """Plays a match of `n_rounds` rounds for every pair of names of RPS
+    players in `pairs` and returns the statistics of matches. Progress is
+    reported with the custom `PROGRESS` state.
+    """
+    players = getPlayers()
+    results = list[dict[str, Any]]()
+    for left, right in pairs:
+        result = playMatch(players[left], players[right], n_rounds)
+        results.append(result.toDict())
+        if self.request.id:
+            self.update_state(
+                state='PROGRESS',
+                meta={'done': len(results), 'total': len(pairs),})
+    return results
+
+
+@celeryApp.task
+def rankRpsPlayers(
+        chunks: list[list[dict[str, Any]]],
+        ) -> list[dict[str, Any]]:
+    """Builds the ranking table of a tournament from results of its
+    `playRpsMatches` tasks. Players are ranked by points, then by the
+    difference of their won and lost rounds.
+    """
+    table = dict[str, dict[str, Any]]()
+    def getRow(name: str) -> dict[str, Any]:
+        return table.setdefault(name, {
+            'player': name,
+            'points': 0,
+            'matches': 0,
+            'wins': 0,
+            'draws': 0,
+            'losses': 0,
+            'rounds_won': 0,
+            'rounds_lost': 0,})
+    for chunk in chunks:
+        for match in chunk:
+            left = getRow(match['left'])
+            right = getRow(match['right'])
+            lWins = match['left_wins']
+            rWins = match['right_wins']
+            for row, won, lost in (
+                    (left, lWins, rWins,),
+                    (right, rWins, lWins,),):
+                row['matches'] += 1
+                row['rounds_won'] += won
+                row['rounds_lost'] += lost
+                if won > lost:
+                    row['wins'] += 1
+                    row['points'] += _WIN_POINTS
+                elif won < lost:
+                    row['losses'] += 1
+                else:
+                    row['draws'] += 1
+                    row['points'] += _DRAW_POINTS
+    ranking = sorted(
+        table.values(),
+        key=lambda row: (
+            -row['points'],
+            row['rounds_lost'] - row['rounds_won'],
+            row['player'],))
+    for rank, row in enumerate(ranking, 1):
+        row['rank'] = rank
+    return ranking
+
+
+def makeRpsPairs(names: Iterable[str]) -> list[list[str]]:
+    """Gets the pairs of a round-robin between players with `names`, every
+    player meeting every other player once.
+    """
+    return [list(pair) for pair in combinations(sorted(set(names)), 2)]
+
+
+def startRpsTournament(
+        names: Iterable[str] | None = None,
+        n_rounds: int = 10_000,
+        chunk_size: int = 4,
+        ) -> AsyncResult:
+    """Starts a round-robin tournament between RPS players with `names`,
+    or all registered players if it is `None`, and returns the result of
+    its ranking task. Every task plays at most `chunk_size` matches of
+    `n_rounds` rounds. Raises `ValueError` if a name is not registered or
+    there are fewer than two players.
+    """
+    players = getPlayers()
+    names = list(players if names is None else names)
+    unknown = set(names).difference(players)
+    if unknown:
+        raise ValueError(f"unknown RPS players: {', '.join(sorted(unknown))}")
+    pairs = makeRpsPairs(names)
+    if not pairs:
+        raise ValueError('a tournament needs at least two players')
+    if chunk_size < 1:
+        raise ValueError('chunk size must be positive')
+    header = group(
+        playRpsMatches.s(pairs[idx:idx + chunk_size], n_rounds)
+        for idx in range(0, len(pairs), chunk_size))
+    return chord(header)(rankRpsPlayers.s())
+
+
+def getRpsTournamentProgress(result: AsyncResult) -> dict[str, Any]:
+    """Gets the progress of a tournament started by `startRpsTournament`:
+    the number of `done` matches, the number of `chunks` and of
+    `finished_chunks`, and whether the ranking is `ready`.
+    """
+    chunks = result.parent.results if result.parent else []
+    nDone = 0
+    nFinished = 0
+    for chunk in chunks:
+        if chunk.successful():
+            nDone += len(chunk.result)
+            nFinished += 1
+        elif chunk.state == 'PROGRESS':
+            nDone += chunk.info['done']
+    return {
+        'done': nDone,
+        'chunks': len(chunks),
+        'finished_chunks': nFinished,
+        'ready': result.ready(),}
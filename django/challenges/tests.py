@@ -1,3 +1,1355 @@
-from django.test import TestCase
+#
+# 
+#
 
-# Create your tests here.
+from abc import ABC, abstractmethod
+import asyncio
+import base64
+from collections import Counter, defaultdict, deque
+import gc
+import importlib.util
+import json
+import os
+import pickle
+import random
+import threading
+import time
+from typing import Any, MutableSequence
+from unittest import mock, skipUnless
+
+from django.conf import settings
+from django.contrib.sessions.backends.base import SessionBase
+from django.core.management import call_command
+from django.core.management.base import CommandError
+from django.http import HttpResponse
+from django.test import RequestFactory, TestCase, override_settings
+from celery.contrib.testing.worker import start_worker
+import numpy as np
+import redis
+
+from assets.challenges.random_ints.backend import (
+    _startStreamingRandInts, generateRandomData,)
+from assets.challenges.random_ints.frames import (
+    getFrameMaker, getSeededFrameMaker,)
+from assets.challenges.random_ints import backend, hub, pool
+from assets.challenges.random_ints.stats import RunningStats
+from assets.challenges.random_ints.streams import getStreamStats, stopStream
+from assets.challenges.rps import registry
+from assets.challenges.rps.rps import (
+    IRpsPlayer, Rps, getWindow, makeHistory)
+from assets.challenges.rps.rps.rps_1x import Rps10Player
+from assets.challenges.rps.backend import _move
+from assets.challenges.rps.benchmark import benchmarkPlayers, compareResults
+from assets.challenges.rps.channel import serveRpsChannel
+from assets.challenges.rps.engine import OUTCOMES, playMatch
+from assets.challenges.rps.rps.random import RandomRpsPlayer
+from assets.challenges.rps.state import (
+    RpsGameInfo, RpsPlayerInfo, dumpGameInfo, loadGameInfo)
+from assets.challenges.rps.store import (
+    IRpsStateStore, LocMemRpsStateStore, RedisRpsStateStore, getStateStore)
+from core.celery import celeryApp
+from challenges.tasks import (
+    getRpsTournamentProgress, makeRpsPairs, rankRpsPlayers,
+    startRpsTournament)
+
+
+class _LegacyRps10Player(IRpsPlayer):
+    """The implementation of `Rps10Player` that rescans the rival history
+    on every move. It is kept as the reference for the incremental one.
+    """
+    name = 'Legacy RPS 10'
+
+    def move(self) -> Rps:
+        predicts: dict[Rps, int] = defaultdict(lambda: 0)
+        if len(self._rivalHistory) >= 5:
+            map_ = self._listToDict(self._rivalHistory[-5:])
+            res = self._decide(map_, 5)
+            if isinstance(res, Rps):
+                return res.getDefier()
+            elif isinstance(res, tuple):
+                for spsc in res:
+                    predicts[spsc] += 1
+        if len(self._rivalHistory) >= 10:
+            map_ = self._listToDict(self._rivalHistory[-10:-5], map_) # type: ignore
+            res = self._decide(map_, 10)
+            if isinstance(res, Rps):
+                return res.getDefier()
+            elif isinstance(res, tuple):
+                for spsc in predicts:
+                    predicts[spsc] += 1
+                for spsc in res:
+                    predicts[spsc] += 1
+        if len(self._rivalHistory) >= 20:
+            for n in range(20, len(self._rivalHistory), 10):
+                map_ = self._listToDict(self._rivalHistory[-n:(10-n)], map_) # type: ignore
+                res = self._decide(map_, 10)
+                if isinstance(res, Rps):
+                    for spsc in predicts:
+                        predicts[spsc] += 1
+                    predicts[res] += 1
+                elif isinstance(res, tuple):
+                    for spsc in predicts:
+                        predicts[spsc] += 1
+                    for spsc in res:
+                        predicts[spsc] += 1
+        for spsc in Rps:
+            predicts[spsc] += 1
+        weights = [predicts[spsc] for spsc in Rps]
+        guess = random.choices(list(Rps), weights, k=1)[0]
+        return guess.getDefier()
+
+    def _listToDict(
+            self,
+            sub_history: list[Rps],
+            map_: dict[Rps, int] | None = None,
+            ) -> dict[Rps, int]:
+        if map_ is None:
+            map_ = defaultdict(lambda: 0)
+        for elem in sub_history:
+            map_[elem] += 1
+        return map_
+
+    def _decide(
+            self,
+            map_: dict[Rps, int],
+            sum_: int,
+            ) -> None | Rps | tuple[Rps] | tuple[Rps, Rps]:
+        highFreq: list[Rps] = []
+        for elem in map_:
+            freq = map_[elem] / sum_
+            if freq >= 0.65:
+                return elem
+            elif freq >= 0.4:
+                highFreq.append(elem)
+        if len(highFreq) > 0:
+            return tuple(highFreq) # type: ignore
+
+
+def _recordRivalMoves(seed: int, n: int) -> list[Rps]:
+    """Records `n` rival moves of a rival whose bias drifts over time, so
+    that every decision path of `Rps10Player` is exercised.
+    """
+    rand = random.Random(seed)
+    moves = list[Rps]()
+    weights = [1, 1, 1]
+    for idx in range(n):
+        if idx % 15 == 0:
+            weights = [rand.choice([0, 1, 2, 6]) or 1 for _ in Rps]
+        moves.append(rand.choices(list(Rps), weights, k=1)[0])
+    return moves
+
+
+class Rps10PlayerTests(TestCase):
+    def _assertSameDecisions(self, rival_moves: list[Rps]) -> None:
+        legacyHistory, legacyRival = list[Rps](), list[Rps]()
+        legacy = _LegacyRps10Player(legacyHistory, legacyRival)
+        history, rival = list[Rps](), list[Rps]()
+        player = Rps10Player(history, rival)
+        for idx, rivalMove in enumerate(rival_moves):
+            random.seed(idx)
+            expected = legacy.move()
+            random.seed(idx)
+            actual = player.move()
+            self.assertEqual(expected, actual, f'differs at move {idx}')
+            legacyHistory.append(expected)
+            legacyRival.append(rivalMove)
+            history.append(actual)
+            rival.append(rivalMove)
+
+    def test_same_decisions_as_rescanning(self) -> None:
+        for seed in range(20):
+            with self.subTest(seed=seed):
+                self._assertSameDecisions(_recordRivalMoves(seed, 400))
+
+    def test_same_decisions_on_patterns(self) -> None:
+        patterns = [
+            [Rps.ROCK] * 120,
+            list(Rps) * 60,
+            [Rps.ROCK, Rps.ROCK, Rps.PAPER] * 50,
+            [Rps.SCISSORS] * 40 + [Rps.PAPER, Rps.ROCK] * 40,
+            [Rps.PAPER] * 3 + [Rps.ROCK] * 7 + list(Rps) * 40,]
+        for pattern in patterns:
+            with self.subTest(pattern=pattern[:12]):
+                self._assertSameDecisions(pattern)
+
+    def test_catches_up_with_existing_history(self) -> None:
+        rivalMoves = _recordRivalMoves(7, 300)
+        legacy = _LegacyRps10Player([], rivalMoves)
+        player = Rps10Player([], list(rivalMoves))
+        random.seed(7)
+        expected = legacy.move()
+        random.seed(7)
+        self.assertEqual(expected, player.move())
+
+    def test_move_cost_is_flat(self) -> None:
+        def timeMoves(n_history: int) -> float:
+            rival = [random.choice(list(Rps)) for _ in range(n_history)]
+            player = Rps10Player([], rival)
+            player.move()
+            start = time.perf_counter()
+            for _ in range(200):
+                rival.append(random.choice(list(Rps)))
+                player.move()
+            return time.perf_counter() - start
+        short = min(timeMoves(10) for _ in range(3))
+        long = min(timeMoves(100_000) for _ in range(3))
+        self.assertLess(long, 10 * short + 0.05)
+
+
+def _makeRps10Player(
+        name: str,
+        history: list[Rps],
+        rival_history: list[Rps],
+        ) -> IRpsPlayer | None:
+    return None if name == 'User' else Rps10Player(history, rival_history)
+
+
+def _playGame(n_moves: int) -> RpsGameInfo:
+    """Plays `n_moves` random user moves against `Rps10Player`."""
+    userHistory, comHistory = list[Rps](), list[Rps]()
+    com = Rps10Player(comHistory, userHistory)
+    for _ in range(n_moves):
+        comHistory.append(com.move())
+        userHistory.append(random.choice(list(Rps)))
+    game = RpsGameInfo(
+        RpsPlayerInfo('User', userHistory, 17),
+        RpsPlayerInfo(Rps10Player.name, comHistory, 23, com))
+    game.lastWinner = 'com'
+    game.nLastWins, game.nBeforeWins = 1, 3
+    game.nLastLosses, game.nBeofreLosses = 2, 4
+    return game
+
+
+class RpsGameStateTests(TestCase):
+    def test_round_trip(self) -> None:
+        for nMoves in (0, 1, 3, 4, 5, 101):
+            with self.subTest(n_moves=nMoves):
+                game = _playGame(nMoves)
+                loaded = loadGameInfo(dumpGameInfo(game), _makeRps10Player)
+                for attr in RpsGameInfo.__slots__[2:]:
+                    self.assertEqual(
+                        getattr(game, attr),
+                        getattr(loaded, attr))
+                for side in ('left', 'right',):
+                    info = getattr(game, side)
+                    loadedInfo = getattr(loaded, side)
+                    self.assertEqual(info.name, loadedInfo.name)
+                    self.assertEqual(info.score, loadedInfo.score)
+                    self.assertEqual(info.history, loadedInfo.history)
+                self.assertIsNone(loaded.left.player)
+                self.assertIsInstance(loaded.right.player, Rps10Player)
+                self.assertIs(
+                    loaded.right.player._rivalHistory, # type: ignore
+                    loaded.left.history)
+
+    def test_rebuilt_player_decides_the_same(self) -> None:
+        game = _playGame(500)
+        loaded = loadGameInfo(dumpGameInfo(game), _makeRps10Player)
+        random.seed(0)
+        expected = game.right.player.move() # type: ignore
+        random.seed(0)
+        self.assertEqual(expected, loaded.right.player.move()) # type: ignore
+
+    def test_smaller_than_pickle(self) -> None:
+        game = _playGame(1000)
+        self.assertLess(
+            len(dumpGameInfo(game)),
+            len(pickle.dumps(game)) // 5)
+
+    def test_rejects_invalid_states(self) -> None:
+        data = dumpGameInfo(_playGame(10))
+        for bad in (b'', data[:-1], b'\x7f' + data[1:],):
+            with self.assertRaises(ValueError):
+                loadGameInfo(bad, _makeRps10Player)
+
+    def test_rejects_too_long_names(self) -> None:
+        game = _playGame(10)
+        game.right.name = 'é' * 128
+        with self.assertRaises(ValueError):
+            dumpGameInfo(game)
+
+
+_TEST_REDIS_URL = os.environ.get('TEST_REDIS_URL', '')
+"""The URL of a Redis server for tests of the Redis state store and of
+pools of random integers. Those tests are skipped if it is not set.
+"""
+
+
+class _RpsStateStoreTestsMixin(ABC):
+    @abstractmethod
+    def makeStore(self, timeout: float = 60) -> IRpsStateStore:
+        """Makes a new and empty state store of the tested type."""
+        pass
+
+    def test_versions(self) -> None:
+        store = self.makeStore()
+        self.assertIsNone(store.get('game'))
+        first = store.create('game', b'a')
+        self.assertEqual(store.get('game'), (b'a', first,))
+        second = store.update('game', b'b', first)
+        self.assertIsNotNone(second)
+        self.assertGreater(second, first) # type: ignore
+        self.assertIsNone(store.update('game', b'c', first))
+        self.assertEqual(store.get('game'), (b'b', second,))
+        third = store.create('game', b'd')
+        self.assertNotIn(third, (first, second,))
+        store.delete('game')
+        self.assertIsNone(store.get('game'))
+        self.assertIsNone(store.update('game', b'e', third))
+
+    def test_stale_writers_of_previous_games_are_rejected(self) -> None:
+        store = self.makeStore()
+        version = store.create('game', b'a')
+        store.create('game', b'b')
+        self.assertIsNone(store.update('game', b'c', version))
+        self.assertIsNone(store.update('game', b'c', 1))
+        self.assertEqual(store.get('game')[0], b'b') # type: ignore
+
+    def test_expiry(self) -> None:
+        store = self.makeStore(timeout=0.05)
+        store.create('game', b'a')
+        time.sleep(0.1)
+        self.assertIsNone(store.get('game'))
+
+    def test_concurrent_moves_of_threads_are_not_lost(self) -> None:
+        nThreads, nMoves = 8, 50
+        store = self.makeStore()
+        game = RpsGameInfo(
+            RpsPlayerInfo('User', []),
+            RpsPlayerInfo(Rps10Player.name, []))
+        firstVersion = store.create('rps-test-game', dumpGameInfo(game))
+        session = SessionBase('rps-test-game')
+        statuses = list[int]()
+        def playMoves() -> None:
+            for _ in range(nMoves):
+                userMove = random.choice(['rock', 'paper', 'scissors'])
+                statuses.append(_move(userMove, session).status_code)
+        threads = [
+            threading.Thread(target=playMoves)
+            for _ in range(nThreads)]
+        with mock.patch(
+                'assets.challenges.rps.backend.getStateStore',
+                return_value=store):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(statuses), nThreads * nMoves)
+        self.assertLessEqual(set(statuses), {200, 409})
+        data, version = store.get('rps-test-game') # type: ignore
+        game = loadGameInfo(data, _makeRps10Player)
+        self.assertEqual(len(game.left.history), statuses.count(200))
+        self.assertGreaterEqual(version - firstVersion, statuses.count(200))
+
+
+class LocMemRpsStateStoreTests(_RpsStateStoreTestsMixin, TestCase):
+    def makeStore(self, timeout: float = 60) -> IRpsStateStore:
+        return LocMemRpsStateStore(timeout=timeout)
+
+
+@skipUnless(
+    importlib.util.find_spec('fakeredis') and importlib.util.find_spec('lupa'),
+    'fakeredis or lupa is not installed')
+class FakeRedisRpsStateStoreTests(_RpsStateStoreTestsMixin, TestCase):
+    """Runs the Lua scripts of the Redis state store, which compare
+    versions across workers, without a Redis server.
+    """
+    def makeStore(self, timeout: float = 60) -> IRpsStateStore:
+        import fakeredis
+        client = fakeredis.FakeRedis(server=fakeredis.FakeServer())
+        with mock.patch('redis.Redis.from_url', return_value=client):
+            return RedisRpsStateStore('redis://fake', timeout)
+
+
+@skipUnless(_TEST_REDIS_URL, 'TEST_REDIS_URL is not set')
+class RedisRpsStateStoreTests(_RpsStateStoreTestsMixin, TestCase):
+    def makeStore(self, timeout: float = 60) -> IRpsStateStore:
+        store = RedisRpsStateStore(
+            _TEST_REDIS_URL,
+            timeout,
+            prefix=f'rps-test-{os.getpid()}:')
+        self.addCleanup(store.delete, 'game')
+        self.addCleanup(store.delete, 'rps-test-game')
+        self.addCleanup(store._client.delete, store._versionsKey)
+        return store
+
+
+class _ScriptedRpsPlayer(IRpsPlayer):
+    """Plays the moves of `script` in order."""
+    name = 'Scripted'
+    window = 0
+    script = list[Rps]()
+
+    def __init__(
+            self,
+            history: MutableSequence[Rps],
+            rival_history: MutableSequence[Rps],
+            ) -> None:
+        super().__init__(history, rival_history)
+        self._moves = iter(self.script)
+
+    def move(self) -> Rps:
+        return next(self._moves)
+
+
+class _CountingRpsPlayer(IRpsPlayer):
+    """Plays the defier of the most frequent of the last rival moves, which
+    it counts as it observes them, and records its moves.
+    """
+    name = 'Counting'
+    window = 5
+    moves = list[Rps]()
+
+    def __init__(
+            self,
+            history: MutableSequence[Rps],
+            rival_history: MutableSequence[Rps],
+            ) -> None:
+        super().__init__(history, rival_history)
+        self._recent = deque(rival_history, maxlen=self.window)
+        self._counts = Counter(self._recent)
+
+    def move(self) -> Rps:
+        if self._recent:
+            own = max(Rps, key=self._counts.__getitem__).getDefier()
+        else:
+            own = Rps.ROCK
+        self.moves.append(own)
+        return own
+
+    def observe(self, own: Rps, rival: Rps) -> None:
+        if len(self._recent) == self.window:
+            self._counts[self._recent[0]] -= 1
+        self._recent.append(rival)
+        self._counts[rival] += 1
+
+
+class RpsViewTests(TestCase):
+    def _post(self, data: dict[str, Any]) -> HttpResponse:
+        return self.client.post(
+            '/challenges/rps',
+            json.dumps(data),
+            content_type='application/json',
+            secure=True)
+
+    def _start(self, com: str = Rps10Player.name) -> None:
+        resp = self._post({
+            'action': 'start',
+            'left': 'User',
+            'right': com,})
+        self.assertEqual(resp.status_code, 200)
+
+    def test_observing_players_play_as_in_matches(self) -> None:
+        userMoves = random.choices(list(Rps), k=30)
+        _ScriptedRpsPlayer.script = userMoves
+        _CountingRpsPlayer.moves.clear()
+        playMatch(_ScriptedRpsPlayer, _CountingRpsPlayer, len(userMoves))
+        matchMoves = _CountingRpsPlayer.moves.copy()
+        _CountingRpsPlayer.moves.clear()
+        with mock.patch(
+                'assets.challenges.rps.backend.getPlayers',
+                return_value={_CountingRpsPlayer.name: _CountingRpsPlayer}):
+            self._start(_CountingRpsPlayer.name)
+            # Every move rebuilds the player in a separate request...
+            comMoves = [
+                self._post({
+                    'action': 'move',
+                    'move': userMove.name.lower(),}).json()['com_move']
+                for userMove in userMoves]
+        self.assertEqual(_CountingRpsPlayer.moves, matchMoves)
+        self.assertEqual(
+            comMoves,
+            [move.name.lower() for move in matchMoves])
+
+    def test_batched_moves_match_single_moves(self) -> None:
+        userMoves = [
+            random.choice(['rock', 'paper', 'scissors'])
+            for _ in range(60)]
+        self._start()
+        random.seed(3)
+        singles = [
+            self._post({'action': 'move', 'move': userMove}).json()
+            for userMove in userMoves]
+        self._start()
+        random.seed(3)
+        resp = self._post({'action': 'moves', 'moves': userMoves})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.json()['results'], singles)
+
+    def test_batched_moves_are_validated(self) -> None:
+        self._start()
+        for moves in (
+                [], 'rock', ['rock', 'stone'], ['rock'] * 1001, [[1]],
+                [{'rock': 1}],):
+            with self.subTest(moves=moves[:3]):
+                resp = self._post({'action': 'moves', 'moves': moves})
+                self.assertEqual(resp.status_code, 400)
+        for move in ('stone', [1], {'rock': 1},):
+            with self.subTest(move=move):
+                resp = self._post({'action': 'move', 'move': move})
+                self.assertEqual(resp.status_code, 400)
+
+    def test_moves_need_a_game(self) -> None:
+        resp = self._post({'action': 'moves', 'moves': ['rock']})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_games_need_known_players(self) -> None:
+        for com in ('No such player', 'x' * 300, ['list'],):
+            with self.subTest(com=com[:3]):
+                resp = self._post({
+                    'action': 'start',
+                    'left': 'User',
+                    'right': com,})
+                self.assertEqual(resp.status_code, 400)
+
+    def test_games_of_removed_players_are_rejected(self) -> None:
+        self._start()
+        with mock.patch(
+                'assets.challenges.rps.backend.getPlayers',
+                return_value={}):
+            resp = self._post({'action': 'move', 'move': 'rock'})
+        self.assertEqual(resp.status_code, 400)
+
+    def test_windowed_player_keeps_bounded_state(self) -> None:
+        self._start(RandomRpsPlayer.name)
+        for _ in range(3):
+            resp = self._post({'action': 'moves', 'moves': ['rock'] * 100})
+            self.assertEqual(resp.status_code, 200)
+        last = resp.json()['results'][-1]
+        data, _ = getStateStore().get( # type: ignore
+            self.client.session.session_key)
+        game = loadGameInfo(data, lambda *args: None)
+        self.assertEqual(len(game.left.history), RandomRpsPlayer.window)
+        self.assertEqual(game.left.score, last['user_score'])
+        self.assertEqual(game.right.score, last['com_score'])
+
+
+class RpsChannelTests(TestCase):
+    def setUp(self) -> None:
+        self.store = LocMemRpsStateStore()
+        game = RpsGameInfo(
+            RpsPlayerInfo('User', []),
+            RpsPlayerInfo(Rps10Player.name, []))
+        self.store.create('rps-test-game', dumpGameInfo(game))
+        patcher = mock.patch(
+            'assets.challenges.rps.channel.getStateStore',
+            return_value=self.store)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def _serve(
+            self,
+            messages: list[dict[str, Any]],
+            headers: dict[str, str] | None = None,
+            before_receive: Any = None,
+            receive_delay: float = 0.0,
+            ) -> list[dict[str, Any]]:
+        """Serves a channel connection which sends `messages` and then
+        disconnects, and returns the events the channel sent. If provided,
+        `before_receive` is called with the number of events left before
+        every event is received by the channel, which waits
+        `receive_delay` seconds for every event.
+        """
+        if headers is None:
+            headers = {'cookie': 'sessionid=rps-test-game'}
+        events = [{'type': 'websocket.connect'}]
+        events.extend(
+            {'type': 'websocket.receive', 'text': json.dumps(message)}
+            for message in messages)
+        events.append({'type': 'websocket.disconnect', 'code': 1000})
+        sent = list[dict[str, Any]]()
+        async def receive() -> dict[str, Any]:
+            if before_receive:
+                before_receive(len(events))
+            await asyncio.sleep(receive_delay)
+            return events.pop(0)
+        async def send(event: dict[str, Any]) -> None:
+            sent.append(event)
+        scope = {
+            'type': 'websocket',
+            'path': '/challenges/rps/channel',
+            'headers': [
+                (name.encode(), value.encode(),)
+                for name, value in headers.items()],}
+        await serveRpsChannel(scope, receive, send)
+        return sent
+
+    def _getHistoryLen(self) -> int:
+        data, _ = self.store.get('rps-test-game') # type: ignore
+        return len(loadGameInfo(data, _makeRps10Player).left.history)
+
+    async def test_plays_and_saves_on_disconnect(self) -> None:
+        sent = await self._serve([
+            {'action': 'move', 'move': 'rock'},
+            {'action': 'moves', 'moves': ['paper', 'scissors']},
+            {'action': 'move', 'move': 'stone'},])
+        self.assertEqual(sent[0]['type'], 'websocket.accept')
+        replies = [json.loads(event['text']) for event in sent[1:]]
+        self.assertEqual(replies[0]['user_move'], 'rock')
+        self.assertEqual(
+            [result['user_move'] for result in replies[1]['results']],
+            ['paper', 'scissors'])
+        self.assertEqual(replies[2]['status'], 'error')
+        self.assertEqual(self._getHistoryLen(), 3)
+
+    async def test_bad_moves_are_answered_with_errors(self) -> None:
+        sent = await self._serve([
+            {'action': 'moves', 'moves': [[1]]},
+            {'action': 'move', 'move': {'rock': 1}},
+            {'action': 'move', 'move': 'rock'},])
+        replies = [json.loads(event['text']) for event in sent[1:]]
+        self.assertEqual(
+            [reply.get('status') for reply in replies[:2]],
+            ['error', 'error',])
+        self.assertEqual(replies[2]['user_move'], 'rock')
+        self.assertEqual(self._getHistoryLen(), 1)
+
+    async def test_final_flush_waits_for_periodic_flush(self) -> None:
+        update = self.store.update
+        def slowUpdate(*args) -> int | None:
+            time.sleep(0.05)
+            return update(*args)
+        moves = [{'action': 'move', 'move': 'rock'}] * 3
+        with mock.patch.object(self.store, 'update', slowUpdate), \
+                mock.patch(
+                    'assets.challenges.rps.channel._FLUSH_INTERVAL',
+                    0.001), \
+                self.assertNoLogs('megacodist', 'WARNING'):
+            # Disconnecting while the flusher updates the store...
+            await self._serve(moves, receive_delay=0.02)
+        self.assertEqual(self._getHistoryLen(), 3)
+
+    async def test_closes_without_game(self) -> None:
+        sent = await self._serve([], {'cookie': 'sessionid=no-such-game'})
+        self.assertEqual(sent[-1], {'type': 'websocket.close', 'code': 4404})
+
+    async def test_closes_games_of_removed_players(self) -> None:
+        with mock.patch(
+                'assets.challenges.rps.backend.getPlayers',
+                return_value={}):
+            sent = await self._serve([{'action': 'move', 'move': 'rock'}])
+        self.assertEqual(sent[-1], {'type': 'websocket.close', 'code': 4404})
+
+    async def test_rejects_other_origins(self) -> None:
+        sent = await self._serve([], {
+            'cookie': 'sessionid=rps-test-game',
+            'host': 'megacodist.com',
+            'origin': 'https://evil.example',})
+        self.assertEqual(sent, [{'type': 'websocket.close'}])
+
+    async def test_closes_when_game_changes_outside(self) -> None:
+        def changeGame(n_left: int) -> None:
+            # Changing the game before the fourth message...
+            if n_left == 3:
+                data, version = self.store.get('rps-test-game') # type: ignore
+                self.store.update('rps-test-game', data, version)
+        moves = [{'action': 'moves', 'moves': ['rock'] * 10}] * 5
+        with mock.patch('assets.challenges.rps.channel._FLUSH_MOVES', 20):
+            sent = await self._serve(moves, before_receive=changeGame)
+        self.assertEqual(self._getHistoryLen(), 20)
+        self.assertEqual(sent[-1], {'type': 'websocket.close', 'code': 4409})
+
+    async def test_final_flush_keeps_restarted_games(self) -> None:
+        newGame = dumpGameInfo(RpsGameInfo(
+            RpsPlayerInfo('User', []),
+            RpsPlayerInfo(Rps10Player.name, [])))
+        def restartGame(n_left: int) -> None:
+            # Stopping and starting the game again before disconnecting...
+            if n_left == 1:
+                self.store.create('rps-test-game', newGame)
+        moves = [{'action': 'move', 'move': 'rock'}] * 3
+        with self.assertLogs('megacodist', 'WARNING'):
+            await self._serve(moves, before_receive=restartGame)
+        data, _ = self.store.get('rps-test-game') # type: ignore
+        self.assertEqual(data, newGame)
+
+
+class RpsPlayersRegistryTests(TestCase):
+    def test_snapshot_is_read_only(self) -> None:
+        players = registry.getPlayers()
+        self.assertIs(players[Rps10Player.name], Rps10Player)
+        with self.assertRaises(TypeError):
+            players['Other'] = Rps10Player # type: ignore
+
+    def test_rebuilds_only_on_changes(self) -> None:
+        players = registry.reloadPlayers()
+        registry._nextCheck = 0.0
+        self.assertIs(registry.getPlayers(), players)
+        getStamp = registry._getStamp
+        def getTouchedStamp() -> tuple[tuple[str, int], ...]:
+            # Faking a touch of the players directory, not changing it...
+            stamp = getStamp()
+            return (('', stamp[0][1] + 1,), *stamp[1:],)
+        registry._nextCheck = 0.0
+        with mock.patch.object(
+                registry,
+                '_getStamp',
+                side_effect=getTouchedStamp):
+            self.assertIsNot(registry.getPlayers(), players)
+            self.assertEqual(registry.getPlayers().keys(), players.keys())
+
+    def test_readers_never_see_partial_registry(self) -> None:
+        names = set(registry.reloadPlayers())
+        seen = list[set[str]]()
+        stop = threading.Event()
+        def read() -> None:
+            while not stop.is_set():
+                seen.append(set(registry.getPlayers()))
+        readers = [threading.Thread(target=read) for _ in range(4)]
+        for reader in readers:
+            reader.start()
+        for _ in range(50):
+            registry.reloadPlayers()
+        stop.set()
+        for reader in readers:
+            reader.join()
+        self.assertTrue(seen)
+        self.assertTrue(all(players == names for players in seen))
+
+
+class _WindowedRpsPlayer(IRpsPlayer):
+    """Plays the defier of the rival's last move and records what it
+    observes.
+    """
+    name = 'Windowed'
+    window = 3
+    observed = list[tuple[Rps, Rps, int]]()
+    """The observed moves along with the lengths of rival histories."""
+
+    def move(self) -> Rps:
+        if not self._rivalHistory:
+            return Rps.ROCK
+        return self._rivalHistory[-1].getDefier()
+
+    def observe(self, own: Rps, rival: Rps) -> None:
+        assert self._history[-1] is own and self._rivalHistory[-1] is rival
+        self.observed.append((own, rival, len(self._rivalHistory),))
+
+
+class RpsMatchEngineTests(TestCase):
+    def test_outcomes_agree_with_choices(self) -> None:
+        for left in Rps:
+            for right in Rps:
+                expected = 1 if left > right else -1 if left < right else 0
+                self.assertEqual(
+                    OUTCOMES[left.value - 1, right.value - 1],
+                    expected)
+
+    def test_match_statistics(self) -> None:
+        random.seed(7)
+        result = playMatch(
+            RandomRpsPlayer,
+            Rps10Player,
+            3_000,
+            keep_rounds=True,
+            batch_size=1_000)
+        self.assertEqual(result.nRounds, 3_000)
+        self.assertEqual(
+            result.leftWins + result.rightWins + result.draws,
+            3_000)
+        self.assertEqual(result.leftChoices.sum(), 3_000)
+        self.assertEqual(result.rightChoices.sum(), 3_000)
+        self.assertEqual(len(result.outcomes), 3_000) # type: ignore
+        self.assertEqual(
+            result.getScoreDiffs()[-1],
+            result.leftWins - result.rightWins)
+
+    def test_scores_match_round_by_round_play(self) -> None:
+        random.seed(11)
+        result = playMatch(Rps10Player, RandomRpsPlayer, 500, batch_size=64)
+        random.seed(11)
+        lHistory = list[Rps]()
+        rHistory = list[Rps]()
+        lPlayer = Rps10Player(lHistory, rHistory)
+        rPlayer = RandomRpsPlayer(rHistory, lHistory)
+        lWins = 0
+        rWins = 0
+        for _ in range(500):
+            lMove = lPlayer.move()
+            rMove = rPlayer.move()
+            lHistory.append(lMove)
+            rHistory.append(rMove)
+            if lMove > rMove:
+                lWins += 1
+            elif lMove < rMove:
+                rWins += 1
+        self.assertEqual(result.leftWins, lWins)
+        self.assertEqual(result.rightWins, rWins)
+
+    def test_windowed_histories(self) -> None:
+        self.assertEqual(getWindow(RandomRpsPlayer, None), 0)
+        self.assertEqual(getWindow(RandomRpsPlayer, _WindowedRpsPlayer), 3)
+        self.assertIsNone(getWindow(_WindowedRpsPlayer, Rps10Player))
+        self.assertIsInstance(makeHistory(None), list)
+        history = makeHistory(2, [Rps.ROCK, Rps.PAPER, Rps.SCISSORS])
+        history.append(Rps.ROCK)
+        self.assertEqual(list(history), [Rps.SCISSORS, Rps.ROCK])
+
+    def test_bad_sizes_are_rejected(self) -> None:
+        with self.assertRaises(ValueError):
+            playMatch(RandomRpsPlayer, RandomRpsPlayer, -1)
+        with self.assertRaises(ValueError):
+            playMatch(RandomRpsPlayer, RandomRpsPlayer, 10, batch_size=0)
+        for args in (('--rounds', '-5',), ('--batch-size', '0',),):
+            with self.assertRaises(CommandError):
+                call_command(
+                    'play_rps_match',
+                    RandomRpsPlayer.name,
+                    RandomRpsPlayer.name,
+                    *args)
+
+    def test_players_observe_rounds(self) -> None:
+        _WindowedRpsPlayer.observed.clear()
+        result = playMatch(
+            _WindowedRpsPlayer,
+            RandomRpsPlayer,
+            100,
+            keep_rounds=True,
+            batch_size=32)
+        observed = _WindowedRpsPlayer.observed
+        self.assertEqual(len(observed), 100)
+        self.assertEqual(
+            [nRival for _, _, nRival in observed],
+            [1, 2, *([3] * 98)])
+        for (own, _, _), (_, rival, _) in zip(observed[1:], observed):
+            self.assertIs(own, rival.getDefier())
+        self.assertEqual(
+            result.outcomes.tolist(), # type: ignore
+            [OUTCOMES[own - 1, rival - 1] for own, rival, _ in observed])
+
+
+def _makeMatch(
+        left: str,
+        right: str,
+        left_wins: int,
+        right_wins: int,
+        ) -> dict[str, Any]:
+    return {
+        'left': left,
+        'right': right,
+        'left_wins': left_wins,
+        'right_wins': right_wins,}
+
+
+class RpsTournamentTests(TestCase):
+    def test_round_robin_pairs(self) -> None:
+        pairs = makeRpsPairs(['c', 'a', 'b', 'a'])
+        self.assertEqual(pairs, [['a', 'b'], ['a', 'c'], ['b', 'c']])
+
+    def test_ranking(self) -> None:
+        chunks = [
+            [_makeMatch('a', 'b', 10, 5), _makeMatch('a', 'c', 4, 4)],
+            [_makeMatch('b', 'c', 9, 3)],]
+        ranking = rankRpsPlayers(chunks)
+        self.assertEqual([row['player'] for row in ranking], ['a', 'b', 'c'])
+        self.assertEqual([row['points'] for row in ranking], [4, 3, 1])
+        self.assertEqual([row['rank'] for row in ranking], [1, 2, 3])
+        self.assertEqual(ranking[1]['rounds_won'], 14)
+        self.assertEqual(ranking[1]['rounds_lost'], 13)
+        self.assertTrue(all(row['matches'] == 2 for row in ranking))
+
+    def test_rejects_unknown_players(self) -> None:
+        with self.assertRaises(ValueError):
+            startRpsTournament(['No Such Player', Rps10Player.name])
+        with self.assertRaises(ValueError):
+            startRpsTournament([Rps10Player.name])
+
+    @override_settings(
+        CELERY_BROKER_URL='memory://',
+        CELERY_RESULT_BACKEND='cache+memory://')
+    def test_tournament_on_workers(self) -> None:
+        names = list(registry.getPlayers())
+        with start_worker(
+                celeryApp,
+                pool='threads',
+                concurrency=2,
+                perform_ping_check=False):
+            result = startRpsTournament(names, n_rounds=500, chunk_size=1)
+            ranking = result.get(timeout=30)
+            progress = getRpsTournamentProgress(result)
+        nPairs = len(makeRpsPairs(names))
+        self.assertEqual(progress['done'], nPairs)
+        self.assertEqual(progress['finished_chunks'], nPairs)
+        self.assertTrue(progress['ready'])
+        self.assertEqual({row['player'] for row in ranking}, set(names))
+        self.assertEqual(
+            sum(row['matches'] for row in ranking),
+            2 * nPairs)
+
+
+class RpsBenchmarkTests(TestCase):
+    def test_results_cover_players_and_lengths(self) -> None:
+        results = benchmarkPlayers(lengths=[10, 1_000], n_moves=20)
+        self.assertEqual(
+            results['players'].keys(),
+            registry.getPlayers().keys())
+        for kinds in results['players'].values():
+            for kind in ('move', 'view',):
+                self.assertEqual(list(kinds[kind]), ['10', '1000'])
+                for stats in kinds[kind].values():
+                    self.assertLessEqual(stats['p50_us'], stats['p99_us'])
+        json.dumps(results)
+
+    def test_regressions_are_found(self) -> None:
+        baseline = {'players': {'A': {
+            'move': {'10': {'p50_us': 10.0, 'p99_us': 20.0}},
+            'view': {'10': {'p50_us': 100.0, 'p99_us': 200.0}},}}}
+        results = {'players': {
+            'A': {
+                'move': {'10': {'p50_us': 12.0, 'p99_us': 45.0}},
+                'view': {'10': {'p50_us': 160.0, 'p99_us': 200.0}},},
+            'B': {
+                'move': {'10': {'p50_us': 900.0, 'p99_us': 1500.0}},
+                'view': {},},}}
+        regressions = compareResults(results, baseline, 1.5, 1_000)
+        self.assertEqual(len(regressions), 3)
+        self.assertTrue(regressions[0].startswith('A: move p99_us'))
+        self.assertTrue(regressions[1].startswith('A: view p50_us'))
+        self.assertTrue(regressions[2].startswith('B: move() p99'))
+        self.assertEqual(compareResults(baseline, baseline), [])
+
+    def test_too_few_moves_are_rejected(self) -> None:
+        with self.assertRaises(CommandError):
+            call_command('benchmark_rps_players', '--moves', '1')
+
+
+class RandomIntsStreamTests(TestCase):
+    async def _open(
+            self,
+            wait: float = 30,
+            broadcast: bool = False,
+            batch: int = 1,
+            binary: bool = False,
+            last_event_id: str | None = None,
+            client: str = '127.0.0.1',
+            stats_interval: float | None = None,
+            ) -> tuple[str, Any]:
+        """Opens a stream and returns its ID and its iterator."""
+        headers = {'Last-Event-ID': last_event_id} if last_event_id else {}
+        request = RequestFactory().get(
+            '/challenges/random-ints',
+            headers=headers,
+            REMOTE_ADDR=client)
+        resp = await _startStreamingRandInts(
+            request,
+            0,
+            1_000_000,
+            wait,
+            broadcast,
+            batch,
+            binary,
+            stats_interval)
+        chunks = aiter(resp.streaming_content) # type: ignore
+        first = (await anext(chunks)).decode()
+        self.assertTrue(first.startswith('event: stream\ndata: '))
+        return first.split('data: ')[1].strip(), chunks
+
+    async def test_stop_ends_only_its_stream(self) -> None:
+        streamA, chunksA = await self._open()
+        streamB, chunksB = await self._open()
+        self.assertNotEqual(streamA, streamB)
+        await anext(chunksA)
+        await anext(chunksB)
+        self.assertTrue(await stopStream(streamA))
+        # Stopping does not wait for the next tick...
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(chunksA), 1)
+        self.assertFalse(await stopStream(streamA))
+        self.assertTrue(await stopStream(streamB))
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(chunksB), 1)
+
+    async def test_ticks_continue_until_stopped(self) -> None:
+        streamId, chunks = await self._open(wait=0.01)
+        for _ in range(3):
+            chunk = (await anext(chunks)).decode()
+            self.assertRegex(chunk, r'^id: \d+:\d+\ndata: \d+\n\n$')
+        await stopStream(streamId)
+        with self.assertRaises(StopAsyncIteration):
+            while True:
+                await asyncio.wait_for(anext(chunks), 1)
+
+    async def test_stop_action(self) -> None:
+        streamId, chunks = await self._open()
+        await anext(chunks)
+        for data, status in (
+                ({'action': 'stop'}, 400),
+                ({'action': 'stop', 'stream': 'unknown'}, 404),
+                ({'action': 'stop', 'stream': streamId}, 200),):
+            with self.subTest(data=data):
+                resp = await self.async_client.post(
+                    '/challenges/random-ints',
+                    json.dumps(data),
+                    content_type='application/json',
+                    secure=True)
+                self.assertEqual(resp.status_code, status)
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(chunks), 1)
+
+    async def test_batches(self) -> None:
+        for broadcast in (False, True,):
+            with self.subTest(broadcast=broadcast):
+                streamId, chunks = await self._open(
+                    wait=0.01,
+                    broadcast=broadcast,
+                    batch=500)
+                chunk = (await anext(chunks)).decode()
+                self.assertRegex(
+                    chunk,
+                    r'^(id: \d+:\d+\n)?data: \d+(,\d+){499}\n\n$')
+                data = chunk.split('data: ')[1]
+                ints = [int(num) for num in data.split(',')]
+                self.assertTrue(all(0 <= num < 1_000_000 for num in ints))
+                self.assertGreater(len(set(ints)), 1)
+                await stopStream(streamId)
+                with self.assertRaises(StopAsyncIteration):
+                    await asyncio.wait_for(anext(chunks), 1)
+
+    async def test_binary_batches(self) -> None:
+        streamId, chunks = await self._open(batch=1000, binary=True)
+        _, event, data = (await anext(chunks)).decode().split('\n')[:3]
+        self.assertEqual(event, 'event: int32')
+        self.assertTrue(data.startswith('data: '))
+        ints = np.frombuffer(base64.b64decode(data[6:]), '<i4')
+        self.assertEqual(len(ints), 1000)
+        self.assertTrue(((0 <= ints) & (ints < 1_000_000)).all())
+        self.assertEqual(
+            getFrameMaker(0, 1 << 40, 10, True)()[:13],
+            b'event: int64\n')
+        await stopStream(streamId)
+
+    async def test_resume_from_last_event_id(self) -> None:
+        streamId, chunks = await self._open(wait=0.001, batch=100)
+        frames = [(await anext(chunks)).decode() for _ in range(5)]
+        await stopStream(streamId)
+        ids = [frame.split('\n')[0][4:] for frame in frames]
+        seed = ids[0].split(':')[0]
+        self.assertEqual(ids, [f'{seed}:{seq}' for seq in range(5)])
+        # Reconnecting after the second frame...
+        streamId, chunks = await self._open(
+            wait=0.001,
+            batch=100,
+            last_event_id=ids[1])
+        resumed = [(await anext(chunks)).decode() for _ in range(3)]
+        await stopStream(streamId)
+        self.assertEqual(resumed, frames[2:])
+        # ...or far ahead, without replaying...
+        maker = getSeededFrameMaker(0, 1_000_000, int(seed), 100)
+        streamId, chunks = await self._open(
+            batch=100,
+            last_event_id=f'{seed}:{10**15}')
+        self.assertEqual(await anext(chunks), maker(10**15 + 1))
+        await stopStream(streamId)
+        # An invalid ID starts a new stream...
+        streamId, chunks = await self._open(last_event_id='x:1')
+        self.assertRegex((await anext(chunks)).decode(), r'^id: \d+:0\n')
+        await stopStream(streamId)
+
+    async def test_pooled_frames(self) -> None:
+        maker = getSeededFrameMaker(0, 1_000_000, 7, 100)
+        run = pool.loadRun(
+            pool.makeRun(0, 1_000_000, 100, 42),
+            0,
+            1_000_000,
+            100)
+        pooledMaker = getSeededFrameMaker(0, 1_000_000, 42, 100)
+        with mock.patch.object(
+                pool,
+                'takeRun',
+                mock.AsyncMock(side_effect=[run, None])):
+            frames = pool.iterPooledFrames(
+                0,
+                1_000_000,
+                100,
+                False,
+                (7, pool.RUN_FRAMES - 3,))
+            # Finishing the run of the resumed stream...
+            self.assertEqual(
+                [await anext(frames) for _ in range(2)],
+                [maker(pool.RUN_FRAMES - 2), maker(pool.RUN_FRAMES - 1)])
+            # ...then the run of the pool...
+            self.assertEqual(
+                [await anext(frames) for _ in range(pool.RUN_FRAMES)],
+                [pooledMaker(seq) for seq in range(pool.RUN_FRAMES)])
+            # ...then a run of its own if the pool is empty...
+            frame = (await anext(frames)).decode()
+            self.assertRegex(frame, r'^id: \d+:0\n')
+            await frames.aclose()
+
+    def test_pools_of_configured_ranges(self) -> None:
+        with override_settings(
+                RAND_INTS_REDIS_URL='redis://localhost',
+                RAND_INTS_POOL_SIZE=4,
+                RAND_INTS_POOL_RANGES=[(0, 1_000, 10,),],):
+            self.assertTrue(pool.isPoolEnabled(0, 1_000, 10))
+            self.assertFalse(pool.isPoolEnabled(0, 1_000, 11))
+            self.assertFalse(pool.isPoolEnabled(0, 1_001, 10))
+            # Clients cannot make pools of other ranges...
+            with mock.patch('redis.Redis.from_url') as fromUrl:
+                self.assertEqual(pool.fillPool(0, 1_001, 10), 0)
+            fromUrl.assert_not_called()
+
+    async def test_streams_resumed_past_runs_are_not_pooled(self) -> None:
+        maker = getSeededFrameMaker(0, 1_000_000, 7, 100)
+        with mock.patch.object(backend, 'isPoolEnabled', return_value=True), \
+                mock.patch.object(backend, 'iterPooledFrames') as iterPooled:
+            streamId, chunks = await self._open(
+                batch=100,
+                last_event_id=f'7:{pool.RUN_FRAMES}')
+            self.assertEqual(
+                await anext(chunks),
+                maker(pool.RUN_FRAMES + 1))
+            await stopStream(streamId)
+        iterPooled.assert_not_called()
+
+    def test_running_stats(self) -> None:
+        rand = np.random.default_rng(1)
+        stats = RunningStats(-50, 1_000, 7)
+        blocks = [
+            rand.integers(-50, 1_000, size=size)
+            for size in (1, 2, 1_000, 0, 77,)]
+        for block in blocks:
+            stats.update(block)
+        values = np.concatenate(blocks)
+        self.assertEqual(stats.count, len(values))
+        self.assertAlmostEqual(stats.mean, values.mean())
+        self.assertAlmostEqual(stats.variance, values.var(ddof=1))
+        self.assertEqual(stats.min, values.min())
+        self.assertEqual(stats.max, values.max())
+        self.assertEqual(
+            stats.histogram.tolist(),
+            np.bincount((values + 50) * 7 // 1_050, minlength=7).tolist())
+
+    async def test_stats_events(self) -> None:
+        streamId, chunks = await self._open(
+            wait=0.002,
+            batch=10,
+            stats_interval=0.01)
+        ints = list[int]()
+        nStats = 0
+        while nStats < 3:
+            chunk = (await anext(chunks)).decode()
+            if chunk.startswith('event: stats\n'):
+                nStats += 1
+                stats = json.loads(chunk.split('data: ')[1])
+                self.assertEqual(stats['count'], len(ints))
+                self.assertEqual(stats['max'], max(ints))
+                self.assertEqual(sum(stats['histogram']), len(ints))
+                self.assertAlmostEqual(stats['mean'], sum(ints) / len(ints))
+            else:
+                data = chunk.split('data: ')[1]
+                ints.extend(int(num) for num in data.split(','))
+        await stopStream(streamId)
+
+    async def test_rate_paces_frames(self) -> None:
+        # 40 frames of 10 integers at 2,000 integers per second...
+        streamId, chunks = await self._open(wait=10 / 2_000, batch=10)
+        start = time.perf_counter()
+        for _ in range(40):
+            await anext(chunks)
+        self.assertGreater(time.perf_counter() - start, 0.18)
+        await stopStream(streamId)
+
+    async def test_invalid_stream_options(self) -> None:
+        for query in (
+                'lower-int=a&upper-int=10',
+                'lower-int=10&upper-int=10',
+                'lower-int=0&upper-int=10&batch=0',
+                'lower-int=0&upper-int=10&batch=100000000',
+                'lower-int=0&upper-int=10&rate=-1',
+                'lower-int=0&upper-int=10&rate=1000000',
+                'lower-int=0&upper-int=10&format=xml',
+                'lower-int=0&upper-int=10&broadcast=maybe',
+                'lower-int=0&upper-int=10&stats=true&broadcast=true',
+                'lower-int=0&upper-int=10&stats=true&stats-bins=0',
+                'lower-int=0&upper-int=10&stats=true&stats-interval=0',):
+            with self.subTest(query=query):
+                resp = await self.async_client.get(
+                    f'/challenges/random-ints?{query}',
+                    secure=True)
+                self.assertEqual(resp.status_code, 400)
+
+    async def test_admission(self) -> None:
+        request = RequestFactory().get(
+            '/challenges/random-ints',
+            REMOTE_ADDR='10.0.0.1')
+        with override_settings(RAND_INTS_MAX_CLIENT_STREAMS=2):
+            streams = [
+                await self._open(client='10.0.0.1') for _ in range(2)]
+            resp = await _startStreamingRandInts(request, 0, 10)
+            self.assertEqual(resp.status_code, 503)
+            self.assertEqual(resp['Retry-After'], '5')
+            # Other clients are admitted...
+            other = await self._open(client='10.0.0.2')
+            # ...and so is the client when one of its streams ends...
+            streamId, chunks = streams.pop()
+            await stopStream(streamId)
+            with self.assertRaises(StopAsyncIteration):
+                await asyncio.wait_for(anext(chunks), 1)
+            streams.append(await self._open(client='10.0.0.1'))
+        nActive = getStreamStats()['active_streams']
+        with override_settings(RAND_INTS_MAX_STREAMS=nActive):
+            resp = await _startStreamingRandInts(request, 0, 10)
+            self.assertEqual(resp.status_code, 503)
+        for streamId, _ in [*streams, other]:
+            await stopStream(streamId)
+
+    async def test_made_up_sessions_share_the_address(self) -> None:
+        sessionStore = importlib.import_module(
+            settings.SESSION_ENGINE).SessionStore
+        with override_settings(RAND_INTS_MAX_CLIENT_STREAMS=1):
+            streamId, chunks = await self._open(client='10.0.0.3')
+            for _ in range(2):
+                request = RequestFactory().get(
+                    '/challenges/random-ints',
+                    REMOTE_ADDR='10.0.0.3')
+                request.session = sessionStore(os.urandom(16).hex())
+                resp = await _startStreamingRandInts(request, 0, 10)
+                self.assertEqual(resp.status_code, 503)
+        await stopStream(streamId)
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(chunks), 1)
+
+    async def test_never_started_streams_are_released(self) -> None:
+        nActive = getStreamStats()['active_streams']
+        request = RequestFactory().get('/challenges/random-ints')
+        resp = await _startStreamingRandInts(request, 0, 10)
+        self.assertEqual(getStreamStats()['active_streams'], nActive + 1)
+        del resp
+        gc.collect()
+        self.assertEqual(getStreamStats()['active_streams'], nActive)
+
+    async def test_disconnect_ends_stream(self) -> None:
+        nActive = getStreamStats()['active_streams']
+        streamId, chunks = await self._open()
+        await anext(chunks)
+        # The ASGI handler cancels the view once the client disconnects...
+        waiter = asyncio.create_task(anext(chunks))
+        await asyncio.sleep(0.01)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+        self.assertEqual(getStreamStats()['active_streams'], nActive)
+        self.assertFalse(await stopStream(streamId))
+
+    @override_settings(RAND_INTS_HEARTBEAT=0.01)
+    async def test_heartbeats(self) -> None:
+        for broadcast in (False, True,):
+            with self.subTest(broadcast=broadcast):
+                streamId, chunks = await self._open(
+                    wait=0.1,
+                    broadcast=broadcast)
+                frames = [await anext(chunks) for _ in range(8)]
+                self.assertIn(b': heartbeat\n\n', frames)
+                self.assertTrue(any(b'data: ' in frame for frame in frames))
+                await stopStream(streamId)
+
+    async def test_stats(self) -> None:
+        before = getStreamStats()
+        streamId, chunks = await self._open()
+        frame = await anext(chunks)
+        await stopStream(streamId)
+        stats = (await self.async_client.get(
+            '/challenges/random-ints/stats',
+            secure=True)).json()
+        self.assertEqual(
+            stats['admitted_streams'],
+            before['admitted_streams'] + 1)
+        self.assertGreaterEqual(
+            stats['bytes_sent'],
+            before['bytes_sent'] + len(frame))
+
+    async def test_broadcast_streams_share_integers(self) -> None:
+        streamA, chunksA = await self._open(wait=0.01, broadcast=True)
+        streamB, chunksB = await self._open(wait=0.01, broadcast=True)
+        self.assertEqual(len(hub._channels), 1)
+        framesA = [await anext(chunksA) for _ in range(5)]
+        framesB = [await anext(chunksB) for _ in range(5)]
+        self.assertEqual(framesA, framesB)
+        await stopStream(streamA)
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(chunksA), 1)
+        await anext(chunksB)
+        await stopStream(streamB)
+        with self.assertRaises(StopAsyncIteration):
+            await asyncio.wait_for(anext(chunksB), 1)
+        self.assertEqual(hub._channels, {})
+
+    async def test_slow_subscribers_skip_frames_then_drop(self) -> None:
+        fast = hub.subscribe(0, 10, 0.001)
+        slow = hub.subscribe(0, 10, 0.001)
+        # The slow subscriber is behind by fewer frames than the limit...
+        for _ in range(hub._BACKLOG + 2):
+            await anext(fast)
+        await anext(slow)
+        self.assertGreater(slow._nSkipped, 0)
+        self.assertLess(slow._nSkipped, hub._MAX_SKIPPED)
+        # ...then by more frames than the limit...
+        for _ in range(hub._MAX_SKIPPED + hub._BACKLOG):
+            await anext(fast)
+        with self.assertRaises(StopAsyncIteration):
+            await anext(slow)
+        self.assertFalse(fast.closed)
+        hub.unsubscribe(slow)
+        hub.unsubscribe(fast)
+
+    async def test_cancelled_subscriber_does_not_end_others(self) -> None:
+        subscriptions = [hub.subscribe(0, 10, 0.05) for _ in range(3)]
+        for subscription in subscriptions:
+            await anext(subscription)
+        # Waiting on the next tick...
+        waiters = [
+            asyncio.create_task(anext(subscription))
+            for subscription in subscriptions]
+        await asyncio.sleep(0)
+        waiters[0].cancel()
+        frames = await asyncio.gather(*waiters[1:])
+        self.assertEqual(frames[0], frames[1])
+        self.assertTrue(waiters[0].cancelled())
+        for subscription in subscriptions:
+            hub.unsubscribe(subscription)
+
+
+@skipUnless(_TEST_REDIS_URL, 'TEST_REDIS_URL is not set')
+@override_settings(
+    RAND_INTS_REDIS_URL=_TEST_REDIS_URL,
+    RAND_INTS_POOL_SIZE=4,
+    RAND_INTS_POOL_RANGES=[(0, 1_000, 10,),],
+    CELERY_BROKER_URL='memory://',
+    CELERY_RESULT_BACKEND='cache+memory://')
+class RandomIntsPoolTests(TestCase):
+    def setUp(self) -> None:
+        self.key = pool.getPoolKey(0, 1_000, 10)
+        client = redis.Redis.from_url(_TEST_REDIS_URL)
+        self.addCleanup(client.close)
+        self.addCleanup(client.delete, self.key, f'{self.key}:refilling')
+        client.delete(self.key)
+        self.client = client
+
+    def test_workers_fill_pools(self) -> None:
+        with start_worker(
+                celeryApp,
+                pool='threads',
+                concurrency=1,
+                perform_ping_check=False):
+            nAdded = generateRandomData.delay(0, 1_000, 10).get(timeout=30)
+        self.assertEqual(nAdded, 4)
+        self.assertEqual(self.client.llen(self.key), 4)
+        self.assertEqual(generateRandomData(0, 1_000, 10), 0)
+
+    def test_streams_drain_pools(self) -> None:
+        generateRandomData(0, 1_000, 10)
+        data = self.client.lindex(self.key, 0)
+        seed, blocks = pool.loadRun(data, 0, 1_000, 10) # type: ignore
+        async def takeFrames() -> list[bytes]:
+            frames = pool.iterPooledFrames(0, 1_000, 10, False)
+            try:
+                return [await anext(frames) for _ in range(pool.RUN_FRAMES)]
+            finally:
+                await frames.aclose()
+        with mock.patch.object(pool, '_scheduleRefill') as scheduleRefill:
+            frames = asyncio.run(takeFrames())
+        maker = getSeededFrameMaker(0, 1_000, seed, 10)
+        self.assertEqual(frames, [maker(seq) for seq in range(len(blocks))])
+        self.assertEqual(self.client.llen(self.key), 3)
+        scheduleRefill.assert_not_called()
@@ -9,7 +9,8 @@ from django.urls import path
 
 from .views import getChallengesIndexPage
 from assets.challenges.rps.backend import play as playRps
-from assets.challenges.random_ints.backend import play as playRandom
+from assets.challenges.random_ints.backend import (
+    getStats as getRandomStats, play as playRandom,)
 
 
 app_name = 'challenges'
@@ -18,4 +19,8 @@ urlpatterns = [
     path('', getChallengesIndexPage, name='index-page'),
     path('rps', playRps, name='rps'),
     path('random-ints', playRandom, name='random-ints'),
+    path(
+        'random-ints/stats',
+        getRandomStats,
+        name='random-ints-stats'),
 ]
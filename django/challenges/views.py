@@ -2,16 +2,11 @@
 # 
 #
 
-from typing import Any
-
 from django.http import HttpRequest
 from django.http.response import HttpResponse
-from django.shortcuts import render
+
+from core.pages import renderStaticPage
 
 
 def getChallengesIndexPage(request: HttpRequest) -> HttpResponse:
-    context = dict[str, Any]()
-    return render(
-        request,
-        template_name='challenges-index.j2',
-        context=context)
+    return renderStaticPage(request, 'challenges/challenges-index.j2')
@@ -2,6 +2,8 @@
 ASGI config for core project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
+WebSocket connections are dispatched to the channels of the challenges and
+everything else is served by Django.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.1/howto/deployment/asgi/
@@ -14,4 +16,33 @@ from django.core.asgi import get_asgi_application
 # We do not use the following because we added it to `.env`
 # os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
-application = get_asgi_application()
+djangoApplication = get_asgi_application()
+
+# Loading URLs and templates before the first request...
+from django.urls import get_resolver
+from core.jinja2 import warmTemplates
+get_resolver().url_patterns
+warmTemplates()
+
+# Importing channels after Django has been set up...
+from assets.challenges.rps.channel import RPS_CHANNEL_PATH, serveRpsChannel
+
+
+_WEBSOCKET_APPS = {
+    RPS_CHANNEL_PATH: serveRpsChannel,
+}
+"""The mapping of paths to ASGI applications of WebSocket channels."""
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'websocket':
+        try:
+            app = _WEBSOCKET_APPS[scope['path']]
+        except KeyError:
+            # Rejecting the handshake with HTTP 403 Forbidden...
+            await receive()
+            await send({'type': 'websocket.close',})
+            return
+        await app(scope, receive, send)
+    else:
+        await djangoApplication(scope, receive, send)
@@ -0,0 +1,475 @@
+#
+# 
+#
+"""This module offers bundles of the JavaScript modules of pages, so a
+page loads its scripts by one request, without a Node toolchain.
+
+A bundle is named in the `JS_BUNDLES` setting by the static names of the
+entry modules of a page. The `bundle_scripts` command writes it into the
+static file `bundles/<name>.js` with its source map, and the `bundle`
+global of templates loads it. `collectstatic` names bundles by hashes of
+their content like any other asset.
+
+Modules of a bundle come in the order of their dependencies, each one
+once. A module is wrapped in a function which returns its exports, and
+its imports become constants bound to the exports of the modules they
+import. JSON modules are inlined as constants. Only the forms of modules
+the TypeScript compiler emits here are supported: single-line `import`
+statements of named bindings, namespaces or defaults of JSON, and
+`export` declarations.
+
+Minifying drops comments, indentation and blank lines, but keeps line
+breaks, so automatic semicolon insertion reads the bundle the same as
+the modules, and every line of a bundle maps to one line of a module.
+"""
+
+from __future__ import annotations
+import json
+from pathlib import Path
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+
+BUNDLES_DIR = 'bundles'
+"""The directory of bundles among static files."""
+
+_IMPORT = re.compile(
+    r'''^import\s+(?P<bindings>[^'"]+?)\s+from\s+['"](?P<target>[^'"]+)['"]'''
+    r'''\s*;?\s*$''')
+
+_SIDE_EFFECT_IMPORT = re.compile(
+    r'''^import\s+['"](?P<target>[^'"]+)['"]\s*;?\s*$''')
+
+_EXPORT = re.compile(
+    r'^export\s+(?P<kind>(?:async\s+)?function\s*\*?|class|const|let|var)'
+    r'\s*(?P<name>[A-Za-z_$][\w$]*)')
+
+_REGEX_KEYWORDS = {
+    'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete',
+    'void', 'throw', 'case', 'do', 'else', 'yield', 'await',}
+"""The keywords after which a slash starts a regular expression."""
+
+_BASE64 = (
+    'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/')
+
+
+def getBundleName(name: str) -> str:
+    """Gets the static name of the bundle `name`."""
+    return f'{BUNDLES_DIR}/{name}.js'
+
+
+def getBundlesDir() -> Path:
+    """Gets the directory of bundles in the source tree."""
+    return Path(settings.DJANGO_DIR) / 'assets' / BUNDLES_DIR
+
+
+def makeBundle(name: str, entries: list[str]) -> tuple[str, str]:
+    """Makes the bundle `name` of the modules of the static names
+    `entries` and their dependencies. It returns the code and the source
+    map of the bundle. Raises `ValueError` if a module cannot be bundled.
+    """
+    order = list[str]()
+    _visit(entries, order, set[str](), [])
+    varNames = {
+        module: f'__m{index}'
+        for index, module in enumerate(order)}
+    lines = list[str]()
+    mappings = list[tuple[int, int, int] | None]()
+    """The source index, line and column of every line of the bundle."""
+    for index, module in enumerate(order):
+        source = _readModule(module)
+        if module.endswith('.json'):
+            lines.append(
+                f'const {varNames[module]}=' +
+                json.dumps(json.loads(source), separators=(',', ':',)) +
+                ';')
+            mappings.append((index, 0, 0,))
+            continue
+        body, exports = _linkModule(module, source, varNames)
+        lines.append(f'const {varNames[module]}=(()=>{{')
+        mappings.append(None)
+        for srcLine, srcCol, text in minifyScript(body):
+            lines.append(text)
+            mappings.append((index, srcLine, srcCol,))
+        lines.append(f'return{{{",".join(exports)}}}}})();')
+        mappings.append(None)
+    lines.append(f'//# sourceMappingURL={posixpath.basename(name)}.js.map')
+    mappings.append(None)
+    sourceMap = {
+        'version': 3,
+        'file': f'{posixpath.basename(name)}.js',
+        'sources': [f'{settings.STATIC_URL}{module}' for module in order],
+        'sourcesContent': [_readModule(module) for module in order],
+        'names': [],
+        'mappings': _encodeMappings(mappings),}
+    return (
+        '\n'.join(lines) + '\n',
+        json.dumps(sourceMap, separators=(',', ':',)),)
+
+
+def minifyScript(source: str) -> list[tuple[int, int, str]]:
+    """Minifies the JavaScript `source` by dropping comments, indentation,
+    blank lines and runs of spaces. It returns the lines of the minified
+    code with the line and the column they start at in `source`, both
+    zero-based.
+    """
+    return _Minifier(source).run()
+
+
+class _Minifier:
+    def __init__(self, source: str) -> None:
+        self._src = source
+        self._pos = 0
+        self._line = 0
+        self._lineStart = 0
+        """The position of the start of the current line of the source."""
+        self._lines = list[tuple[int, int, str]]()
+        self._buf = list[str]()
+        self._bufStart: tuple[int, int] | None = None
+        """The line and column of the source the buffer starts at."""
+        self._space = False
+        """Whether a space is pending before the next token."""
+        self._prevChar = ''
+        """The last significant character of the code."""
+        self._prevWord = ''
+        """The last word of the code, if it is the last token."""
+        self._templates = list[int]()
+        """The depths of braces of substitutions of template literals."""
+
+    def run(self) -> list[tuple[int, int, str]]:
+        src = self._src
+        while self._pos < len(src):
+            char = src[self._pos]
+            next_ = src[self._pos + 1:self._pos + 2]
+            if char == '\n':
+                self._pos += 1
+                self._newLine()
+                self._flush()
+            elif char in ' \t\r\f\v\ufeff':
+                self._pos += 1
+                self._space = bool(self._buf)
+            elif char == '/' and next_ == '/':
+                end = src.find('\n', self._pos)
+                self._pos = len(src) if end == -1 else end
+            elif char == '/' and next_ == '*':
+                end = src.find('*/', self._pos + 2)
+                if end == -1:
+                    raise ValueError('unterminated comment')
+                comment = src[self._pos:end + 2]
+                self._pos = end + 2
+                if '\n' in comment:
+                    # A comment with a line break is a line terminator...
+                    for _ in range(comment.count('\n')):
+                        self._newLine(src.rfind('\n', 0, self._pos) + 1)
+                    self._flush()
+                else:
+                    self._space = bool(self._buf)
+            elif char in '\'"':
+                self._copyString(char)
+            elif char == '`':
+                self._copyTemplate()
+            elif char == '/' and self._isRegexAllowed():
+                self._copyRegex()
+            elif char == '}' and self._templates and self._templates[-1] == 0:
+                self._templates.pop()
+                self._emit('}', '}')
+                self._pos += 1
+                self._copyTemplate(resumed=True)
+            elif src.startswith(('++', '--',), self._pos):
+                # An increment or decrement after an operand on the same
+                # line is postfix and ends the operand, so a slash after
+                # it is a division...
+                isPostfix = bool(self._buf) and not self._isRegexAllowed()
+                self._emit(src[self._pos:self._pos + 2], ')' if isPostfix
+                    else char)
+                self._pos += 2
+            elif char.isalnum() or char in '_$' or ord(char) > 127:
+                end = self._pos
+                while end < len(src) and (
+                        src[end].isalnum() or src[end] in '_$' or
+                        ord(src[end]) > 127):
+                    end += 1
+                word = src[self._pos:end]
+                self._emit(word, word[-1])
+                self._prevWord = word
+                self._pos = end
+            else:
+                if self._templates:
+                    if char == '{':
+                        self._templates[-1] += 1
+                    elif char == '}':
+                        self._templates[-1] -= 1
+                self._emit(char, char)
+                self._pos += 1
+        self._flush()
+        return self._lines
+
+    def _emit(self, text: str, last: str) -> None:
+        self._startToken(text[0])
+        self._buf.append(text)
+        self._prevChar = last
+        self._prevWord = ''
+
+    def _startToken(self, first: str) -> None:
+        """Starts a token whose first character is `first`."""
+        if self._bufStart is None:
+            self._bufStart = (self._line, self._pos - self._lineStart,)
+        if self._space:
+            # Keeping spaces only where tokens would join without them,
+            # like `a - -b` into `a --b` or `1 .x` into `1.x`...
+            prev = self._buf[-1][-1]
+            if _isWordChar(prev) and (_isWordChar(first) or first == '.') or \
+                    prev in ('+', '-',) and first in ('+', '-',) or \
+                    '/' in (prev, first,):
+                self._buf.append(' ')
+            self._space = False
+
+    def _newLine(self, line_start: int | None = None) -> None:
+        self._line += 1
+        self._lineStart = self._pos if line_start is None else line_start
+
+    def _flush(self) -> None:
+        if self._buf:
+            self._lines.append((*self._bufStart, ''.join(self._buf),))
+        self._buf = []
+        self._bufStart = None
+        self._space = False
+
+    def _copyVerbatim(self, end: int) -> None:
+        """Copies the source up to `end`, splitting lines of the minified
+        code where it breaks lines.
+        """
+        text = self._src[self._pos:end]
+        parts = text.split('\n')
+        for index, part in enumerate(parts):
+            if index:
+                self._flush()
+                self._newLine(self._pos)
+                # A continued line starts at its first column...
+                self._bufStart = (self._line, 0,)
+            # Keeping empty lines of tokens, which are part of their
+            # values...
+            if part or index:
+                if self._bufStart is None:
+                    self._bufStart = (self._line, self._pos - self._lineStart,)
+                self._buf.append(part)
+            self._pos += len(part) + (index < len(parts) - 1)
+        self._pos = end
+
+    def _copyString(self, quote: str) -> None:
+        src = self._src
+        end = self._pos + 1
+        while end < len(src) and src[end] != quote:
+            if src[end] == '\\':
+                end += 1
+            elif src[end] == '\n':
+                raise ValueError('unterminated string')
+            end += 1
+        if end >= len(src):
+            raise ValueError('unterminated string')
+        self._startToken(quote)
+        self._copyVerbatim(end + 1)
+        self._prevChar = quote
+        self._prevWord = ''
+
+    def _copyTemplate(self, resumed: bool = False) -> None:
+        """Copies a template literal up to its end or to a substitution."""
+        src = self._src
+        end = self._pos if resumed else self._pos + 1
+        while end < len(src):
+            if src[end] == '\\':
+                end += 2
+            elif src[end] == '`':
+                end += 1
+                break
+            elif src.startswith('${', end):
+                end += 2
+                self._templates.append(0)
+                break
+            else:
+                end += 1
+        else:
+            raise ValueError('unterminated template literal')
+        if not resumed:
+            self._startToken('`')
+        self._copyVerbatim(end)
+        self._prevChar = '`' if src[end - 1] == '`' else '{'
+        self._prevWord = ''
+
+    def _copyRegex(self) -> None:
+        src = self._src
+        end = self._pos + 1
+        inClass = False
+        while end < len(src) and (src[end] != '/' or inClass):
+            if src[end] == '\\':
+                end += 1
+            elif src[end] == '[':
+                inClass = True
+            elif src[end] == ']':
+                inClass = False
+            elif src[end] == '\n':
+                raise ValueError('unterminated regular expression')
+            end += 1
+        end += 1
+        while end < len(src) and src[end].isalpha():
+            end += 1
+        self._startToken('/')
+        self._copyVerbatim(end)
+        # A slash after a regular expression is a division...
+        self._prevChar = ')'
+        self._prevWord = ''
+
+    def _isRegexAllowed(self) -> bool:
+        if self._prevWord:
+            return self._prevWord in _REGEX_KEYWORDS
+        return not (
+            _isWordChar(self._prevChar) or
+            self._prevChar in (')', ']', '}', "'", '"', '`',))
+
+
+def _isWordChar(char: str) -> bool:
+    return bool(char) and (char.isalnum() or char in '_$' or ord(char) > 127)
+
+
+def _visit(
+        modules: list[str],
+        order: list[str],
+        seen: set[str],
+        path: list[str],
+        ) -> None:
+    """Appends `modules` and their dependencies to `order` so every module
+    comes after the modules it imports.
+    """
+    for module in modules:
+        if module in path:
+            raise ValueError(
+                f'circular imports: {" -> ".join([*path, module])}')
+        if module in seen:
+            continue
+        if not module.endswith('.json'):
+            _visit(
+                [target for _, target in _findImports(module)],
+                order,
+                seen,
+                [*path, module])
+        seen.add(module)
+        order.append(module)
+
+
+def _findImports(module: str) -> list[tuple[str, str]]:
+    """Finds the bindings and the static names of imports of `module`."""
+    imports = list[tuple[str, str]]()
+    for line in _readModule(module).splitlines():
+        if not re.match(r'import\b\s*[^(.\s]', line):
+            continue
+        match = _IMPORT.match(line) or _SIDE_EFFECT_IMPORT.match(line)
+        if not match:
+            raise ValueError(f'unsupported import in {module}: {line}')
+        imports.append((
+            match.groupdict().get('bindings') or '',
+            _resolve(module, match['target']),))
+    return imports
+
+
+def _linkModule(
+        module: str,
+        source: str,
+        var_names: dict[str, str],
+        ) -> tuple[str, list[str]]:
+    """Replaces imports and exports of the source of `module`. It returns
+    the body of the module and the names of its exports.
+    """
+    imports = iter(_findImports(module))
+    exports = list[str]()
+    lines = list[str]()
+    for line in source.splitlines():
+        if re.match(r'import\b\s*[^(.\s]', line):
+            bindings, target = next(imports)
+            lines.append(_bindImport(module, bindings, var_names[target],
+                target.endswith('.json')))
+        elif re.match(r'export\b', line):
+            match = _EXPORT.match(line)
+            if not match:
+                raise ValueError(f'unsupported export in {module}: {line}')
+            exports.append(match['name'])
+            lines.append(line[len('export'):].lstrip())
+        else:
+            lines.append(line)
+    return '\n'.join(lines), exports
+
+
+def _bindImport(
+        module: str,
+        bindings: str,
+        var_name: str,
+        is_json: bool,
+        ) -> str:
+    bindings = bindings.strip()
+    if not bindings:
+        return ''
+    if bindings.startswith('{') and bindings.endswith('}'):
+        names = list[str]()
+        for binding in bindings[1:-1].split(','):
+            parts = binding.split()
+            if len(parts) == 3 and parts[1] == 'as':
+                names.append(f'{parts[0]}:{parts[2]}')
+            elif len(parts) == 1:
+                names.append(parts[0])
+            elif parts:
+                raise ValueError(f'unsupported import in {module}: {binding}')
+        return f'const {{{",".join(names)}}}={var_name};'
+    match = re.fullmatch(r'\*\s+as\s+([A-Za-z_$][\w$]*)', bindings)
+    if match:
+        return f'const {match[1]}={var_name};'
+    if is_json and re.fullmatch(r'[A-Za-z_$][\w$]*', bindings):
+        return f'const {bindings}={var_name};'
+    raise ValueError(f'unsupported import in {module}: {bindings}')
+
+
+def _resolve(module: str, target: str) -> str:
+    """Gets the static name of the module `target` imports from `module`."""
+    staticUrl = settings.STATIC_URL
+    if target.startswith(staticUrl):
+        return target[len(staticUrl):]
+    if target.startswith(('./', '../',)):
+        return posixpath.normpath(
+            posixpath.join(posixpath.dirname(module), target))
+    raise ValueError(f'unsupported module in {module}: {target}')
+
+
+def _readModule(module: str) -> str:
+    path = finders.find(module)
+    if not path:
+        raise ValueError(f'module not found: {module}')
+    return Path(path).read_text(encoding='utf-8')
+
+
+def _encodeMappings(mappings: list[tuple[int, int, int] | None]) -> str:
+    """Encodes the mappings of lines of a bundle, one segment at the
+    start of every line, in Base64 VLQs of source maps.
+    """
+    lines = list[str]()
+    prev = (0, 0, 0,)
+    for mapping in mappings:
+        if mapping is None:
+            lines.append('')
+            continue
+        lines.append(''.join(
+            _encodeVlq(value)
+            for value in (0, *(a - b for a, b in zip(mapping, prev)),)))
+        prev = mapping
+    return ';'.join(lines)
+
+
+def _encodeVlq(value: int) -> str:
+    vlq = (-value << 1) | 1 if value < 0 else value << 1
+    digits = list[str]()
+    while True:
+        digit = vlq & 0b11111
+        vlq >>= 5
+        digits.append(_BASE64[digit | (0b100000 if vlq else 0)])
+        if not vlq:
+            return ''.join(digits)
@@ -29,3 +29,6 @@ celeryApp.config_from_object('django.conf:settings', namespace='CELERY')
 
 # Forcing Celery to auto-discover tasks from installed apps...
 celeryApp.autodiscover_tasks(['challenges'])
+celeryApp.autodiscover_tasks(
+    ['assets.challenges.random_ints'],
+    related_name='backend')
@@ -0,0 +1,480 @@
+#
+# 
+#
+"""This module offers the critical CSS of templates: the rules of their
+stylesheets which their markup above the fold uses, inlined into their
+`<head>` so pages paint before their full stylesheets arrive.
+
+The `build_critical_css` command renders every template of the
+`CRITICAL_CSS` setting with an empty context, matches the selectors of
+its stylesheets against the elements of the page outside `<footer>`, and
+writes the rules which match, minified, into `assets/critical`, along
+with the `@keyframes` they animate by. Matching errs on the side of
+keeping rules: attribute selectors only require attributes, whose values
+scripts change, as they do the theme, and pseudo-classes but `:root`
+match, except those of user actions, which cannot apply before paint.
+Other at-rules are left to the full stylesheets.
+
+The `stylesheets` global of templates inlines the critical CSS of a
+template and loads its full stylesheets without blocking rendering, or
+links them as usual if its critical CSS is not built. Relative URLs of
+stylesheets are written as static names, which are resolved by the
+static files storage when the CSS is inlined, so they get hashed names.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass, field
+from html.parser import HTMLParser
+from pathlib import Path
+import posixpath
+import re
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.loader import render_to_string
+
+
+CRITICAL_DIR = 'critical'
+"""The directory of critical CSS in the assets."""
+
+_BELOW_THE_FOLD = {'footer',}
+"""The elements whose content is below the fold of every page."""
+
+_VOID_TAGS = {
+    'area', 'base', 'br', 'col', 'embed', 'hr', 'img', 'input', 'link',
+    'meta', 'source', 'track', 'wbr',}
+
+_USER_ACTIONS = {
+    'hover', 'active', 'focus', 'focus-visible', 'focus-within',
+    'visited',}
+"""The pseudo-classes of user actions."""
+
+_PSEUDO_ELEMENTS = {'before', 'after', 'first-line', 'first-letter',}
+"""The pseudo-elements which are allowed a single colon."""
+
+_GROUP_RULES = ('@media', '@supports', '@layer', '@container',)
+
+_KEYFRAMES = re.compile(r'@(?:-\w+-)?keyframes\s+(\S+)', re.IGNORECASE)
+
+_COMMENTS = re.compile(
+    r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')|/\*.*?\*/',
+    re.DOTALL)
+
+_STRINGS = re.compile(r'("(?:\\.|[^"\\])*"|\'(?:\\.|[^\'\\])*\')')
+
+_IDENT = re.compile(r'(?:\\.|[-\w])+')
+
+_TYPE = re.compile(r'\*|(?:\\.|[-\w])+')
+
+_URL = re.compile(r'url\(\s*([\'"]?)(.*?)\1\s*\)', re.IGNORECASE)
+
+
+@dataclass
+class _Rule:
+    prelude: str
+    body: str | list[_Rule]
+    """The declarations of the rule, or the rules of group rules and
+    `@keyframes`.
+    """
+
+
+@dataclass(eq=False)
+class _Element:
+    tag: str
+    attrs: dict[str, str]
+    parent: _Element | None
+    prev: _Element | None
+    """The previous sibling element."""
+    belowFold: bool
+    lastChild: _Element | None = field(default=None, repr=False)
+
+
+class _ElementsParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__()
+        self.elements = list[_Element]()
+        self._root = _Element('', {}, None, None, False)
+        self._stack = [self._root]
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        parent = self._stack[-1]
+        elem = _Element(
+            tag,
+            {name: value or '' for name, value in attrs},
+            parent if parent is not self._root else None,
+            parent.lastChild,
+            parent.belowFold or tag in _BELOW_THE_FOLD)
+        parent.lastChild = elem
+        self.elements.append(elem)
+        if tag not in _VOID_TAGS:
+            self._stack.append(elem)
+
+    def handle_startendtag(self, tag: str, attrs: list) -> None:
+        self.handle_starttag(tag, attrs)
+        if tag not in _VOID_TAGS:
+            self._stack.pop()
+
+    def handle_endtag(self, tag: str) -> None:
+        for idx in range(len(self._stack) - 1, 0, -1):
+            if self._stack[idx].tag == tag:
+                del self._stack[idx:]
+                break
+
+
+def getCriticalDir() -> Path:
+    """Gets the directory of critical CSS in the source tree."""
+    return Path(settings.DJANGO_DIR) / 'assets' / CRITICAL_DIR
+
+
+def getCriticalPath(template_name: str) -> Path:
+    """Gets the path of the critical CSS of the template `template_name`."""
+    stem, _ = posixpath.splitext(template_name)
+    return getCriticalDir() / f'{stem}.css'
+
+
+_styles = dict[Path, tuple[float, str]]()
+"""The mapping of paths of critical CSS to their modification times and
+content.
+"""
+
+
+def getCriticalCss(template_name: str) -> str | None:
+    """Gets the critical CSS of the template `template_name`, with the
+    URLs of static files resolved by the static files storage, or `None`
+    if it is not built. Raises `ValueError` if the storage does not find
+    a static file.
+    """
+    path = getCriticalPath(template_name)
+    try:
+        mtime = path.stat().st_mtime
+    except OSError:
+        return None
+    cached = _styles.get(path)
+    if cached is None or cached[0] != mtime:
+        cached = (mtime, path.read_text(encoding='utf-8'),)
+        _styles[path] = cached
+    return _URL.sub(lambda match: _resolveUrl(match[2]), cached[1])
+
+
+def extractCriticalCss(
+        template_name: str,
+        stylesheets: list[str],
+        ) -> str:
+    """Extracts the critical CSS of the template `template_name` from the
+    static files `stylesheets`, in their order. Raises `ValueError` if a
+    stylesheet is not found.
+    """
+    parser = _ElementsParser()
+    parser.feed(render_to_string(template_name, {}))
+    parser.close()
+    elements = [elem for elem in parser.elements if not elem.belowFold]
+    lines = list[str]()
+    animations = set[str]()
+    keyframes = list[tuple[str, str, _Rule]]()
+    for name in stylesheets:
+        path = finders.find(name)
+        if not path:
+            raise ValueError(f'stylesheet not found: {name}')
+        css = Path(path).read_text(encoding='utf-8')
+        for rule in parseStylesheet(css):
+            match = _KEYFRAMES.match(rule.prelude)
+            if match:
+                keyframes.append((match[1], name, rule,))
+                continue
+            selected = _selectRule(rule, elements, name, animations)
+            if selected is not None:
+                lines.append(_formatRule(selected))
+    for animation, name, rule in keyframes:
+        if animation not in animations:
+            continue
+        frames = [
+            _Rule(_minify(frame.prelude, ','), _minifyDeclarations(
+                frame.body,
+                name))
+            for frame in rule.body
+            if isinstance(frame.body, str)]
+        lines.append(_formatRule(_Rule(rule.prelude, frames)))
+    css = ''.join(f'{line}\n' for line in lines)
+    if '</' in css:
+        raise ValueError('critical CSS must not close the <style> element')
+    return css
+
+
+def parseStylesheet(css: str) -> list[_Rule]:
+    """Parses the style rules and at-rules of the stylesheet `css`. Rules
+    of group rules and `@keyframes` are parsed as nested rules, other
+    at-rules with blocks as style rules. Statement at-rules are dropped.
+    """
+    css = _COMMENTS.sub(lambda match: match[1] or ' ', css)
+    rules, _ = _parseRules(css, 0)
+    return rules
+
+
+def _parseRules(css: str, pos: int) -> tuple[list[_Rule], int]:
+    rules = list[_Rule]()
+    while True:
+        while pos < len(css) and css[pos].isspace():
+            pos += 1
+        if pos >= len(css) or css[pos] == '}':
+            return rules, pos + 1
+        end = _findTop(css, pos, '{;}')
+        prelude = ' '.join(css[pos:end].split())
+        if end >= len(css) or css[end] != '{':
+            # Dropping statement at-rules such as `@import`...
+            pos = end + 1 if end < len(css) and css[end] == ';' else end
+            continue
+        lowered = prelude.lower()
+        if lowered.startswith(_GROUP_RULES) or _KEYFRAMES.match(prelude):
+            nested, pos = _parseRules(css, end + 1)
+            rules.append(_Rule(prelude, nested))
+        else:
+            close = _findTop(css, end + 1, '}')
+            rules.append(_Rule(prelude, css[end + 1:close]))
+            pos = close + 1
+
+
+def _findTop(text: str, pos: int, stops: str) -> int:
+    """Finds the first of `stops` in `text` from `pos` which is neither
+    in strings nor in parentheses or brackets, or the length of `text`.
+    """
+    depth = 0
+    quote = ''
+    while pos < len(text):
+        char = text[pos]
+        if quote:
+            if char == '\\':
+                pos += 1
+            elif char == quote:
+                quote = ''
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth = max(depth - 1, 0)
+        elif depth == 0 and char in stops:
+            return pos
+        pos += 1
+    return pos
+
+
+def _splitTop(text: str, sep: str) -> list[str]:
+    parts = list[str]()
+    pos = 0
+    while pos <= len(text):
+        end = _findTop(text, pos, sep)
+        parts.append(text[pos:end])
+        pos = end + 1
+    return parts
+
+
+def _selectRule(
+        rule: _Rule,
+        elements: list[_Element],
+        stylesheet: str,
+        animations: set[str],
+        ) -> _Rule | None:
+    """Selects the parts of `rule` of `stylesheet` which apply to
+    `elements`, adding the animations they use to `animations`, or gets
+    `None` if none applies.
+    """
+    if isinstance(rule.body, list):
+        if _KEYFRAMES.match(rule.prelude):
+            return None
+        nested = list[_Rule]()
+        for child in rule.body:
+            selected = _selectRule(child, elements, stylesheet, animations)
+            if selected is not None:
+                nested.append(selected)
+        return _Rule(rule.prelude, nested) if nested else None
+    if rule.prelude.startswith('@'):
+        return None
+    selectors = [
+        selector
+        for selector in _splitTop(rule.prelude, ',')
+        if any(_matches(selector, elem) for elem in elements)]
+    if not selectors:
+        return None
+    return _Rule(
+        ','.join(_minify(selector, '>+~') for selector in selectors),
+        _minifyDeclarations(rule.body, stylesheet, animations))
+
+
+def _minifyDeclarations(
+        body: str,
+        stylesheet: str,
+        animations: set[str] | None = None,
+        ) -> str:
+    """Minifies the declarations `body` of `stylesheet`, adding the
+    animations they use to `animations` if it is not `None`.
+    """
+    declarations = list[str]()
+    for declaration in _splitTop(body, ';'):
+        prop, _, value = declaration.partition(':')
+        prop = prop.strip()
+        value = _minify(value, ',/')
+        if not prop or not value:
+            continue
+        if animations is not None and \
+                prop.lower() in ('animation', 'animation-name',):
+            animations.update(re.split(r'[\s,]+', value))
+        value = _URL.sub(
+            lambda match: _rebaseUrl(match[2], stylesheet),
+            value)
+        declarations.append(f'{prop}:{value.replace(" !", "!")}')
+    return ';'.join(declarations)
+
+
+def _rebaseUrl(url: str, stylesheet: str) -> str:
+    """Gets the `url()` of `url` of `stylesheet` which is inlined into
+    pages, as relative URLs are relative to the page there. Relative URLs
+    become static names, which `_resolveUrl` resolves.
+    """
+    if _isRelative(url):
+        url = posixpath.normpath(
+            posixpath.join(posixpath.dirname(stylesheet), url))
+    return f'url("{url}")'
+
+
+def _resolveUrl(url: str) -> str:
+    """Gets the `url()` of `url` of critical CSS, resolving static names
+    by the static files storage.
+    """
+    if _isRelative(url):
+        url = staticfiles_storage.url(url)
+    return f'url("{url}")'
+
+
+def _isRelative(url: str) -> bool:
+    return not url.startswith(('data:', '/', '#',)) and ':' not in url
+
+
+def _minify(text: str, punctuation: str) -> str:
+    """Collapses whitespace of `text` outside strings, and removes it
+    around `punctuation`.
+    """
+    parts = _STRINGS.split(text)
+    spacing = re.compile(rf'\s*([{re.escape(punctuation)}])\s*')
+    for idx in range(0, len(parts), 2):
+        parts[idx] = spacing.sub(r'\1', re.sub(r'\s+', ' ', parts[idx]))
+    return ''.join(parts).strip()
+
+
+def _formatRule(rule: _Rule) -> str:
+    if isinstance(rule.body, list):
+        return (
+            f'{_minify(rule.prelude, ":,")}'
+            f'{{{"".join(map(_formatRule, rule.body))}}}')
+    return f'{rule.prelude}{{{rule.body}}}'
+
+
+def _matches(selector: str, elem: _Element) -> bool:
+    """Determines whether the complex selector `selector` may match
+    `elem`. Unsupported selectors match every element.
+    """
+    try:
+        compounds = _parseSelector(selector)
+    except ValueError:
+        return True
+    return bool(compounds) and \
+        _matchesFrom(compounds, len(compounds) - 1, elem)
+
+
+def _parseSelector(selector: str) -> list[tuple[str, list[tuple[str, str]]]]:
+    """Parses the complex selector `selector` into its compound selectors,
+    with the combinators before them, whose simple selectors are pairs of
+    kinds and values.
+    """
+    compounds = list[tuple[str, list[tuple[str, str]]]]()
+    combinator = ''
+    simples = list[tuple[str, str]]()
+    selector = selector.strip()
+    pos = 0
+    while pos < len(selector):
+        char = selector[pos]
+        if char.isspace() or char in '>+~':
+            end = pos
+            while end < len(selector) and (
+                    selector[end].isspace() or selector[end] in '>+~'):
+                end += 1
+            if simples:
+                compounds.append((combinator, simples,))
+                simples = []
+            combinator = selector[pos:end].strip() or ' '
+            pos = end
+        elif char == '[':
+            end = _findTop(selector, pos + 1, ']')
+            simples.append(('attr', selector[pos + 1:end],))
+            pos = end + 1
+        elif char == ':':
+            double = selector.startswith('::', pos)
+            match = _IDENT.match(selector, pos + (2 if double else 1))
+            if not match:
+                raise ValueError(f'bad selector: {selector}')
+            name = match[0].lower()
+            pos = match.end()
+            if pos < len(selector) and selector[pos] == '(':
+                pos = _findTop(selector, pos + 1, ')') + 1
+            simples.append((
+                'element' if double or name in _PSEUDO_ELEMENTS else
+                    'pseudo',
+                name,))
+        elif char in '#.':
+            match = _IDENT.match(selector, pos + 1)
+            if not match:
+                raise ValueError(f'bad selector: {selector}')
+            simples.append(('id' if char == '#' else 'class', match[0],))
+            pos = match.end()
+        else:
+            match = _TYPE.match(selector, pos)
+            if not match:
+                raise ValueError(f'bad selector: {selector}')
+            simples.append(('type', match[0].lower(),))
+            pos = match.end()
+    if simples:
+        compounds.append((combinator, simples,))
+    return compounds
+
+
+def _matchesFrom(
+        compounds: list[tuple[str, list[tuple[str, str]]]],
+        idx: int,
+        elem: _Element,
+        ) -> bool:
+    combinator, simples = compounds[idx]
+    if not _matchesCompound(simples, elem):
+        return False
+    if idx == 0:
+        return True
+    other = elem.prev if combinator in '+~' else elem.parent
+    while other is not None:
+        if _matchesFrom(compounds, idx - 1, other):
+            return True
+        if combinator in '>+':
+            return False
+        other = other.prev if combinator == '~' else other.parent
+    return False
+
+
+def _matchesCompound(simples: list[tuple[str, str]], elem: _Element) -> bool:
+    for kind, value in simples:
+        if kind == 'type':
+            if value not in ('*', elem.tag,):
+                return False
+        elif kind == 'id':
+            if elem.attrs.get('id') != value:
+                return False
+        elif kind == 'class':
+            if value not in elem.attrs.get('class', '').split():
+                return False
+        elif kind == 'attr':
+            name = re.split(r'[~|^$*]?=', value, maxsplit=1)[0]
+            if name.strip().lower() not in elem.attrs:
+                return False
+        elif kind == 'pseudo':
+            if value in _USER_ACTIONS:
+                return False
+            if value == 'root' and elem.tag != 'html':
+                return False
+    return True
@@ -0,0 +1,153 @@
+#
+# 
+#
+"""This module offers responsive variants of images: the images of the
+`IMAGE_VARIANT_SOURCES` setting resized to the widths of the
+`IMAGE_VARIANT_WIDTHS` setting below their own, in AVIF and WebP where
+Pillow has their codecs, and in PNG for other browsers.
+
+The `build_images` command writes variants into `IMAGE_VARIANTS_DIR`,
+named by hashes of their sources so unchanged images are not encoded
+again, and an index of them, `images.json`. Static files include the
+directory under the `variants/` prefix. The `picture` global of
+templates offers the variants static files serve to browsers by `srcset`
+and `sizes`, or falls back to the image itself if none is served.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+from typing import Any
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+
+
+VARIANTS_PREFIX = 'variants'
+"""The prefix of static names of variants."""
+
+INDEX_NAME = 'images.json'
+"""The name of the index of variants in `IMAGE_VARIANTS_DIR`."""
+
+_FORMATS = (
+    ('image/avif', 'AVIF', 'avif', {'quality': 60},),
+    ('image/webp', 'WEBP', 'webp', {'quality': 80, 'method': 6},),
+    ('image/png', 'PNG', 'png', {'optimize': True},),)
+"""The MIME types, Pillow formats, extensions and options of encoding of
+variants, from the most preferred.
+"""
+
+
+@dataclass
+class _Index:
+    path: Path
+    mtime: float
+    images: dict[str, dict[str, Any]]
+
+
+_index: _Index | None = None
+
+
+def getAvailableFormats() -> list[str]:
+    """Gets the MIME types of variants Pillow can encode here."""
+    from PIL import features
+    types = list[str]()
+    for mimeType, _, ext, _ in _FORMATS:
+        if ext == 'png' or features.check(ext):
+            types.append(mimeType)
+    return types
+
+
+def buildVariants(
+        variants_dir: Path | None = None,
+        ) -> dict[str, dict[str, Any]]:
+    """Builds variants of the images of the `IMAGE_VARIANT_SOURCES`
+    setting into `variants_dir`, `IMAGE_VARIANTS_DIR` by default. It
+    writes and returns the index of variants, and removes variants which
+    are no longer in the index. Raises `ValueError` if a source image is
+    not found.
+    """
+    from PIL import Image
+    if variants_dir is None:
+        variants_dir = Path(settings.IMAGE_VARIANTS_DIR)
+    variants_dir.mkdir(parents=True, exist_ok=True)
+    formats = [fmt for fmt in _FORMATS if fmt[0] in getAvailableFormats()]
+    images = dict[str, dict[str, Any]]()
+    kept = {INDEX_NAME, '.gitkeep',}
+    for name in settings.IMAGE_VARIANT_SOURCES:
+        path = finders.find(name)
+        if not path:
+            raise ValueError(f'image not found: {name}')
+        data = Path(path).read_bytes()
+        digest = hashlib.blake2b(data, digest_size=6).hexdigest()
+        stem, _ = os.path.splitext(name)
+        with Image.open(path) as source:
+            image = source.convert(
+                'RGBA' if 'A' in source.getbands() or
+                    'transparency' in source.info else
+                'RGB')
+            width, height = image.size
+            widths = sorted({
+                *(w for w in settings.IMAGE_VARIANT_WIDTHS if w < width),
+                width,})
+            sources = dict[str, list[tuple[int, str]]]()
+            for mimeType, pillowFormat, ext, options in formats:
+                sources[mimeType] = []
+                for w in widths:
+                    fileName = f'{stem}.{digest}.{w}w.{ext}'
+                    kept.add(fileName)
+                    filePath = variants_dir / fileName
+                    if not filePath.exists():
+                        filePath.parent.mkdir(parents=True, exist_ok=True)
+                        resized = image if w == width else image.resize(
+                            (w, max(1, round(height * w / width)),),
+                            Image.Resampling.LANCZOS)
+                        resized.save(filePath, pillowFormat, **options)
+                    sources[mimeType].append(
+                        (w, f'{VARIANTS_PREFIX}/{fileName}',))
+        images[name] = {
+            'hash': digest,
+            'width': width,
+            'height': height,
+            'sources': sources,}
+    (variants_dir / INDEX_NAME).write_text(
+        json.dumps(images, indent=2),
+        encoding='utf-8')
+    # Removing variants of old sources...
+    for file in variants_dir.rglob('*'):
+        if file.is_file() and \
+                file.relative_to(variants_dir).as_posix() not in kept:
+            file.unlink()
+    return images
+
+
+def getIndexMtime() -> float | None:
+    """Gets the modification time of the index of variants, or `None` if
+    it does not exist.
+    """
+    indexPath = Path(settings.IMAGE_VARIANTS_DIR) / INDEX_NAME
+    try:
+        return indexPath.stat().st_mtime
+    except OSError:
+        return None
+
+
+def getVariants(name: str) -> dict[str, Any] | None:
+    """Gets the entry of the image `name` in the index of variants, or
+    `None` if it has no variants.
+    """
+    global _index
+    indexPath = Path(settings.IMAGE_VARIANTS_DIR) / INDEX_NAME
+    mtime = getIndexMtime()
+    if mtime is None:
+        return None
+    if _index is None or _index.path != indexPath or \
+            _index.mtime != mtime:
+        _index = _Index(
+            indexPath,
+            mtime,
+            json.loads(indexPath.read_text(encoding='utf-8')))
+    return _index.images.get(name)
@@ -3,18 +3,44 @@
 #
 
 from datetime import datetime
+import hashlib
+import os
+import stat
 
-from jinja2 import Environment
+from jinja2 import Environment, FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import ImproperlyConfigured
+from django.core.cache import cache
 from django.templatetags.static import static
 from django.urls import reverse
 
+from .bundles import getBundleName
+from .critical import getCriticalCss
+from .images import getIndexMtime, getVariants
+from .sprites import SPRITE_NAME
+
 
 def environment(**options):
+   # Sharing compiled templates between workers through the disk...
+   cacheDir = getattr(settings, 'JINJA2_BYTECODE_CACHE_DIR', None)
+   if cacheDir != '' and 'bytecode_cache' not in options:
+      options['bytecode_cache'] = makeBytecodeCache(cacheDir)
+   options['extensions'] = [
+      *options.get('extensions', ()),
+      FragmentCacheExtension,]
    env = Environment(**options)
    env.globals.update({
       'trim_blocks': True,
       'lstrip_blocks': True,
       'static': static,
+      'icon': icon,
+      'bundle': bundle,
+      'picture': picture,
+      'stylesheets': stylesheets,
       'url': reverse,
       'range': range,
       'now': datetime.now,
@@ -23,4 +49,228 @@ def environment(**options):
    #env.globals['trim_blocks'] = True
    #env.globals['lstrip_blocks'] = True
 
-   return env
\ No newline at end of file
+   return env
+
+
+def makeBytecodeCache(cache_dir: str | None) -> FileSystemBytecodeCache:
+   """Makes the bytecode cache of templates on `cache_dir`, or on the
+   private directory of the user Jinja2 makes in the temporary directory
+   if it is `None`. As bytecode is run, `cache_dir` is created private to
+   the user, and raises `ImproperlyConfigured` if it is owned by another
+   user or is writable by others.
+   """
+   if cache_dir is None:
+      return FileSystemBytecodeCache()
+   os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+   info = os.lstat(cache_dir)
+   if not stat.S_ISDIR(info.st_mode):
+      raise ImproperlyConfigured(
+         f'the bytecode cache of templates is not a directory: {cache_dir}')
+   if hasattr(os, 'getuid') and (info.st_uid != os.getuid() or
+         info.st_mode & (stat.S_IWGRP | stat.S_IWOTH)):
+      raise ImproperlyConfigured(
+         'the bytecode cache of templates must be owned by the user and '
+         f'not writable by others: {cache_dir}')
+   return FileSystemBytecodeCache(cache_dir)
+
+
+def icon(name: str, title: str | None = None, **attrs) -> Markup:
+   """Gets the inline SVG which draws the icon `name` from the sprite of
+   icons, with the HTML attributes `attrs`, whose underscores become
+   hyphens, except trailing ones as in `class_`. Icons without `title` are
+   hidden from assistive technologies.
+   """
+   attrs = {
+      key.rstrip('_').replace('_', '-'): value
+      for key, value in attrs.items()}
+   attrs['class'] = ' '.join(
+      filter(None, ('m3-svg-icon', attrs.get('class'),)))
+   if title is None:
+      attrs['aria-hidden'] = 'true'
+   else:
+      attrs['role'] = 'img'
+      attrs['aria-label'] = title
+   return Markup('<svg{}><use href="{}#{}"></use></svg>').format(
+      _formatAttrs(attrs),
+      static(SPRITE_NAME),
+      name)
+
+
+def bundle(name: str) -> Markup:
+   """Gets the `<script>` element which loads the bundle of scripts `name`
+   of the `JS_BUNDLES` setting.
+   """
+   if name not in settings.JS_BUNDLES:
+      raise ValueError(f'unknown bundle of scripts: {name!r}')
+   return Markup('<script defer type="module" src="{}"></script>').format(
+      static(getBundleName(name)))
+
+
+def stylesheets(template_name: str) -> Markup:
+   """Gets the elements which apply the stylesheets of the template
+   `template_name` of the `CRITICAL_CSS` setting: its critical CSS inlined
+   and the stylesheets loaded without blocking rendering, or linked as
+   usual if its critical CSS is not built.
+   """
+   if template_name not in settings.CRITICAL_CSS:
+      raise ValueError(f'unknown template of critical CSS: {template_name!r}')
+   links = Markup('').join(
+      Markup('<link rel="stylesheet" href="{}">').format(static(name))
+      for name in settings.CRITICAL_CSS[template_name])
+   css = getCriticalCss(template_name)
+   if css is None:
+      return links
+   # Stylesheets for print do not block rendering, and apply to screens
+   # once loaded...
+   asyncLinks = Markup('').join(
+      Markup(
+         '<link rel="stylesheet" href="{}" media="print" '
+         'onload="this.media=\'all\'">').format(static(name))
+      for name in settings.CRITICAL_CSS[template_name])
+   return Markup('<style>{}</style>{}<noscript>{}</noscript>').format(
+      Markup(css),
+      asyncLinks,
+      links)
+
+
+def picture(
+      name: str,
+      alt: str,
+      sizes: str = '100vw',
+      **attrs,
+      ) -> Markup:
+   """Gets the `<picture>` element of the image `name` which offers its
+   variants to browsers by `srcset`, for the layout width `sizes`, with
+   the HTML attributes `attrs` of the `<img>` element, whose underscores
+   become hyphens, except trailing ones as in `class_`. Only variants
+   static files serve are offered, and it is the plain `<img>` element if
+   none of them is served.
+   """
+   attrs = {
+      key.rstrip('_').replace('_', '-'): value
+      for key, value in attrs.items()}
+   attrs = {'src': static(name), 'alt': alt, **attrs}
+   variants = getVariants(name)
+   srcsets = dict[str, str]()
+   if variants is not None:
+      for mimeType, sources in variants['sources'].items():
+         srcset = ', '.join(
+            f'{static(variant)} {width}w'
+            for width, variant in sources
+            if _isServed(variant))
+         if srcset:
+            srcsets[mimeType] = srcset
+   if not srcsets:
+      return Markup('<img{}>').format(_formatAttrs(attrs))
+   attrs.setdefault('width', variants['width']) # type: ignore
+   attrs.setdefault('height', variants['height']) # type: ignore
+   attrs.setdefault('decoding', 'async')
+   sourcesHtml = Markup('')
+   for mimeType, srcset in srcsets.items():
+      if mimeType == 'image/png':
+         attrs['srcset'] = srcset
+         attrs['sizes'] = sizes
+      else:
+         sourcesHtml += Markup(
+            '<source type="{}" srcset="{}" sizes="{}">').format(
+               mimeType,
+               srcset,
+               sizes)
+   return Markup('<picture>{}<img{}></picture>').format(
+      sourcesHtml,
+      _formatAttrs(attrs))
+
+
+def _isServed(name: str) -> bool:
+   # Assets are served from their directories in development, and from
+   # collected files otherwise...
+   if settings.DEBUG:
+      return finders.find(name) is not None
+   return staticfiles_storage.exists(name)
+
+
+def _formatAttrs(attrs: dict) -> Markup:
+   return Markup('').join(
+      Markup(' {}="{}"').format(key, value)
+      for key, value in attrs.items())
+
+
+class FragmentCacheExtension(Extension):
+   """Adds the `{% cache key, timeout %}...{% endcache %}` block, which
+   keeps its rendered content in the default Django cache for `timeout`
+   seconds, or the default timeout of the cache if it is omitted. `key`
+   is any expression whose `repr` tells apart variants of the content.
+
+   Keys are versioned by the source of the template, the manifest of
+   static files and the index of variants of images, so neither editing
+   a template, collecting changed assets nor building images serves
+   fragments rendered before.
+   """
+   tags = {'cache'}
+
+   def __init__(self, environment: Environment) -> None:
+      super().__init__(environment)
+      self._versions = dict[str | None, str]()
+      """The mapping of names of templates to hashes of their sources."""
+
+   def preprocess(
+         self,
+         source: str,
+         name: str | None,
+         filename: str | None = None,
+         ) -> str:
+      self._versions[name] = hashlib.blake2b(
+         source.encode(),
+         digest_size=8).hexdigest()
+      return source
+
+   def parse(self, parser) -> nodes.Node:
+      lineno = next(parser.stream).lineno
+      args = [parser.parse_expression()]
+      if parser.stream.skip_if('comma'):
+         args.append(parser.parse_expression())
+      else:
+         args.append(nodes.Const(None))
+      version = f'{parser.name}:{self._versions.get(parser.name, "")}'
+      args.append(nodes.Const(version))
+      body = parser.parse_statements(('name:endcache',), drop_needle=True)
+      return nodes.CallBlock(
+         self.call_method('_renderCached', args),
+         [],
+         [],
+         body).set_lineno(lineno)
+
+   def _renderCached(self, key, timeout, version, caller) -> Markup:
+      keyHash = hashlib.blake2b(repr(key).encode(), digest_size=16)
+      manifestHash = getattr(staticfiles_storage, 'manifest_hash', '')
+      cacheKey = (
+         f'jinja2-fragment:{version}:{manifestHash}:{getIndexMtime()}:'
+         f'{keyHash.hexdigest()}')
+      content = cache.get(cacheKey)
+      if content is None:
+         content = str(caller())
+         if timeout is None:
+            cache.set(cacheKey, content)
+         else:
+            cache.set(cacheKey, content, timeout)
+      return Markup(content)
+
+
+def warmTemplates(env: Environment | None = None) -> list[str]:
+   """Loads all `.j2` templates of `env`, the environment of the Jinja2
+   engine of Django by default, into its template cache and returns their
+   names. Templates missing from the bytecode cache are compiled into it.
+   Every file is loaded by its shortest name, which is how views name it.
+   """
+   # Declaring variables ---------------------------------
+   from django.template import engines
+   # Functioning -----------------------------------------
+   if env is None:
+      env = engines['jinja2'].env # type: ignore
+   names = dict[str, str]()
+   for name in sorted(env.list_templates(extensions=['j2']), key=len):
+      _, filename, _ = env.loader.get_source(env, name) # type: ignore
+      names.setdefault(filename, name)
+   for name in names.values():
+      env.get_template(name)
+   return sorted(names.values())
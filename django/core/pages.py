@@ -0,0 +1,186 @@
+#
+# 
+#
+"""This module offers the page cache of views of static content, pages
+whose templates are rendered with an empty context.
+
+Rendered pages are kept in memory per path and the values of the headers
+they vary on, with a strong `ETag` of their content and a `Last-Modified`
+of the latest modification of their template files and the static assets
+these reference. A page is rendered again once one of these files
+changes, which is checked at most every `PAGE_CACHE_CHECK_INTERVAL`
+seconds, or when it is older than `PAGE_CACHE_MAX_AGE` seconds.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import hashlib
+import os
+import time
+from typing import Iterable
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.http import HttpRequest, HttpResponse
+from django.shortcuts import render
+from django.template import engines
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from jinja2 import meta, nodes
+
+from .critical import getCriticalPath
+from .sprites import SPRITE_NAME
+
+
+@dataclass
+class _Page:
+    body: bytes
+    contentType: str
+    etag: str
+    lastModified: float
+    """The latest modification time of files of the page."""
+    files: tuple[str, ...]
+    """The paths of template files and static assets of the page."""
+    mtimes: tuple[float, ...]
+    """The modification times of `files` when the page was rendered."""
+    renderedAt: float
+    checkedAt: float
+    """The time `files` were last checked for modifications."""
+
+
+_pages = dict[tuple[str, str, tuple[str, ...]], _Page]()
+"""The mapping of `(template name, path, header values)` to pages."""
+
+
+def renderStaticPage(
+        request: HttpRequest,
+        template_name: str,
+        vary: Iterable[str] = (),
+        ) -> HttpResponse:
+    """Renders `template_name` with an empty context, as `render` does,
+    but from the page cache. GET and HEAD requests are answered with HTTP
+    304 if the page has not changed since the client got it. `vary` is the
+    headers the page depends on.
+    """
+    if request.method not in ('GET', 'HEAD',):
+        return render(request, template_name, {})
+    vary = tuple(vary)
+    key = (
+        template_name,
+        request.path,
+        tuple(request.headers.get(header, '') for header in vary),)
+    page = _pages.get(key)
+    now = time.monotonic()
+    if page is None or _isStale(page, now):
+        response = render(request, template_name, {})
+        if response.status_code != 200:
+            return response
+        page = _makePage(template_name, response, now)
+        _pages[key] = page
+    response = get_conditional_response(
+        request,
+        etag=page.etag,
+        last_modified=int(page.lastModified))
+    if response is None:
+        response = HttpResponse(page.body, content_type=page.contentType)
+    response['ETag'] = page.etag
+    response['Last-Modified'] = http_date(page.lastModified)
+    response['Cache-Control'] = 'no-cache'
+    if vary:
+        patch_vary_headers(response, vary)
+    return response
+
+
+def clearPageCache() -> None:
+    """Removes all pages from the page cache."""
+    _pages.clear()
+
+
+def getTemplateFiles(template_name: str) -> list[str]:
+    """Gets the paths of the Jinja2 template `template_name`, the templates
+    it extends, includes or imports, and the static assets they reference
+    by constant paths, of files or pictures, by drawing icons of the
+    sprite, or by applying stylesheets with their critical CSS.
+    """
+    env = engines['jinja2'].env # type: ignore
+    files = list[str]()
+    names = [template_name]
+    seen = set[str]()
+    while names:
+        name = names.pop()
+        if name in seen:
+            continue
+        seen.add(name)
+        source, filename, _ = env.loader.get_source(env, name)
+        if filename:
+            files.append(filename)
+        ast = env.parse(source)
+        names.extend(
+            refName
+            for refName in meta.find_referenced_templates(ast)
+            if refName)
+        for call in ast.find_all(nodes.Call):
+            if not isinstance(call.node, nodes.Name):
+                continue
+            isConst = bool(call.args) and \
+                isinstance(call.args[0], nodes.Const)
+            if call.node.name in ('static', 'picture',) and isConst:
+                assets = [finders.find(call.args[0].value)]
+            elif call.node.name == 'icon':
+                assets = [finders.find(SPRITE_NAME)]
+            elif call.node.name == 'stylesheets' and isConst:
+                templateName = call.args[0].value
+                assets = [
+                    str(getCriticalPath(templateName)),
+                    *(finders.find(stylesheet)
+                        for stylesheet in settings.CRITICAL_CSS.get(
+                            templateName,
+                            ())),]
+            else:
+                continue
+            for asset in assets:
+                if asset and asset not in files:
+                    files.append(asset)
+    return files
+
+
+def _makePage(
+        template_name: str,
+        response: HttpResponse,
+        now: float,
+        ) -> _Page:
+    files = tuple(getTemplateFiles(template_name))
+    mtimes = _getMtimes(files)
+    body = response.content
+    return _Page(
+        body=body,
+        contentType=response['Content-Type'],
+        etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        lastModified=max(mtimes, default=time.time()),
+        files=files,
+        mtimes=mtimes,
+        renderedAt=now,
+        checkedAt=now)
+
+
+def _isStale(page: _Page, now: float) -> bool:
+    """Determines whether `page` must be rendered again."""
+    if now - page.renderedAt >= getattr(settings, 'PAGE_CACHE_MAX_AGE', 3600):
+        return True
+    if now - page.checkedAt < getattr(
+            settings,
+            'PAGE_CACHE_CHECK_INTERVAL',
+            1.0):
+        return False
+    page.checkedAt = now
+    return _getMtimes(page.files) != page.mtimes
+
+
+def _getMtimes(files: Iterable[str]) -> tuple[float, ...]:
+    mtimes = list[float]()
+    for file in files:
+        try:
+            mtimes.append(os.stat(file).st_mtime)
+        except OSError:
+            mtimes.append(0.0)
+    return tuple(mtimes)
@@ -0,0 +1,140 @@
+#
+# 
+#
+"""This module offers an offline harness of render timing, which estimates
+the first contentful paint of pages on a cold cache from their markup and
+assets alone, without a browser or a network.
+
+It models a browser on a mobile network of `RTT` seconds of round trip
+time and `BANDWIDTH` bytes per second, the slow 4G of Lighthouse.
+Opening a connection to an origin costs three round trips, for DNS, TCP
+and TLS, and every request one more, while responses of an origin share
+its bandwidth. The page paints once its HTML and the render-blocking
+resources of its `<head>` arrive: stylesheets of all media but `print`
+and scripts which are neither `async`, `defer` nor modules. Resources are
+requested once the HTML arrives and are gzip compressed as in production.
+Resources of other origins, whose sizes are unknown offline, weigh
+`EXTERNAL_SIZE` bytes.
+"""
+
+from __future__ import annotations
+from dataclasses import dataclass
+import gzip
+from html.parser import HTMLParser
+from pathlib import Path
+from urllib.parse import urlsplit
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.template.loader import render_to_string
+
+
+RTT = 0.150
+"""The default round trip time of the network in seconds."""
+
+BANDWIDTH = 1_638_400 // 8
+"""The default download bandwidth of the network in bytes per second."""
+
+EXTERNAL_SIZE = 1_000
+"""The default size of resources of other origins in bytes."""
+
+
+@dataclass
+class RenderTiming:
+    htmlSize: int
+    """The transfer size of the HTML of the page."""
+    blocking: list[tuple[str, int]]
+    """The URLs and transfer sizes of render-blocking resources."""
+    fcp: float
+    """The estimated first contentful paint in seconds."""
+
+
+class _BlockingParser(HTMLParser):
+    def __init__(self) -> None:
+        super().__init__()
+        self.urls = list[str]()
+        self._inHead = True
+        self._inNoscript = False
+
+    def handle_starttag(self, tag: str, attrs: list) -> None:
+        if tag == 'body':
+            self._inHead = False
+        elif tag == 'noscript':
+            # Browsers with scripts ignore the content of `<noscript>`...
+            self._inNoscript = True
+        if not self._inHead or self._inNoscript:
+            return
+        attrMap = dict(attrs)
+        if tag == 'link':
+            rels = (attrMap.get('rel') or '').lower().split()
+            media = (attrMap.get('media') or 'all').strip().lower()
+            if 'stylesheet' in rels and media != 'print' and \
+                    attrMap.get('href'):
+                self.urls.append(attrMap['href'])
+        elif tag == 'script':
+            if attrMap.get('src') and 'async' not in attrMap and \
+                    'defer' not in attrMap and \
+                    attrMap.get('type') != 'module':
+                self.urls.append(attrMap['src'])
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag == 'head':
+            self._inHead = False
+        elif tag == 'noscript':
+            self._inNoscript = False
+
+
+def findBlockingResources(html: str) -> list[str]:
+    """Finds the URLs of render-blocking resources of the `<head>` of the
+    HTML document `html`.
+    """
+    parser = _BlockingParser()
+    parser.feed(html)
+    parser.close()
+    return parser.urls
+
+
+def measureTemplate(
+        template_name: str,
+        rtt: float = RTT,
+        bandwidth: float = BANDWIDTH,
+        external_size: int = EXTERNAL_SIZE,
+        ) -> RenderTiming:
+    """Estimates the render timing of the page of the template
+    `template_name` rendered with an empty context. Raises `ValueError` if
+    a render-blocking static asset is not found.
+    """
+    html = render_to_string(template_name, {})
+    htmlSize = len(gzip.compress(html.encode()))
+    htmlArrival = 3 * rtt + rtt + htmlSize / bandwidth
+    blocking = list[tuple[str, int]]()
+    origins = dict[str, int]()
+    for url in findBlockingResources(html):
+        origin = urlsplit(url).netloc
+        size = external_size if origin else _getTransferSize(url)
+        blocking.append((url, size,))
+        origins[origin] = origins.get(origin, 0) + size
+    fcp = htmlArrival
+    for origin, size in origins.items():
+        # Only other origins need connections of their own...
+        connect = 3 * rtt if origin else 0.0
+        fcp = max(fcp, htmlArrival + connect + rtt + size / bandwidth)
+    return RenderTiming(htmlSize=htmlSize, blocking=blocking, fcp=fcp)
+
+
+def _getTransferSize(url: str) -> int:
+    path = urlsplit(url).path.lstrip('/')
+    prefix = settings.STATIC_URL.lstrip('/')
+    if not path.startswith(prefix):
+        raise ValueError(f'not a static asset: {url}')
+    name = path.removeprefix(prefix)
+    file = finders.find(name)
+    if file:
+        data = Path(file).read_bytes()
+    elif staticfiles_storage.exists(name):
+        with staticfiles_storage.open(name) as fileObj:
+            data = fileObj.read()
+    else:
+        raise ValueError(f'static asset not found: {name}')
+    return len(gzip.compress(data))
@@ -146,13 +146,14 @@ INSTALLED_APPS = [
     'django.contrib.contenttypes',
     'django.contrib.sessions',     # Supporting for anonymous sessions
     'django.contrib.messages',
-    'django.contrib.staticfiles',
+    'core.staticfiles.StaticFilesConfig',
     'main',
     'challenges',
 ]
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',    # Supporting for anonymous sessions
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -160,11 +161,15 @@ MIDDLEWARE = [
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
-if DEBUG:
-    MIDDLEWARE.append('whitenoise.middleware.WhiteNoiseMiddleware')
 
 ROOT_URLCONF = 'core.urls'
 
+# Compiled Jinja2 templates are shared by all workers on this directory,
+# which must be private to the user of workers, as the bytecode is run. By
+# default it is the private directory of the user Jinja2 makes in the
+# temporary directory. An empty value disables the bytecode cache.
+JINJA2_BYTECODE_CACHE_DIR = os.environ.get('JINJA2_BYTECODE_CACHE_DIR')
+
 TEMPLATES = [
     # Enabling Jinja2 templating engine...
     {
@@ -220,6 +225,46 @@ CACHES = {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
     }
 }
+# Static pages are rendered again once their templates or assets change,
+# which is checked on every request in debug mode, and at least every
+# `PAGE_CACHE_MAX_AGE` seconds...
+PAGE_CACHE_CHECK_INTERVAL = 0.0 if DEBUG else 1.0
+PAGE_CACHE_MAX_AGE = 3600
+
+
+# RPS game state store...
+# Game states must be shared by all workers, so the Redis store is used
+# whenever its URL is set.
+RPS_STATE_STORE = {
+    'BACKEND': 'assets.challenges.rps.store.LocMemRpsStateStore',
+    'TIMEOUT': 3600,
+}
+if os.environ.get('RPS_STATE_REDIS_URL'):
+    RPS_STATE_STORE['BACKEND'] = \
+        'assets.challenges.rps.store.RedisRpsStateStore'
+    RPS_STATE_STORE['LOCATION'] = os.environ['RPS_STATE_REDIS_URL']
+
+
+# Streams of random integers...
+# Stop requests reach streams served by other workers through Redis
+# pub/sub whenever its URL is set.
+RAND_INTS_REDIS_URL = os.environ.get('RAND_INTS_REDIS_URL')
+# Every worker admits a limited number of streams, in total and of every
+# client, and idle streams send heartbeats every `RAND_INTS_HEARTBEAT`
+# seconds so proxies do not close them.
+RAND_INTS_MAX_STREAMS = int(os.environ.get('RAND_INTS_MAX_STREAMS', 1_000))
+RAND_INTS_MAX_CLIENT_STREAMS = int(
+    os.environ.get('RAND_INTS_MAX_CLIENT_STREAMS', 8))
+RAND_INTS_HEARTBEAT = float(os.environ.get('RAND_INTS_HEARTBEAT', 15.0))
+# Celery workers keep this many runs of pre-generated frames in Redis for
+# every range of `RAND_INTS_POOL_RANGES`, if it is positive and the Redis
+# URL is set. Ranges are `lower:upper:batch` separated by commas, and
+# other ranges are streamed without pools, which bounds memory of Redis.
+RAND_INTS_POOL_SIZE = int(os.environ.get('RAND_INTS_POOL_SIZE', 0))
+RAND_INTS_POOL_RANGES = [
+    tuple(int(bound) for bound in poolRange.split(':'))
+    for poolRange in os.environ.get('RAND_INTS_POOL_RANGES', '').split(',')
+    if poolRange.strip()]
 
 
 # Password validation
@@ -270,6 +315,51 @@ STATIC_URL = 'assets/'
 STATICFILES_DIRS = [
     DJANGO_DIR / 'assets',
 ]
+# `build_images` writes resized AVIF, WebP and PNG variants of these
+# images here, for the widths below their own, which are static files
+# under the `variants/` prefix. The default directory is kept in the
+# repository by a `.gitkeep`, as static files warn about missing ones...
+IMAGE_VARIANT_SOURCES = [
+    'img/banner.png',
+    'img/megacodist-3.png',
+    'img/light-mode.png',
+    'img/dark-mode.png',
+    'challenges/rps/rock.png',
+    'challenges/rps/paper.png',
+    'challenges/rps/scissors.png',
+]
+IMAGE_VARIANT_WIDTHS = [40, 80, 160, 320, 480, 640, 960, 1280]
+IMAGE_VARIANTS_DIR = Path(
+    os.environ.get('IMAGE_VARIANTS_DIR', DJANGO_DIR / 'variants'))
+STATICFILES_DIRS.append(('variants', IMAGE_VARIANTS_DIR,))
+# `collectstatic` writes hashed and compressed assets here, which
+# WhiteNoise serves as immutable...
+STATIC_ROOT = Path(os.environ.get('STATIC_ROOT', DJANGO_DIR / 'static'))
+# The bundles of scripts of pages, by the static names of their entry
+# modules, which `bundle_scripts` writes into `assets/bundles`...
+JS_BUNDLES = {
+    'base': ['scripts/header.js',],
+    'random-ints': [
+        'scripts/header.js',
+        'challenges/random_ints/script.js',],
+}
+# The stylesheets of templates, whose rules their markup above the fold
+# uses `build_critical_css` writes into `assets/critical` to be inlined...
+CRITICAL_CSS = {
+    'base.j2': [
+        'css/base.css',
+        'css/beating-transition.css',
+        'css/header.css',
+        'css/footer.css',],
+}
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'core.staticfiles.StaticFilesStorage',
+    },
+}
 
 
 # User-uploaded files...
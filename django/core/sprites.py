@@ -0,0 +1,145 @@
+#
+# 
+#
+"""This module offers the SVG sprite of icons of the site.
+
+Every SVG file of `assets/vectors` becomes a `<symbol>` of the sprite,
+whose ID is the name of the file without extension, so pages draw all
+icons from one request for the sprite, through the `icon` global of
+templates. Icons are optimized on the way: metadata, titles, editor
+namespaces and IDs are dropped, and numbers of paths are rounded.
+
+The sprite is built by the `build_sprite` command into the static file
+`SPRITE_NAME`, which `collectstatic` names by a hash of its content like
+any other asset.
+"""
+
+from __future__ import annotations
+import re
+from pathlib import Path
+from xml.etree import ElementTree as ET
+
+from django.conf import settings
+
+
+SPRITE_NAME = 'img/icons.svg'
+"""The name of the sprite among static files."""
+
+_SVG_NS = 'http://www.w3.org/2000/svg'
+
+_DROPPED_TAGS = {'title', 'desc', 'metadata',}
+"""The SVG elements which do not affect how icons are drawn."""
+
+_DROPPED_ATTRS = {'id', 'class', 'display',}
+
+_PATH_TOKENS = re.compile(
+    r'[MmLlHhVvCcSsQqTtAaZz]|[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?')
+
+ET.register_namespace('', _SVG_NS)
+
+
+def getVectorsDir() -> Path:
+    """Gets the directory of SVG files of icons."""
+    return Path(settings.DJANGO_DIR) / 'assets' / 'vectors'
+
+
+def getSpritePath() -> Path:
+    """Gets the path of the sprite in the source tree."""
+    return Path(settings.DJANGO_DIR) / 'assets' / SPRITE_NAME
+
+
+def makeSprite(vectors_dir: Path | None = None) -> bytes:
+    """Makes the sprite of the SVG files of `vectors_dir`, the directory
+    of icons by default.
+    """
+    if vectors_dir is None:
+        vectors_dir = getVectorsDir()
+    sprite = ET.Element(f'{{{_SVG_NS}}}svg')
+    for file in sorted(Path(vectors_dir).glob('*.svg')):
+        sprite.append(makeSymbol(file.stem, file.read_bytes()))
+    return ET.tostring(sprite, encoding='utf-8', xml_declaration=False)
+
+
+def makeSymbol(name: str, svg: bytes) -> ET.Element:
+    """Makes the optimized `<symbol>` of the icon `name` from the source
+    of its SVG file.
+    """
+    root = ET.fromstring(svg)
+    symbol = ET.Element(f'{{{_SVG_NS}}}symbol', id=name)
+    viewBox = root.get('viewBox')
+    if viewBox:
+        symbol.set('viewBox', ' '.join(viewBox.replace(',', ' ').split()))
+    for child in root:
+        optimized = _optimize(child)
+        if optimized is not None:
+            symbol.append(optimized)
+    return symbol
+
+
+def minifyPath(data: str, ndigits: int = 2) -> str:
+    """Minifies the path data `data` by rounding its numbers to `ndigits`
+    decimals and dropping needless separators and repeated commands.
+    """
+    parts = list[str]()
+    prevIsNumber = False
+    command = ''
+    for token in _PATH_TOKENS.findall(data):
+        if token.isalpha():
+            # A repeated command is implied, but a repeated moveto is not
+            # as the following pairs are linetos...
+            if token != command or token in 'MmZz':
+                parts.append(token)
+                prevIsNumber = False
+            command = token
+            continue
+        number = _formatNumber(float(token), ndigits)
+        # A minus sign separates numbers by itself...
+        if prevIsNumber and not number.startswith('-'):
+            parts.append(' ')
+        parts.append(number)
+        prevIsNumber = True
+    return ''.join(parts)
+
+
+def _optimize(elem: ET.Element) -> ET.Element | None:
+    """Gets the optimized copy of `elem`, or `None` if it does not affect
+    how the icon is drawn.
+    """
+    ns, _, tag = elem.tag.rpartition('}')
+    if ns.lstrip('{') != _SVG_NS or tag in _DROPPED_TAGS:
+        return None
+    copy = ET.Element(elem.tag)
+    for attr, value in elem.attrib.items():
+        if attr.startswith('{') or attr in _DROPPED_ATTRS:
+            continue
+        value = ' '.join(value.split())
+        if not value:
+            continue
+        if attr == 'd':
+            value = minifyPath(value)
+        elif attr == 'style':
+            value = ';'.join(
+                ':'.join(part.strip() for part in decl.split(':', 1))
+                for decl in value.split(';')
+                if decl.strip())
+        copy.set(attr, value)
+    for child in elem:
+        optimized = _optimize(child)
+        if optimized is not None:
+            copy.append(optimized)
+    if tag in ('g', 'defs',) and not len(copy):
+        return None
+    return copy
+
+
+def _formatNumber(value: float, ndigits: int) -> str:
+    text = f'{round(value, ndigits):.{ndigits}f}'
+    if '.' in text:
+        text = text.rstrip('0').rstrip('.')
+    if text in ('', '-0',):
+        return '0'
+    if text.startswith('0.'):
+        return text[1:]
+    if text.startswith('-0.'):
+        return '-' + text[2:]
+    return text
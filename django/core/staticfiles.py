@@ -0,0 +1,36 @@
+#
+# 
+#
+"""This module offers the static files pipeline of production.
+
+`collectstatic` copies assets to `STATIC_ROOT` under names with hashes of
+their content, listed by a manifest, and writes gzip and Brotli variants
+of them next to them, Brotli only if the `Brotli` package is installed.
+The `static` global of templates resolves names to hashed URLs, which
+WhiteNoise serves with a far-future immutable `Cache-Control` and
+`Vary: Accept-Encoding`, so browsers never revalidate them.
+"""
+
+from django.contrib.staticfiles.apps import StaticFilesConfig as _Config
+from whitenoise.storage import CompressedManifestStaticFilesStorage
+
+
+class StaticFilesConfig(_Config):
+    """The `staticfiles` app which does not collect sources of the
+    backend, templates and TypeScript sources living among assets.
+    """
+    ignore_patterns = [
+        *_Config.ignore_patterns,
+        '*.py',
+        '*.pyc',
+        '__pycache__',
+        '*.j2',
+        '*.ts',]
+
+
+class StaticFilesStorage(CompressedManifestStaticFilesStorage):
+    """The storage of collected static files. Names missing from the
+    manifest raise `ValueError`, so mistyped or uncollected assets fail
+    to render instead of linking to URLs which are not found.
+    """
+    support_js_module_import_aggregation = True
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'core.settings')
 
 application = get_wsgi_application()
+
+# Loading URLs and templates before the first request...
+from django.urls import get_resolver
+from core.jinja2 import warmTemplates
+get_resolver().url_patterns
+warmTemplates()
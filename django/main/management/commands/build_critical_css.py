@@ -0,0 +1,53 @@
+#
+# 
+#
+
+import os
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.core.management.base import BaseCommand, CommandError
+
+from core.critical import extractCriticalCss, getCriticalPath
+
+
+class Command(BaseCommand):
+    help = (
+        'Extracts the rules of stylesheets of templates of the CRITICAL_CSS '
+        'setting which their markup above the fold uses, to be inlined.')
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help=(
+                'fails if critical CSS is not up to date, without writing '
+                'it'))
+
+    def handle(self, *args, **options) -> None:
+        stale = list[str]()
+        for name, stylesheets in settings.CRITICAL_CSS.items():
+            try:
+                css = extractCriticalCss(name, stylesheets)
+            except ValueError as err:
+                raise CommandError(
+                    f'failed to extract critical CSS of {name}: {err}'
+                    ) from err
+            path = getCriticalPath(name)
+            if options['check']:
+                if not path.exists() or \
+                        path.read_text(encoding='utf-8') != css:
+                    stale.append(name)
+                continue
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(css, encoding='utf-8')
+            nSource = sum(
+                os.path.getsize(finders.find(stylesheet))
+                for stylesheet in stylesheets)
+            self.stderr.write(
+                f'extracted {len(css.encode())} bytes of critical CSS of '
+                f'{name} from {nSource} bytes of stylesheets')
+            self.stdout.write(str(path))
+        if stale:
+            raise CommandError(
+                f'critical CSS is not up to date: {", ".join(stale)}')
@@ -0,0 +1,35 @@
+#
+# 
+#
+
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.images import buildVariants, getAvailableFormats
+
+
+class Command(BaseCommand):
+    help = (
+        'Writes resized AVIF, WebP and PNG variants of the images of the '
+        'IMAGE_VARIANT_SOURCES setting into IMAGE_VARIANTS_DIR.')
+
+    def handle(self, *args, **options) -> None:
+        try:
+            formats = getAvailableFormats()
+        except ImportError as err:
+            raise CommandError(
+                'Pillow is required to build variants of images') from err
+        start = time.perf_counter()
+        try:
+            images = buildVariants()
+        except ValueError as err:
+            raise CommandError(str(err)) from err
+        for name, image in images.items():
+            self.stdout.write(
+                f'{name}: {len(image["sources"]["image/png"])} widths')
+        self.stderr.write(
+            f'built variants of {len(images)} images in '
+            f'{", ".join(formats)} into {settings.IMAGE_VARIANTS_DIR} in '
+            f'{time.perf_counter() - start:.3f} seconds')
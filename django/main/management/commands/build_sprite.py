@@ -0,0 +1,38 @@
+#
+# 
+#
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.sprites import getSpritePath, getVectorsDir, makeSprite
+
+
+class Command(BaseCommand):
+    help = (
+        'Optimizes the SVG icons of assets/vectors and combines them into '
+        'the sprite of icons.')
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='fails if the sprite is not up to date, without writing it')
+
+    def handle(self, *args, **options) -> None:
+        vectorsDir = getVectorsDir()
+        spritePath = getSpritePath()
+        sprite = makeSprite(vectorsDir)
+        if options['check']:
+            if not spritePath.exists() or \
+                    spritePath.read_bytes() != sprite:
+                raise CommandError(f'{spritePath} is not up to date')
+            return
+        spritePath.parent.mkdir(parents=True, exist_ok=True)
+        spritePath.write_bytes(sprite)
+        nSource = sum(
+            file.stat().st_size
+            for file in vectorsDir.glob('*.svg'))
+        self.stderr.write(
+            f'combined {len(list(vectorsDir.glob("*.svg")))} icons of '
+            f'{nSource} bytes into {len(sprite)} bytes')
+        self.stdout.write(str(spritePath))
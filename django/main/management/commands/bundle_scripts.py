@@ -0,0 +1,47 @@
+#
+# 
+#
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.bundles import getBundlesDir, makeBundle
+
+
+class Command(BaseCommand):
+    help = (
+        'Bundles and minifies the JavaScript modules of pages into the '
+        'bundles of the JS_BUNDLES setting, with their source maps.')
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='fails if bundles are not up to date, without writing them')
+
+    def handle(self, *args, **options) -> None:
+        bundlesDir = getBundlesDir()
+        stale = list[str]()
+        for name, entries in settings.JS_BUNDLES.items():
+            try:
+                code, sourceMap = makeBundle(name, entries)
+            except ValueError as err:
+                raise CommandError(f'failed to bundle {name}: {err}') from err
+            codePath = bundlesDir / f'{name}.js'
+            mapPath = bundlesDir / f'{name}.js.map'
+            if options['check']:
+                if not codePath.exists() or not mapPath.exists() or \
+                        codePath.read_text(encoding='utf-8') != code or \
+                        mapPath.read_text(encoding='utf-8') != sourceMap:
+                    stale.append(name)
+                continue
+            bundlesDir.mkdir(parents=True, exist_ok=True)
+            codePath.write_text(code, encoding='utf-8')
+            mapPath.write_text(sourceMap, encoding='utf-8')
+            self.stderr.write(
+                f'bundled {len(entries)} entries of {name} into '
+                f'{len(code.encode())} bytes')
+            self.stdout.write(str(codePath))
+        if stale:
+            raise CommandError(
+                f'bundles are not up to date: {", ".join(stale)}')
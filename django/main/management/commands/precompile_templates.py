@@ -0,0 +1,37 @@
+#
+# 
+#
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+
+from core.jinja2 import warmTemplates
+
+
+class Command(BaseCommand):
+    help = (
+        'Compiles all Jinja2 templates into the bytecode cache shared by '
+        'workers.')
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            '--clear',
+            action='store_true',
+            help='removes compiled templates from the caches first')
+
+    def handle(self, *args, **options) -> None:
+        env = engines['jinja2'].env # type: ignore
+        if env.bytecode_cache is None:
+            raise CommandError('the bytecode cache of templates is disabled')
+        if options['clear']:
+            env.bytecode_cache.clear()
+            if env.cache is not None:
+                env.cache.clear()
+        start = time.perf_counter()
+        names = warmTemplates(env)
+        self.stderr.write(
+            f'compiled {len(names)} templates in '
+            f'{time.perf_counter() - start:.3f} seconds')
+        self.stdout.write('\n'.join(names))
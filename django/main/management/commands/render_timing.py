@@ -0,0 +1,52 @@
+#
+# 
+#
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.rendertiming import BANDWIDTH, RTT, measureTemplate
+
+
+_TEMPLATES = [
+    'home.j2',
+    'about-me.j2',
+    'license.j2',
+    'challenges/challenges-index.j2',]
+"""The default templates, those of static pages."""
+
+
+class Command(BaseCommand):
+    help = (
+        'Estimates the first contentful paint of pages on a cold cache, '
+        'offline, from their render-blocking resources.')
+
+    def add_arguments(self, parser) -> None:
+        parser.add_argument(
+            'templates',
+            nargs='*',
+            default=_TEMPLATES,
+            help='the templates of pages, those of static pages by default')
+        parser.add_argument(
+            '--rtt',
+            type=float,
+            default=RTT * 1_000,
+            help='the round trip time of the network in milliseconds')
+        parser.add_argument(
+            '--bandwidth',
+            type=float,
+            default=BANDWIDTH * 8 / 1_024,
+            help='the download bandwidth of the network in Kbit/s')
+
+    def handle(self, *args, **options) -> None:
+        rtt = options['rtt'] / 1_000
+        bandwidth = options['bandwidth'] * 1_024 / 8
+        for name in options['templates']:
+            try:
+                timing = measureTemplate(name, rtt, bandwidth)
+            except ValueError as err:
+                raise CommandError(f'failed to measure {name}: {err}') from err
+            blockingSize = sum(size for _, size in timing.blocking)
+            self.stdout.write(
+                f'{name}: FCP {timing.fcp * 1_000:.0f} ms, HTML '
+                f'{timing.htmlSize} bytes, {len(timing.blocking)} '
+                f'render-blocking requests of {blockingSize} bytes')
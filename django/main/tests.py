@@ -1,3 +1,523 @@
-from django.test import TestCase
+#
+# 
+#
 
-# Create your tests here.
+import importlib.util
+from io import StringIO
+import json
+import os
+from pathlib import Path
+import tempfile
+from typing import Iterable
+from unittest import mock, skipUnless
+from xml.etree import ElementTree as ET
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ImproperlyConfigured
+from django.core.management import call_command
+from django.shortcuts import render
+from django.template import engines
+from django.templatetags.static import static
+from django.test import Client, TestCase, override_settings
+from jinja2 import DictLoader, FileSystemBytecodeCache, Template
+
+from core.bundles import makeBundle, minifyScript
+from core.critical import extractCriticalCss, getCriticalCss
+from core.images import buildVariants
+from core.jinja2 import (
+    bundle, environment, icon, makeBytecodeCache, picture, stylesheets,
+    warmTemplates)
+from core import pages
+from core.pages import clearPageCache, getTemplateFiles
+from core.rendertiming import findBlockingResources, measureTemplate
+from core.sprites import getVectorsDir, makeSprite, minifyPath
+
+
+_PLAIN_STORAGES = {
+    **settings.STORAGES,
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+"""The storages of tests which render templates without collecting static
+files.
+"""
+
+
+@override_settings(PAGE_CACHE_CHECK_INTERVAL=0.0, STORAGES=_PLAIN_STORAGES)
+class PageCacheTests(TestCase):
+    def setUp(self) -> None:
+        clearPageCache()
+        self.addCleanup(clearPageCache)
+
+    def test_repeat_visits_do_not_render(self) -> None:
+        first = self.client.get('/', secure=True)
+        self.assertEqual(first.status_code, 200)
+        with mock.patch('core.pages.render') as renderMock:
+            second = self.client.get('/', secure=True)
+        renderMock.assert_not_called()
+        self.assertEqual(second.content, first.content)
+        self.assertEqual(second['ETag'], first['ETag'])
+        self.assertTrue(first['ETag'].startswith('"'))
+
+    def test_conditional_gets(self) -> None:
+        for path in ('/', '/license', '/about-me', '/challenges/',):
+            with self.subTest(path=path):
+                resp = self.client.get(path, secure=True)
+                self.assertEqual(resp.status_code, 200)
+                resp = self.client.get(
+                    path,
+                    secure=True,
+                    headers={'If-None-Match': resp['ETag']})
+                self.assertEqual(resp.status_code, 304)
+                self.assertEqual(resp.content, b'')
+                resp = self.client.get(
+                    path,
+                    secure=True,
+                    headers={'If-Modified-Since': resp['Last-Modified']})
+                self.assertEqual(resp.status_code, 304)
+                resp = self.client.get(
+                    path,
+                    secure=True,
+                    headers={'If-None-Match': '"stale"'})
+                self.assertEqual(resp.status_code, 200)
+
+    def test_changed_templates_invalidate_pages(self) -> None:
+        files = getTemplateFiles('home.j2')
+        self.assertTrue(any(file.endswith('base.j2') for file in files))
+        self.assertTrue(any(file.endswith('.css') for file in files))
+        first = self.client.get('/', secure=True)
+        base = next(file for file in files if file.endswith('base.j2'))
+        latest = max(os.stat(file).st_mtime for file in files)
+        getMtimes = pages._getMtimes
+        def getTouchedMtimes(files: Iterable[str]) -> tuple[float, ...]:
+            # Faking a modification of base.j2, not changing it...
+            files = tuple(files)
+            return tuple(
+                latest + 10 if file == base else mtime
+                for file, mtime in zip(files, getMtimes(files)))
+        with mock.patch('core.pages.render', wraps=render) as renderMock, \
+                mock.patch(
+                    'core.pages._getMtimes',
+                    side_effect=getTouchedMtimes):
+            second = self.client.get(
+                '/',
+                secure=True,
+                headers={'If-None-Match': first['ETag']})
+        renderMock.assert_called_once()
+        # The content is the same, so is its ETag, but not its date...
+        self.assertEqual(second.status_code, 304)
+        self.assertNotEqual(second['Last-Modified'], first['Last-Modified'])
+
+
+class TemplateWarmUpTests(TestCase):
+    def test_templates_are_compiled_once_by_their_names(self) -> None:
+        djangoEnv = engines['jinja2'].env # type: ignore
+        with tempfile.TemporaryDirectory() as cacheDir:
+            env = environment(
+                loader=djangoEnv.loader,
+                bytecode_cache=FileSystemBytecodeCache(cacheDir))
+            names = warmTemplates(env)
+            self.assertEqual(len(os.listdir(cacheDir)), len(names))
+        self.assertIn('home.j2', names)
+        self.assertIn('challenges/rps/page.j2', names)
+        self.assertNotIn('templates/home.j2', names)
+        # Views get loaded templates...
+        with mock.patch.object(env.loader, 'get_source') as getSource:
+            env.get_template('home.j2')
+        getSource.assert_not_called()
+
+    def test_bytecode_cache_dir_is_private(self) -> None:
+        with tempfile.TemporaryDirectory() as tempDir:
+            cacheDir = os.path.join(tempDir, 'jinja2')
+            makeBytecodeCache(cacheDir)
+            self.assertEqual(os.stat(cacheDir).st_mode & 0o777, 0o700)
+            # Others could plant bytecode into a shared directory...
+            os.chmod(cacheDir, 0o777)
+            with self.assertRaises(ImproperlyConfigured):
+                makeBytecodeCache(cacheDir)
+            os.chmod(cacheDir, 0o700)
+            with mock.patch('os.getuid', return_value=os.getuid() + 1):
+                with self.assertRaises(ImproperlyConfigured):
+                    makeBytecodeCache(cacheDir)
+
+    def test_precompile_command(self) -> None:
+        with tempfile.TemporaryDirectory() as cacheDir:
+            djangoEnv = engines['jinja2'].env # type: ignore
+            with mock.patch.object(
+                    djangoEnv,
+                    'bytecode_cache',
+                    FileSystemBytecodeCache(cacheDir)):
+                stdout = StringIO()
+                call_command(
+                    'precompile_templates',
+                    '--clear',
+                    stdout=stdout,
+                    stderr=StringIO())
+                nCompiled = len(os.listdir(cacheDir))
+        self.assertEqual(nCompiled, len(stdout.getvalue().split()))
+        self.assertIn('home.j2', stdout.getvalue().split())
+
+
+class FragmentCacheTests(TestCase):
+    def setUp(self) -> None:
+        cache.clear()
+        self.addCleanup(cache.clear)
+
+    def _getTemplate(self, source: str) -> Template:
+        env = environment(loader=DictLoader({'t.j2': source}), autoescape=True)
+        return env.get_template('t.j2')
+
+    def test_fragments_are_rendered_once_per_key(self) -> None:
+        template = self._getTemplate(
+            '{% cache ("k", n > 5) %}<b>{{ s }}</b>{{ n }}{% endcache %}'
+            '|{{ n }}')
+        self.assertEqual(
+            template.render(s='<i>', n=1),
+            '<b>&lt;i&gt;</b>1|1')
+        self.assertEqual(
+            template.render(s='<i>', n=2),
+            '<b>&lt;i&gt;</b>1|2')
+        self.assertEqual(template.render(s='x', n=7), '<b>x</b>7|7')
+
+    def test_timeout(self) -> None:
+        template = self._getTemplate('{% cache "k", 0 %}{{ n }}{% endcache %}')
+        self.assertEqual(template.render(n=1), '1')
+        self.assertEqual(template.render(n=2), '2')
+
+    def test_keys_are_versioned_by_sources(self) -> None:
+        first = self._getTemplate('{% cache "k" %}{{ n }}{% endcache %}')
+        self.assertEqual(first.render(n=1), '1')
+        second = self._getTemplate('{% cache "k" %}{{ n }}.{% endcache %}')
+        self.assertEqual(second.render(n=2), '2.')
+        self.assertEqual(first.render(n=3), '1')
+
+    def test_keys_are_versioned_by_variants_of_images(self) -> None:
+        template = self._getTemplate('{% cache "k" %}{{ n }}{% endcache %}')
+        with tempfile.TemporaryDirectory() as variantsDir:
+            with override_settings(IMAGE_VARIANTS_DIR=variantsDir):
+                self.assertEqual(template.render(n=1), '1')
+                indexPath = Path(variantsDir) / 'images.json'
+                indexPath.write_text('{}')
+                self.assertEqual(template.render(n=2), '2')
+                os.utime(indexPath, (0, 0,))
+                self.assertEqual(template.render(n=3), '3')
+
+
+class StaticFilesTests(TestCase):
+    def test_names_missing_from_manifest_are_rejected(self) -> None:
+        with tempfile.TemporaryDirectory() as staticRoot:
+            with override_settings(STATIC_ROOT=staticRoot):
+                with self.assertRaises(ValueError):
+                    static('css/base.css')
+
+    def test_collected_assets_are_hashed_and_immutable(self) -> None:
+        with tempfile.TemporaryDirectory() as staticRoot:
+            with override_settings(STATIC_ROOT=staticRoot):
+                call_command(
+                    'collectstatic',
+                    '--noinput',
+                    verbosity=0)
+                sources = ('challenges/rps/backend.py', 'templates/home.j2',)
+                for name in sources:
+                    self.assertFalse(
+                        os.path.exists(os.path.join(staticRoot, name)))
+                url = static('css/base.css')
+                self.assertRegex(url, r'^/assets/css/base\.[0-9a-f]{12}\.css$')
+                resp = Client().get(
+                    url,
+                    secure=True,
+                    headers={'Accept-Encoding': 'gzip'})
+                self.assertEqual(resp.status_code, 200)
+                self.assertIn('immutable', resp['Cache-Control'])
+                self.assertEqual(resp['Vary'], 'Accept-Encoding')
+                self.assertEqual(resp['Content-Encoding'], 'gzip')
+                resp.close()
+
+
+@override_settings(STORAGES=_PLAIN_STORAGES)
+class SpriteTests(TestCase):
+    def test_sprite_is_up_to_date(self) -> None:
+        call_command('build_sprite', '--check')
+
+    def test_symbols_are_optimized(self) -> None:
+        sprite = ET.fromstring(makeSprite())
+        names = [file.stem for file in sorted(getVectorsDir().glob('*.svg'))]
+        self.assertEqual([symbol.get('id') for symbol in sprite], names)
+        for symbol in sprite:
+            self.assertTrue(symbol.get('viewBox'))
+            for elem in symbol.iter():
+                self.assertNotIn('title', elem.tag)
+                self.assertTrue(elem.tag.startswith('{http://www.w3.org/'))
+                if elem is not symbol:
+                    self.assertIsNone(elem.get('id'))
+
+    def test_minify_path(self) -> None:
+        self.assertEqual(
+            minifyPath(
+                'M 0.504,-0.25 L 10 20 L 30.001 40 C 1 2 3 4 5 6 '
+                'C 7 8 9 10 11 12 Z M 1 1 2 2 a 5 5 0 0 1 10 0'),
+            'M.5-.25L10 20 30 40C1 2 3 4 5 6 7 8 9 10 11 12ZM1 1 2 2'
+            'a5 5 0 0 1 10 0')
+
+    def test_icon(self) -> None:
+        self.assertEqual(
+            icon('x'),
+            '<svg class="m3-svg-icon" aria-hidden="true">'
+            '<use href="/assets/img/icons.svg#x"></use></svg>')
+        self.assertEqual(
+            icon('x', 'X "account"', class_='big', data_id=1),
+            '<svg class="m3-svg-icon big" data-id="1" role="img" '
+            'aria-label="X &#34;account&#34;">'
+            '<use href="/assets/img/icons.svg#x"></use></svg>')
+
+
+@override_settings(STORAGES=_PLAIN_STORAGES)
+class ScriptBundleTests(TestCase):
+    def test_bundles_are_up_to_date(self) -> None:
+        call_command('bundle_scripts', '--check')
+
+    def test_minify_script(self) -> None:
+        source = (
+            '/**\n'
+            ' * A comment.\n'
+            ' */\n'
+            'const a = "// not a comment";  // a comment\n'
+            '\n'
+            '    let b = a - -1 + /\\/*[/]/g.source / 2;\n'
+            'const c = `x\n'
+            '  ${ {y: `${b}`}.y } /* not a comment */`\n'
+            'return /x/.test(c)\n')
+        self.assertEqual(
+            minifyScript(source),
+            [
+                (3, 0, 'const a="// not a comment";',),
+                (5, 4, 'let b=a- -1+ /\\/*[/]/g.source / 2;',),
+                (6, 0, 'const c=`x',),
+                (7, 0, '  ${{y:`${b}`}.y} /* not a comment */`',),
+                (8, 0, 'return /x/.test(c)',),])
+
+    def test_empty_lines_of_template_literals_are_kept(self) -> None:
+        self.assertEqual(
+            minifyScript('const s = `a\n\nb`;\nlet t = `${s}\n\n`;\n'),
+            [
+                (0, 0, 'const s=`a',),
+                (1, 0, '',),
+                (2, 0, 'b`;',),
+                (3, 0, 'let t=`${s}',),
+                (4, 0, '',),
+                (5, 0, '`;',),])
+
+    def test_slashes_after_postfix_operators_are_divisions(self) -> None:
+        self.assertEqual(
+            minifyScript('a = b++ / 2; c = d-- / 3;\ne = f\n++g / 4\n'),
+            [
+                (0, 0, 'a=b++ / 2;c=d-- / 3;',),
+                (1, 0, 'e=f',),
+                (2, 0, '++g / 4',),])
+
+    def test_modules_are_linked_in_order(self) -> None:
+        with tempfile.TemporaryDirectory() as assetsDir:
+            files = {
+                'a.js': (
+                    "import { b as bee } from './lib/b.js';\n"
+                    "import MSGS from '/assets/msgs.json';\n"
+                    "bee(MSGS.hi);\n"),
+                'lib/b.js': (
+                    "import * as c from '../c.js';\n"
+                    "export function b(x) { return c.c(x); }\n"),
+                'c.js': 'export const c = (x) => x;\n',
+                'msgs.json': '{"hi": "Hi"}',}
+            for name, content in files.items():
+                os.makedirs(
+                    os.path.dirname(os.path.join(assetsDir, name)),
+                    exist_ok=True)
+                with open(os.path.join(assetsDir, name), 'w') as file:
+                    file.write(content)
+            with override_settings(STATICFILES_DIRS=[assetsDir]):
+                code, sourceMap = makeBundle('test', ['a.js'])
+        self.assertEqual(code, (
+            'const __m0=(()=>{\n'
+            'const c=(x)=>x;\n'
+            'return{c}})();\n'
+            'const __m1=(()=>{\n'
+            'const c=__m0;\n'
+            'function b(x){return c.c(x);}\n'
+            'return{b}})();\n'
+            'const __m2={"hi":"Hi"};\n'
+            'const __m3=(()=>{\n'
+            'const{b:bee}=__m1;\n'
+            'const MSGS=__m2;\n'
+            'bee(MSGS.hi);\n'
+            'return{}})();\n'
+            '//# sourceMappingURL=test.js.map\n'))
+        sourceMap = json.loads(sourceMap)
+        self.assertEqual(
+            sourceMap['sources'],
+            ['/assets/c.js', '/assets/lib/b.js', '/assets/msgs.json',
+                '/assets/a.js',])
+        self.assertEqual(
+            sourceMap['mappings'],
+            ';AAAA;;;ACAA;AACA;;ACDA;;ACAA;AACA;AACA;;')
+
+    def test_bundle(self) -> None:
+        self.assertEqual(
+            bundle('base'),
+            '<script defer type="module" src="/assets/bundles/base.js">'
+            '</script>')
+        with self.assertRaises(ValueError):
+            bundle('unknown')
+
+
+@override_settings(STORAGES=_PLAIN_STORAGES)
+class PictureTests(TestCase):
+    def test_images_without_variants(self) -> None:
+        with tempfile.TemporaryDirectory() as variantsDir:
+            with override_settings(IMAGE_VARIANTS_DIR=variantsDir):
+                self.assertEqual(
+                    picture('img/banner.png', 'Banner', class_='wide'),
+                    '<img src="/assets/img/banner.png" alt="Banner" '
+                    'class="wide">')
+
+    @skipUnless(importlib.util.find_spec('PIL'), 'Pillow is not installed')
+    def test_variants(self) -> None:
+        with tempfile.TemporaryDirectory() as variantsDir:
+            with override_settings(
+                    DEBUG=True,
+                    STATICFILES_DIRS=[
+                        *settings.STATICFILES_DIRS[:-1],
+                        ('variants', variantsDir,),],
+                    IMAGE_VARIANTS_DIR=variantsDir,
+                    IMAGE_VARIANT_SOURCES=['img/megacodist-3.png'],
+                    IMAGE_VARIANT_WIDTHS=[32, 128],):
+                stale = os.path.join(variantsDir, 'img', 'old.png')
+                os.makedirs(os.path.dirname(stale))
+                open(stale, 'wb').close()
+                images = buildVariants()
+                self.assertFalse(os.path.exists(stale))
+                sources = images['img/megacodist-3.png']['sources']
+                self.assertIn('image/png', sources)
+                for variants in sources.values():
+                    self.assertEqual(
+                        [width for width, _ in variants],
+                        [32, 64])
+                    for _, variant in variants:
+                        self.assertTrue(os.path.exists(os.path.join(
+                            variantsDir,
+                            variant.removeprefix('variants/'))))
+                # Unchanged images are not encoded again...
+                with mock.patch('PIL.Image.Image.save') as save:
+                    buildVariants()
+                save.assert_not_called()
+                html = picture('img/megacodist-3.png', 'Logo', sizes='32px')
+                # Variants static files do not serve are not offered...
+                with override_settings(
+                        STATICFILES_DIRS=settings.STATICFILES_DIRS[:-1]):
+                    self.assertEqual(
+                        picture('img/megacodist-3.png', 'Logo'),
+                        '<img src="/assets/img/megacodist-3.png" '
+                        'alt="Logo">')
+        self.assertIn('width="64" height="64"', html)
+        self.assertNotIn('loading=', html)
+        self.assertIn('.32w.png 32w, ', html)
+        self.assertIn('sizes="32px"', html)
+        self.assertEqual(
+            html.count('<source '),
+            len(sources) - 1)
+
+
+@override_settings(STORAGES=_PLAIN_STORAGES)
+class CriticalCssTests(TestCase):
+    def test_critical_css_is_up_to_date(self) -> None:
+        call_command('build_critical_css', '--check')
+
+    def test_rules_above_the_fold(self) -> None:
+        css = extractCriticalCss('base.j2', [
+            'css/base.css',
+            'css/beating-transition.css',
+            'css/header.css',
+            'css/footer.css',])
+        self.assertIn('header>nav.navbar{display:flex;', css)
+        self.assertIn('@media (max-width:400px){header>nav.navbar', css)
+        # Scripts switch themes...
+        self.assertIn("[data-theme='dark']{", css)
+        self.assertIn('"header" "main" "footer"', css)
+        # Rules below the fold, of user actions or of elements missing
+        # from the markup are left to the stylesheets...
+        self.assertNotIn('footer{', css)
+        self.assertNotIn(':hover', css)
+        self.assertNotIn('@keyframes', css)
+        self.assertNotIn('button.m3-btn', css)
+
+    def test_stylesheets(self) -> None:
+        html = stylesheets('base.j2')
+        self.assertTrue(html.startswith('<style>:root{'))
+        self.assertIn(
+            '<link rel="stylesheet" href="/assets/css/base.css" '
+            'media="print" onload="this.media=\'all\'">',
+            html)
+        self.assertIn(
+            '<noscript><link rel="stylesheet" href="/assets/css/base.css">',
+            html)
+        with tempfile.TemporaryDirectory() as criticalDir:
+            with mock.patch(
+                    'core.critical.getCriticalDir',
+                    return_value=Path(criticalDir)):
+                html = stylesheets('base.j2')
+        self.assertTrue(html.startswith(
+            '<link rel="stylesheet" href="/assets/css/base.css">'))
+        self.assertNotIn('<style>', html)
+        with self.assertRaises(ValueError):
+            stylesheets('unknown.j2')
+
+    def test_urls_are_resolved_by_static_files(self) -> None:
+        with tempfile.TemporaryDirectory() as criticalDir:
+            Path(criticalDir, 'base.css').write_text(
+                'a{background:url("img/banner.png")}'
+                'b{background:url("data:,")}',
+                encoding='utf-8')
+            with mock.patch(
+                    'core.critical.getCriticalDir',
+                    return_value=Path(criticalDir)):
+                self.assertEqual(
+                    getCriticalCss('base.j2'),
+                    'a{background:url("/assets/img/banner.png")}'
+                    'b{background:url("data:,")}')
+                # The production storage does not resolve uncollected
+                # files...
+                storages = {
+                    **_PLAIN_STORAGES,
+                    'staticfiles': {
+                        'BACKEND': 'core.staticfiles.StaticFilesStorage',
+                    },
+                }
+                with tempfile.TemporaryDirectory() as staticRoot:
+                    with override_settings(
+                            STATIC_ROOT=staticRoot,
+                            STORAGES=storages):
+                        with self.assertRaises(ValueError):
+                            getCriticalCss('base.j2')
+
+    def test_render_timing(self) -> None:
+        self.assertEqual(
+            findBlockingResources(
+                '<html><head>'
+                '<link rel="stylesheet" href="/a.css">'
+                '<link rel="stylesheet" href="/b.css" media="print">'
+                '<noscript><link rel="stylesheet" href="/c.css"></noscript>'
+                '<script src="/d.js"></script>'
+                '<script type="module" src="/e.js"></script>'
+                '</head><body>'
+                '<link rel="stylesheet" href="/f.css">'
+                '</body></html>'),
+            ['/a.css', '/d.js',])
+        timing = measureTemplate('home.j2')
+        self.assertEqual(timing.blocking, [])
+        with tempfile.TemporaryDirectory() as criticalDir:
+            with mock.patch(
+                    'core.critical.getCriticalDir',
+                    return_value=Path(criticalDir)):
+                linked = measureTemplate('home.j2')
+        self.assertEqual(len(linked.blocking), 4)
+        self.assertLess(timing.fcp, linked.fcp)
@@ -2,32 +2,20 @@
 # 
 #
 
-from typing import Any
 from django.http import HttpRequest
 from django.http.response import HttpResponse
-from django.shortcuts import render
+
+from core.pages import renderStaticPage
 
 
 def getHomePage(request: HttpRequest) -> HttpResponse:
     # Returning the HTTP response...
-    context = dict[str, Any]()
-    return render(
-        request,
-        template_name='home.j2',
-        context=context)
+    return renderStaticPage(request, 'home.j2')
 
 
 def getLicensePage(request: HttpRequest) -> HttpResponse:
-    context = dict[str, Any]()
-    return render(
-        request,
-        template_name='license.j2',
-        context=context)
+    return renderStaticPage(request, 'license.j2')
 
 
 def getAboutMePage(request: HttpRequest) -> HttpResponse:
-    context = dict[str, Any]()
-    return render(
-        request,
-        template_name='about-me.j2',
-        context=context)
+    return renderStaticPage(request, 'about-me.j2')